@@ -2,9 +2,14 @@
 
 import os
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix # Trust X-Forwarded-For from our own proxies
 from logger import logger # Import the custom logger
 from app.routes import bp as main_bp # Import the main blueprint from routes.py
 from app.services.auth_service import login_manager # Ensure load_user is imported
+from app.models.db import init_db # Request-scoped DB connection handling
+from app import request_log # One summary log record per request
+from app import metrics # Prometheus metrics at /metrics
+from app import profiling # On-demand cProfile of single requests
 
 def create_app():
     """
@@ -27,12 +32,29 @@ def create_app():
     # Database configuration
     app.config['DATABASE_URI'] = os.getenv('DATABASE_URL')
 
+    # Number of reverse proxies in front of the app (e.g., 1 on Render). Their
+    # X-Forwarded-For entries are trusted so request.remote_addr is the real client,
+    # which the login throttle and request logs key on. Leave at 0 when unproxied.
+    trusted_proxies = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+    if trusted_proxies > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
     logger.debug("Configuration loaded.")
 
     # --- Initialize Extensions ---
     login_manager.init_app(app) # Initialize Flask-Login with the app
     logger.debug("LoginManager initialized.")
 
+    # Registered before the other request hooks, so a profile includes them too
+    profiling.init_app(app)
+
+    init_db(app) # Release the request-scoped DB connection when each request ends
+    logger.debug("Request-scoped database connection handling initialized.")
+
+    request_log.init_app(app) # Log one summary record at the end of every request
+
+    metrics.init_app(app) # Record request metrics and serve /metrics
+
     # --- Configure Flask-Login ---
     login_manager.login_view = 'main.login' # The route name for the login page
     login_manager.login_message = 'Please log in to access this page.' # Message flashed to users
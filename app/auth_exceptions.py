@@ -60,6 +60,21 @@ class PasswordPolicyViolation(AuthException):
          super().__init__(self.message)
 
 
+class PasswordHashingBusy(AuthException):
+    """Raised when too many password hashes are already being computed to accept another."""
+    def __init__(self, message: str = "The server is busy. Please try again in a moment."):
+        self.message = message
+        super().__init__(self.message)
+
+
+class TooManyLoginAttempts(AuthException):
+    """Raised when an email address or client has failed to log in too often recently."""
+    def __init__(self, retry_after: float = 60.0):
+        self.retry_after = retry_after # Seconds until another attempt is allowed
+        self.message = "Too many failed login attempts. Please wait a moment and try again."
+        super().__init__(self.message)
+
+
 class InvalidInputFormat(AuthException):
     """Raised for general input format violations during registration or login."""
     def __init__(self, field: str, reason: str):
@@ -0,0 +1,197 @@
+# bookstore_app_with_login/app/metrics.py
+
+"""
+Prometheus metrics, served at /metrics.
+
+Per request, this records a latency histogram sample and a status counter,
+labelled by route endpoint (e.g. 'main.index'), and tracks in-flight requests.
+Each is an in-memory or mmap'd counter update, so the cost per request is tiny.
+Order outcomes are counted by the create_order route.
+
+The DB pool, caches, password hasher and login throttle already keep their own
+counters (their `stats()`). These are copied into metrics at most once per
+METRICS_SYNC_INTERVAL seconds per worker, at the end of a request, and again
+just before /metrics is rendered. Cumulative counters are exported as Prometheus
+counters, by adding the growth since the previous sync.
+
+Under gunicorn, every worker writes its metrics to files in
+PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py), and /metrics aggregates
+all of them, whichever worker serves the scrape. Without that variable (e.g.
+`python main.py`) the metrics of the single process are served.
+"""
+
+import os
+import threading
+import time
+from flask import Response, abort, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from app.models.book import catalog_page_cache
+from app.models.customer import principal_cache
+from app.models.db import get_pool_stats
+from app.services.book_service import search_index
+from app.services.login_throttle import login_throttle
+from app.services.password_hasher import get_hasher_stats
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# If set, /metrics requires 'Authorization: Bearer <token>'. Empty = public (fine
+# only if the network keeps /metrics away from the internet).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Seconds between copies of the pool/cache/hasher/throttle counters into metrics.
+METRICS_SYNC_INTERVAL = float(os.getenv("METRICS_SYNC_INTERVAL", "1"))
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# --- Request Metrics ---
+REQUEST_LATENCY = Histogram("bookstore_http_request_duration_seconds", "Request latency by route.",
+                            ["endpoint", "method"])
+REQUESTS = Counter("bookstore_http_requests_total", "Requests by route and status.",
+                   ["endpoint", "method", "status"])
+IN_FLIGHT = Gauge("bookstore_http_requests_in_flight", "Requests being handled.", multiprocess_mode="livesum")
+ORDERS = Counter("bookstore_orders_total", "Order submissions by outcome.", ["outcome"])
+
+# --- Component Metrics (synced from the components' own stats) ---
+DB_POOL_CONNECTIONS = Gauge("bookstore_db_pool_connections", "Pooled DB connections by state.", ["state"],
+                            multiprocess_mode="livesum")
+DB_POOL_EVENTS = Counter("bookstore_db_pool_events_total", "DB pool checkouts, connects, closes, timeouts, ...",
+                         ["event"])
+DB_POOL_WAIT = Counter("bookstore_db_pool_wait_seconds_total", "Time spent waiting for a pooled connection.")
+CACHE_LOOKUPS = Counter("bookstore_cache_lookups_total", "Cache lookups by result (hit ratio = hits / all).",
+                        ["cache", "result"])
+CACHE_ENTRIES = Gauge("bookstore_cache_entries", "Entries held per cache.", ["cache"], multiprocess_mode="livesum")
+HASHER_PENDING = Gauge("bookstore_password_hash_pending", "Password hash jobs running or queued.",
+                       multiprocess_mode="livesum")
+HASHER_JOBS = Counter("bookstore_password_hash_jobs_total", "Password hash jobs by outcome.", ["outcome"])
+LOGIN_THROTTLE_EVENTS = Counter("bookstore_login_throttle_events_total", "Login throttle checks and outcomes.",
+                                ["event"])
+
+CACHES = (catalog_page_cache, principal_cache, search_index)
+CACHE_RESULTS = ("hits", "stale_hits", "misses")
+POOL_EVENTS = ("checkouts", "connects", "closes", "timeouts", "health_check_failures")
+HASHER_OUTCOMES = ("completed", "rejected", "failures")
+THROTTLE_EVENTS = ("checks", "rejected_email", "rejected_ip", "failures", "successes")
+
+_sync_lock = threading.Lock()
+_last_sync = 0.0
+_last_values = {} # (metric, labels) -> component's value at the previous sync
+
+
+def _add_growth(counter, labels, value):
+    """Adds to `counter` how much a component's cumulative `value` grew since the last sync."""
+    key = (counter, labels)
+    previous = _last_values.get(key, 0)
+    _last_values[key] = value
+    growth = value - previous if value >= previous else value # The component was reset
+    if growth:
+        (counter.labels(*labels) if labels else counter).inc(growth)
+
+
+def sync_component_metrics(force=False):
+    """
+    Copies the pool, cache, hasher and throttle stats into metrics.
+
+    Does nothing if the last sync was less than METRICS_SYNC_INTERVAL seconds
+    ago (unless `force`), or if another thread is already syncing.
+    """
+    global _last_sync
+    now = time.monotonic()
+    if not force and now - _last_sync < METRICS_SYNC_INTERVAL:
+        return
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        _last_sync = now
+        pool = get_pool_stats()
+        if pool:
+            DB_POOL_CONNECTIONS.labels("in_use").set(pool["in_use"])
+            DB_POOL_CONNECTIONS.labels("idle").set(pool["idle"])
+            for event in POOL_EVENTS:
+                _add_growth(DB_POOL_EVENTS, (event,), pool[event])
+            _add_growth(DB_POOL_WAIT, (), pool["wait_time_total"])
+
+        for cache in CACHES:
+            stats = cache.stats()
+            for result in CACHE_RESULTS:
+                if result in stats:
+                    _add_growth(CACHE_LOOKUPS, (cache.name, result), stats[result])
+            CACHE_ENTRIES.labels(cache.name).set(stats["size"] if "size" in stats else int(stats["cached"]))
+
+        hasher = get_hasher_stats()
+        HASHER_PENDING.set(hasher["pending"])
+        for outcome in HASHER_OUTCOMES:
+            _add_growth(HASHER_JOBS, (outcome,), hasher[outcome])
+
+        throttle = login_throttle.stats()
+        for event in THROTTLE_EVENTS:
+            _add_growth(LOGIN_THROTTLE_EVENTS, (event,), throttle[event])
+    except Exception:
+        logger.exception("Failed to sync component metrics.")
+    finally:
+        _sync_lock.release()
+
+
+def record_order_outcome(outcome):
+    """
+    Counts one order submission.
+
+    Args:
+        outcome (str): 'success', or the name of the exception that stopped the order
+                       (e.g. 'QuantityExceedsStock', 'InvalidOrderFormat', 'DatabaseOperationError').
+    """
+    if METRICS_ENABLED:
+        ORDERS.labels(outcome).inc()
+
+
+def _start_request():
+    g._metrics_started = time.perf_counter()
+    IN_FLIGHT.inc()
+
+
+def _record_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exception=None):
+    # teardown_request runs even when the view raised, so in-flight never leaks
+    started = g.pop("_metrics_started", None)
+    if started is None:
+        return
+    IN_FLIGHT.dec()
+    endpoint = request.endpoint or "unmatched" # 404s: don't label by arbitrary paths
+    status = g.pop("_metrics_status", 500)
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(endpoint, request.method, str(status)).inc()
+    sync_component_metrics()
+
+
+def metrics_view():
+    """Serves every worker's metrics in the Prometheus text format."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+    sync_component_metrics(force=True)
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """
+    Registers the request hooks and the /metrics endpoint on the Flask app.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    app.add_url_rule("/metrics", endpoint="metrics", view_func=metrics_view)
+    if not METRICS_TOKEN:
+        logger.warning("/metrics is public: set METRICS_TOKEN or restrict it at the network level.")
+    logger.debug("Metrics enabled (%s).", 'multiprocess' if MULTIPROCESS_DIR else 'single process')
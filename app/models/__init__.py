@@ -18,7 +18,7 @@ from app.models.customer import Customer
 from app.models.book import Book
 from app.models.order import Order
 from app.models.order_item import OrderItem
-from app.models.db import get_db_connection # Expose db connection function if needed directly
+from app.models.db import get_db_connection, get_pool_stats # Expose db helpers if needed directly
 
 # You can define __all__ to specify what gets imported with 'from .models import *'
 # Example: __all__ = ['Customer', 'Book', 'Order', 'OrderItem', 'get_db_connection']
\ No newline at end of file
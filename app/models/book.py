@@ -1,9 +1,22 @@
 # bookstore_app_with_login/app/models/book.py
 
-from app.models.db import get_db_connection
+import os
+import json
+import base64
+import binascii
+from app.models.db import after_commit, get_db_connection, identity_map_get, identity_map_put, identity_map_discard
+from app.models.cache import LRUTTLCache # In-process catalog page cache
 from logger import logger # Import the custom logger
 from decimal import Decimal # Use Decimal for precise price representation
 
+# Seconds a cached catalog page (Book.list_page) is served before it is reloaded.
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+# Number of distinct catalog pages (sort + position) cached per worker.
+CATALOG_PAGE_CACHE_ENTRIES = int(os.getenv("CATALOG_PAGE_CACHE_ENTRIES", "256"))
+
+# Marks a description that hasn't been fetched yet (listing queries skip the column).
+DESCRIPTION_NOT_LOADED = object()
+
 class Book:
     """
     Represents a book entity in the bookstore.
@@ -11,6 +24,24 @@ class Book:
     Provides methods for CRUD operations (Create, Read, Update, Delete - though Delete isn't implemented yet)
     and stock management related to books in the database.
     """
+    # Sort keys accepted by list_page, mapped to the SQL expression they order by.
+    # Nullable columns are coalesced so keyset comparisons never meet a NULL; the
+    # catalog indexes are built on these exact expressions (plus book_id).
+    SORT_EXPRESSIONS = {
+        "title": "title",
+        "price": "COALESCE(price, 0)",
+        "author": "COALESCE(author, '')",
+        "genre": "COALESCE(genre, '')",
+    }
+    DEFAULT_PAGE_SIZE = 24
+    MAX_PAGE_SIZE = 100
+    # Columns needed to render listings. The unbounded 'description' column is left
+    # out and loaded lazily (see the `description` property).
+    LISTING_COLUMNS = "book_id, title, author, genre, price, stock_quantity"
+    # Most descriptions fetched by one lazy load; larger result sets are split into
+    # groups of this size (see from_rows).
+    DESCRIPTION_BATCH_SIZE = MAX_PAGE_SIZE
+
     def __init__(self, book_id, title, author, genre, price, stock_quantity, description="This is a placeholder description."):
         """
         Initializes a Book object.
@@ -22,6 +53,8 @@ class Book:
             genre (str): The genre of the book.
             price (Decimal): The price of the book. Stored as Decimal for accuracy.
             stock_quantity (int): The current number of copies in stock.
+            description (str, optional): The book's description, or DESCRIPTION_NOT_LOADED
+                                         to fetch it from the database on first access.
         """
         self.book_id = book_id
         self.title = title
@@ -30,7 +63,21 @@ class Book:
         # Ensure price is stored/handled as Decimal for financial calculations
         self.price = Decimal(price) if price is not None else None
         self.stock_quantity = int(stock_quantity) if stock_quantity is not None else 0
-        self.description = description
+        self._description = description
+        # Books loaded together (e.g., one catalog page) share this list, so the first
+        # description access fetches the descriptions for the whole group in one query.
+        self._load_group = None
+
+    @property
+    def description(self):
+        """The book's description, fetched from the database on first access if needed."""
+        if self._description is DESCRIPTION_NOT_LOADED:
+            Book.load_descriptions(self._load_group or [self])
+        return self._description
+
+    @description.setter
+    def description(self, value):
+        self._description = value
         
     def get_id(self):
         """Returns the book's unique ID."""
@@ -52,25 +99,32 @@ class Book:
         """
         Increases the stock quantity of the book in the database within a transaction.
 
+        The increment is applied relative to the row's current value, so concurrent
+        stock changes are never overwritten.
+
         Args:
             quantity (int): The amount to increase the stock by.
             conn (psycopg2.connection): An active database connection.
         """
         if quantity <= 0:
-            logger.warning(f"Attempted to increase stock for book {self.book_id} by non-positive amount: {quantity}")
+            logger.warning("Attempted to increase stock for book %s by non-positive amount: %s", self.book_id, quantity)
             return # Or raise ValueError("Quantity must be positive")
 
-        self.stock_quantity += quantity
         try:
             with conn.cursor() as cur:
                 cur.execute(
-                    'UPDATE books SET stock_quantity = %s WHERE book_id = %s',
-                    (self.stock_quantity, self.book_id)
+                    'UPDATE books SET stock_quantity = stock_quantity + %s WHERE book_id = %s RETURNING stock_quantity',
+                    (quantity, self.book_id)
                 )
+                result = cur.fetchone()
+            if result:
+                self.stock_quantity = result["stock_quantity"]
+                identity_map_discard(Book, self.book_id) # Another loaded copy would show the old stock
+                publish_book_writes(conn, {self.book_id: {"stock_quantity": self.stock_quantity}})
             # Commit should happen outside this method, typically at the end of the service operation
-            logger.debug(f"Stock for book {self.book_id} tentatively increased by {quantity} to {self.stock_quantity}.")
+            logger.debug("Stock for book %s tentatively increased by %s to %s.", self.book_id, quantity, self.stock_quantity)
         except Exception as e:
-            logger.exception(f"Failed to update stock (increase) for book {self.book_id} in database: {e}")
+            logger.exception("Failed to update stock (increase) for book %s in database: %s", self.book_id, e)
             # Rollback might be needed at a higher level
             raise # Re-raise the exception
 
@@ -78,6 +132,9 @@ class Book:
         """
         Decreases the stock quantity of the book in the database within a transaction.
 
+        The stock check and the decrement happen in one conditional UPDATE, so two
+        buyers can never both take the last copies.
+
         Args:
             quantity (int): The amount to decrease the stock by.
             conn (psycopg2.connection): An active database connection.
@@ -86,28 +143,110 @@ class Book:
             ValueError: If the requested quantity exceeds available stock or is non-positive.
         """
         if quantity <= 0:
-            logger.warning(f"Attempted to decrease stock for book {self.book_id} by non-positive amount: {quantity}")
+            logger.warning("Attempted to decrease stock for book %s by non-positive amount: %s", self.book_id, quantity)
             raise ValueError("Quantity to decrease must be positive.")
-        if self.stock_quantity < quantity:
-            logger.error(f"Not enough stock for book {self.book_id}. Available: {self.stock_quantity}, Requested: {quantity}")
-            raise ValueError(f"Not enough stock for book '{self.title}'. Available: {self.stock_quantity}.")
 
-        self.stock_quantity -= quantity
         try:
             with conn.cursor() as cur:
                 cur.execute(
-                    'UPDATE books SET stock_quantity = %s WHERE book_id = %s',
-                    (self.stock_quantity, self.book_id)
+                    """UPDATE books SET stock_quantity = stock_quantity - %s
+                       WHERE book_id = %s AND stock_quantity >= %s
+                       RETURNING stock_quantity""",
+                    (quantity, self.book_id, quantity)
                 )
-            # Commit should happen outside this method
-            logger.debug(f"Stock for book {self.book_id} tentatively decreased by {quantity} to {self.stock_quantity}.")
+                result = cur.fetchone()
         except Exception as e:
-            logger.exception(f"Failed to update stock (decrease) for book {self.book_id} in database: {e}")
+            logger.exception("Failed to update stock (decrease) for book %s in database: %s", self.book_id, e)
             # Rollback might be needed at a higher level
             raise # Re-raise the exception
 
+        if not result:
+            logger.error("Not enough stock for book %s. Requested: %s", self.book_id, quantity)
+            raise ValueError(f"Not enough stock for book '{self.title}'.")
+
+        self.stock_quantity = result["stock_quantity"]
+        identity_map_discard(Book, self.book_id) # Another loaded copy would show the old stock
+        publish_book_writes(conn, {self.book_id: {"stock_quantity": self.stock_quantity}})
+        # Commit should happen outside this method
+        logger.debug("Stock for book %s tentatively decreased by %s to %s.", self.book_id, quantity, self.stock_quantity)
+
     # --- Class Methods for Database Interaction ---
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Factory method to create a Book instance from a database row
+        (obtained via DictCursor).
+
+        Args:
+            row (dict): A row from the 'books' table.
+
+        Returns:
+            Book | None: A Book object if row is valid, otherwise None.
+        """
+        if not row:
+            return None
+        return cls(
+            book_id=row["book_id"],
+            title=row["title"],
+            author=row["author"],
+            genre=row["genre"],
+            price=row["price"],
+            stock_quantity=row["stock_quantity"],
+            # Listing queries don't select the description; defer it
+            description=row["description"] if "description" in row.keys() else DESCRIPTION_NOT_LOADED
+        )
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Creates Book instances from several rows loaded together.
+
+        The books are linked into load groups of up to DESCRIPTION_BATCH_SIZE
+        neighbouring books, so if their descriptions were not selected, touching
+        any one of them fetches the whole group's with a single query.
+
+        Args:
+            rows (list[dict]): Rows from the 'books' table.
+
+        Returns:
+            list[Book]: The Book objects, in row order.
+        """
+        books = [cls.from_row(row) for row in rows]
+        for start in range(0, len(books), cls.DESCRIPTION_BATCH_SIZE):
+            group = books[start:start + cls.DESCRIPTION_BATCH_SIZE]
+            for book in group:
+                book._load_group = group
+        return books
+
+    @classmethod
+    def load_descriptions(cls, books):
+        """
+        Fetches the descriptions of any books that don't have them yet, in one query.
+
+        Args:
+            books (list[Book]): The books whose descriptions should be available.
+        """
+        pending = {book.book_id: book for book in books if book._description is DESCRIPTION_NOT_LOADED}
+        if not pending:
+            return
+
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute('SELECT book_id, description FROM books WHERE book_id = ANY(%s)',
+                                (list(pending),))
+                    rows = cur.fetchall()
+        except Exception as e:
+            logger.exception("Error fetching descriptions for books %s: %s", list(pending), e)
+            raise
+
+        for row in rows:
+            pending.pop(row["book_id"])._description = row["description"]
+        for book in pending.values():
+            book._description = None # Row no longer exists; don't retry on every access
+        logger.debug("Loaded %d book descriptions in one query.", len(rows))
+
     @classmethod
     def add_book(cls, title, author, genre, price, stock_quantity, description="This is a placeholder description."):
         """
@@ -136,11 +275,15 @@ class Book:
                     )
                     book_id = cur.fetchone()[0] # Fetch the returned book_id
                 conn.commit() # Commit the transaction
-            logger.info(f"Book '{title}' added successfully with ID: {book_id}.")
+                publish_book_writes(conn, {book_id: {
+                    "title": title, "author": author, "genre": genre, "price": Decimal(price),
+                    "stock_quantity": int(stock_quantity), "description": description,
+                }})
+            logger.info("Book '%s' added successfully with ID: %s.", title, book_id)
             # Return a new instance of the Book class
             return cls(book_id, title, author, genre, price, stock_quantity)
         except Exception as e:
-            logger.exception(f"Error adding book '{title}' to database: {e}")
+            logger.exception("Error adding book '%s' to database: %s", title, e)
             raise # Re-raise the exception
 
     @classmethod
@@ -154,6 +297,11 @@ class Book:
         Returns:
             Book | None: A Book object instance if found, otherwise None.
         """
+        # Reuse the instance if this request already loaded the row
+        book = identity_map_get(cls, book_id)
+        if book is not None:
+            return book
+
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cur:
@@ -161,9 +309,9 @@ class Book:
                     book_data = cur.fetchone() # fetchone() returns one row or None
 
             if book_data:
-                logger.debug(f"Book found for ID: {book_id}")
-                # Create and return a Book instance from the fetched data
-                return cls(
+                logger.debug("Book found for ID: %s", book_id)
+                # Create a Book instance from the fetched data
+                book = cls(
                     book_id=book_data["book_id"],
                     title=book_data["title"],
                     author=book_data["author"],
@@ -172,45 +320,242 @@ class Book:
                     stock_quantity=book_data["stock_quantity"],
                     description=book_data["description"]
                 )
+                identity_map_put(cls, book.book_id, book)
+                return book
             else:
-                logger.warning(f"No book found for ID: {book_id}")
+                logger.warning("No book found for ID: %s", book_id)
                 return None
         except Exception as e:
-            logger.exception(f"Error fetching book by ID {book_id}: {e}")
+            logger.exception("Error fetching book by ID %s: %s", book_id, e)
             return None # Return None on error
 
     @classmethod
-    def get_all_books(cls):
+    def get_many(cls, book_ids, conn=None):
         """
-        Fetches all book records from the database.
+        Fetches several books in a single round trip.
+
+        Books already loaded during the current request are reused; the rest are
+        fetched with one `WHERE book_id = ANY(%s)` query. Descriptions are not
+        selected; they are loaded (in one batch) only if accessed.
+
+        Args:
+            book_ids (Iterable[int]): The IDs of the books to retrieve. Duplicates are ignored.
+            conn (psycopg2.connection, optional): An active database connection to use.
+                                                  If omitted, one is obtained (and the
+                                                  read committed) here.
 
         Returns:
-            list[Book]: A list of Book object instances. Returns an empty list if no books
-                        are found or an error occurs.
+            dict[int, Book]: The found books keyed by book_id. IDs that do not exist
+                             are simply absent from the result.
+
+        Raises:
+            Exception: If the database query fails.
         """
-        books_list = []
+        books = {}
+        missing_ids = []
+        for book_id in dict.fromkeys(book_ids): # Preserve order, drop duplicates
+            book = identity_map_get(cls, book_id)
+            if book is not None:
+                books[book_id] = book
+            else:
+                missing_ids.append(book_id)
+
+        if not missing_ids:
+            return books
+
+        query = f'SELECT {cls.LISTING_COLUMNS} FROM books WHERE book_id = ANY(%s)'
         try:
-            with get_db_connection() as conn:
+            if conn is not None:
                 with conn.cursor() as cur:
-                    cur.execute('SELECT * FROM books ORDER BY title') # Optional: Order results
-                    all_book_data = cur.fetchall() # fetchall() returns a list of rows
+                    cur.execute(query, (missing_ids,))
+                    rows = cur.fetchall()
+            else:
+                with get_db_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(query, (missing_ids,))
+                        rows = cur.fetchall()
+        except Exception as e:
+            logger.exception("Error fetching books by IDs %s: %s", missing_ids, e)
+            raise # Callers need to distinguish "not found" from a failed query
 
-            # Convert each row into a Book object
-            for book_data in all_book_data:
-                books_list.append(cls(
-                    book_id=book_data["book_id"],
-                    title=book_data["title"],
-                    author=book_data["author"],
-                    genre=book_data["genre"],
-                    price=book_data["price"],
-                    stock_quantity=book_data["stock_quantity"],
-                    description=book_data["description"]
-                ))
-            logger.info(f"Retrieved {len(books_list)} books from database.")
+        for book in cls.from_rows(rows):
+            identity_map_put(cls, book.book_id, book)
+            books[book.book_id] = book
+
+        logger.debug("Fetched %d of %d requested books in one query.", len(rows), len(missing_ids))
+        return books
+
+    @classmethod
+    def decrease_stock_many(cls, quantities, conn):
+        """
+        Atomically decreases stock for several books with one conditional UPDATE.
+
+        Each row is only decremented if it still has enough copies
+        (`stock_quantity >= requested`), and the statement reports which books
+        fell short. Nothing is committed here; if any book is short the caller
+        must roll back, since the other rows in the batch were already updated.
+
+        Args:
+            quantities (dict[int, int]): Requested quantity per book_id. Each book must
+                                         appear once (sum duplicate cart lines first).
+            conn (psycopg2.connection): An active database connection.
+
+        Returns:
+            list[dict]: One entry per book that could not be decremented, with keys
+                        'book_id', 'title', 'requested' and 'available'. Empty if every
+                        decrement succeeded.
+
+        Raises:
+            ValueError: If any quantity is non-positive.
+            Exception: If the database update fails.
+        """
+        if any(quantity <= 0 for quantity in quantities.values()):
+            raise ValueError("Quantities to decrease must be positive.")
+        if not quantities:
+            return []
+
+        query = """
+            WITH requested (book_id, quantity) AS (
+                SELECT * FROM unnest(%s::int[], %s::int[])
+            ),
+            updated AS (
+                UPDATE books b
+                   SET stock_quantity = b.stock_quantity - r.quantity
+                  FROM requested r
+                 WHERE b.book_id = r.book_id
+                   AND b.stock_quantity >= r.quantity
+                RETURNING b.book_id, b.stock_quantity
+            )
+            SELECT r.book_id, r.quantity, u.stock_quantity AS remaining,
+                   b.title, b.stock_quantity AS available
+              FROM requested r
+              LEFT JOIN updated u ON u.book_id = r.book_id
+              LEFT JOIN books b ON b.book_id = r.book_id;
+        """
+        book_ids = list(quantities.keys())
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, (book_ids, [quantities[book_id] for book_id in book_ids]))
+                rows = cur.fetchall()
         except Exception as e:
-            logger.exception("Error fetching all books from database.")
-            # Return empty list on error, or could re-raise
-        return books_list
+            logger.exception("Failed to decrease stock for books %s: %s", book_ids, e)
+            raise # Rollback should be handled by the caller
+
+        shortages = []
+        remaining = {}
+        for row in rows:
+            if row["remaining"] is None:
+                shortages.append({
+                    "book_id": row["book_id"],
+                    "title": row["title"],
+                    "requested": row["quantity"],
+                    "available": row["available"] or 0,
+                })
+                continue
+            remaining[row["book_id"]] = row["remaining"]
+            # Keep any instance already loaded in this request in sync with the database
+            book = identity_map_get(cls, row["book_id"])
+            if book is not None:
+                book.stock_quantity = row["remaining"]
+
+        if not shortages: # With shortages the caller rolls back, so nothing changed
+            publish_book_writes(conn, {book_id: {"stock_quantity": stock_quantity}
+                                       for book_id, stock_quantity in remaining.items()})
+        if shortages:
+            logger.warning("Stock decrement rejected for %d of %d books: %s", len(shortages), len(rows), shortages)
+        else:
+            logger.debug("Stock tentatively decreased for %d books in one statement.", len(rows))
+        return shortages
+
+    @classmethod
+    def list_page(cls, after=None, limit=DEFAULT_PAGE_SIZE, sort="title"):
+        """
+        Returns one page of the catalog using keyset (seek) pagination.
+
+        Instead of OFFSET, each page continues strictly after the last row of the
+        previous one, `WHERE (sort_expr, book_id) > (%s, %s)`, so fetching a deep
+        page costs the same as fetching the first one on an index of
+        (sort_expr, book_id). Pages are cached per worker and dropped on writes; an
+        expired page is served while it is reloaded in the background.
+
+        Args:
+            after (str, optional): The opaque cursor returned with the previous page.
+                                   None starts from the beginning.
+            limit (int): Maximum number of books on the page (capped at MAX_PAGE_SIZE).
+            sort (str): One of SORT_EXPRESSIONS' keys ('title', 'price', 'author', 'genre').
+
+        Returns:
+            tuple[list[Book], str | None]: The books on the page and the cursor for the
+                                           next page, or None if this is the last page.
+
+        Raises:
+            ValueError: If `sort` is unknown or `after` is not a valid cursor.
+            Exception: If the database query fails.
+        """
+        if sort not in cls.SORT_EXPRESSIONS:
+            raise ValueError(f"Unknown sort key '{sort}'.")
+        limit = max(1, min(int(limit), cls.MAX_PAGE_SIZE))
+
+        books, next_cursor = catalog_page_cache.get_or_load(
+            (sort, after, limit), lambda: cls._load_page(sort, after, limit))
+        return list(books), next_cursor
+
+    @classmethod
+    def _load_page(cls, sort, after, limit):
+        """Queries one catalog page for list_page; returns (books, next_cursor)."""
+        sort_expr = cls.SORT_EXPRESSIONS[sort]
+        params = []
+        where_clause = ""
+        if after:
+            sort_value, last_book_id = cls._decode_cursor(after, sort)
+            where_clause = f"WHERE ({sort_expr}, book_id) > (%s, %s)"
+            params.extend([sort_value, last_book_id])
+        params.append(limit + 1) # One extra row tells us whether another page exists
+
+        query = f"""SELECT {cls.LISTING_COLUMNS}, {sort_expr} AS sort_value
+                    FROM books {where_clause}
+                    ORDER BY {sort_expr}, book_id
+                    LIMIT %s"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, tuple(params))
+                    rows = cur.fetchall()
+        except Exception as e:
+            logger.exception("Error fetching catalog page (sort=%s, after=%s): %s", sort, after, e)
+            raise
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        books = cls.from_rows(rows)
+        next_cursor = cls._encode_cursor(rows[-1]["sort_value"], rows[-1]["book_id"]) if has_more else None
+        logger.debug("Fetched catalog page of %d books (sort=%s, more=%s).", len(books), sort, has_more)
+        return books, next_cursor
+
+    @staticmethod
+    def _encode_cursor(sort_value, book_id):
+        """Packs the last row's sort value and ID into an opaque, URL-safe cursor."""
+        payload = json.dumps([str(sort_value), book_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor, sort):
+        """
+        Unpacks a cursor produced by _encode_cursor.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            sort_value, book_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            if not isinstance(book_id, int) or not isinstance(sort_value, str):
+                raise ValueError("Unexpected cursor contents.")
+            if sort == "price":
+                sort_value = Decimal(sort_value)
+            return sort_value, book_id
+        except (ValueError, TypeError, ArithmeticError, binascii.Error, UnicodeError) as e:
+            raise ValueError(f"Invalid catalog cursor: {cursor!r}") from e
 
     def to_dict(self, include_book_description=True):
         """
@@ -264,7 +609,7 @@ class Book:
         if description is not None: fields_to_update['description'] = description
 
         if not fields_to_update:
-            logger.info(f"No fields provided to update for book {self.book_id}.")
+            logger.info("No fields provided to update for book %s.", self.book_id)
             return self # No changes needed
 
         # Construct the SET part of the SQL query dynamically
@@ -277,17 +622,81 @@ class Book:
                 with conn.cursor() as cur:
                     cur.execute(query, tuple(values))
                 conn.commit()
+                publish_book_writes(conn, {self.book_id: fields_to_update})
 
             # Update the instance attributes after successful DB update
             for field, value in fields_to_update.items():
                 setattr(self, field, value)
+            # Later reads in this request must see the new values, not a copy loaded before
+            identity_map_discard(Book, self.book_id)
 
-            logger.info(f"Book {self.book_id} updated successfully. Fields changed: {list(fields_to_update.keys())}")
+            logger.info("Book %s updated successfully. Fields changed: %s", self.book_id, list(fields_to_update.keys()))
             return self
         except Exception as e:
-            logger.exception(f"Error updating book {self.book_id}: {e}")
+            logger.exception("Error updating book %s: %s", self.book_id, e)
             raise # Re-raise the exception
 
     def __repr__(self):
         """String representation for debugging."""
-        return f"<Book(id={self.book_id}, title='{self.title}', stock={self.stock_quantity})>"
\ No newline at end of file
+        return f"<Book(id={self.book_id}, title='{self.title}', stock={self.stock_quantity})>"
+
+
+# --- Catalog Page Cache ---
+# Shared by all threads in this worker. Book writes above invalidate it once committed;
+# pages that merely expired are refreshed in the background (LRUTTLCache.get_or_load).
+# catalog_page_cache.stats() exposes hit, stale hit, miss and refresh counters.
+catalog_page_cache = LRUTTLCache("catalog_pages", CATALOG_PAGE_CACHE_ENTRIES, CATALOG_CACHE_TTL)
+
+
+def invalidate_catalog_caches():
+    """Drops every cached catalog page."""
+    catalog_page_cache.clear()
+
+
+# --- Catalog Change Listeners ---
+# Other in-process consumers of book data (e.g., the search index) register here to
+# apply writes made through this model incrementally instead of reloading everything.
+_catalog_listeners = []
+
+
+def add_catalog_listener(listener):
+    """
+    Registers a function to be called after a book write made through this model commits.
+
+    Args:
+        listener (callable): Called as listener(book_id, changes), where `changes`
+                             maps the written column names to their new values.
+    """
+    _catalog_listeners.append(listener)
+
+
+def publish_book_writes(conn, changes_by_book):
+    """
+    Invalidates the catalog caches and notifies the listeners once `conn` commits.
+
+    Until then other requests can't see the writes, and a rollback means they never
+    happened, so nothing is published before the commit, or at all if it rolls back.
+
+    Args:
+        conn: The connection the writes were made on.
+        changes_by_book (dict[int, dict]): The written columns and their new values, per book_id.
+    """
+    def publish():
+        for book_id, changes in changes_by_book.items():
+            notify_catalog_listeners(book_id, changes)
+        invalidate_catalog_caches()
+
+    after_commit(conn, publish)
+
+
+def notify_catalog_listeners(book_id, changes):
+    """
+    Passes a book write on to every registered listener.
+
+    A failing listener is logged and skipped; it never fails the write itself.
+    """
+    for listener in _catalog_listeners:
+        try:
+            listener(book_id, changes)
+        except Exception:
+            logger.exception("Catalog listener %r failed for book %s.", listener, book_id)
@@ -0,0 +1,334 @@
+# bookstore_app_with_login/app/models/cache.py
+
+"""
+In-process caches used by the models.
+
+Each gunicorn worker keeps its own copy, so the caches trade a bounded amount
+of staleness (their TTL) for skipping database round trips on hot paths.
+Writes made through the models invalidate the local worker's copy immediately.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from logger import logger
+
+_MISSING = object() # Sentinel for "nothing cached yet"
+
+
+class RefreshAheadCache:
+    """
+    Caches a single value produced by a loader function, with a TTL.
+
+    Once the TTL has passed (or the value was invalidated), the old value keeps
+    being served while one background thread reloads it ("stale-while-revalidate"),
+    so requests never wait on the reload. Only a cold cache loads synchronously.
+    """
+    def __init__(self, name, loader, ttl):
+        """
+        Initializes the cache.
+
+        Args:
+            name (str): A short name used in logs and stats.
+            loader (callable): Zero-argument function returning the fresh value.
+                               It should raise on failure rather than return a fallback.
+            ttl (float): Seconds a loaded value is considered fresh. 0 disables caching.
+        """
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock() # Serializes cold (synchronous) loads
+        self._value = _MISSING
+        self._expires_at = 0.0
+        self._generation = 0 # Bumped on every invalidation
+        self._refreshing = False
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "invalidations": 0,
+        }
+
+    def get(self):
+        """
+        Returns the cached value, loading or refreshing it as needed.
+
+        Raises:
+            Exception: Whatever the loader raises on a cold load.
+        """
+        if self.ttl <= 0:
+            return self.loader()
+
+        start_refresh = False
+        with self._lock:
+            value = self._value
+            if value is not _MISSING:
+                if time.monotonic() < self._expires_at:
+                    self._counters["hits"] += 1
+                    return value
+                self._counters["stale_hits"] += 1
+                if not self._refreshing:
+                    self._refreshing = start_refresh = True
+
+        if value is not _MISSING:
+            if start_refresh:
+                threading.Thread(target=self._refresh, name=f"{self.name}-refresh", daemon=True).start()
+            return value
+
+        # Cold cache: load synchronously, letting only one thread hit the database.
+        with self._load_lock:
+            with self._lock:
+                if self._value is not _MISSING:
+                    self._counters["hits"] += 1
+                    return self._value
+                self._counters["misses"] += 1
+                generation = self._generation
+            value = self.loader()
+            self._store(value, generation)
+            return value
+
+    def _store(self, value, generation):
+        with self._lock:
+            self._value = value
+            # A write that happened while we were loading means this value may
+            # already be outdated: keep it, but mark it stale right away.
+            self._expires_at = time.monotonic() + self.ttl if generation == self._generation else 0.0
+
+    def _refresh(self):
+        with self._lock:
+            generation = self._generation
+        try:
+            value = self.loader()
+            self._store(value, generation)
+            with self._lock:
+                self._counters["refreshes"] += 1
+            logger.debug("Cache '%s' refreshed in the background.", self.name)
+        except Exception:
+            with self._lock:
+                self._counters["refresh_failures"] += 1
+            logger.exception("Background refresh of cache '%s' failed; serving stale data.", self.name)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def peek(self):
+        """Returns the cached value (fresh or stale) without loading it, or None if cold."""
+        with self._lock:
+            return None if self._value is _MISSING else self._value
+
+    def invalidate(self):
+        """
+        Marks the cached value as stale. The next read serves it once more and
+        triggers a background reload.
+        """
+        with self._lock:
+            self._expires_at = 0.0
+            self._generation += 1
+            self._counters["invalidations"] += 1
+
+    def clear(self):
+        """Drops the cached value entirely, forcing the next read to load synchronously."""
+        with self._lock:
+            self._value = _MISSING
+            self._expires_at = 0.0
+            self._generation += 1
+
+    def stats(self):
+        """
+        Returns the cache's counters.
+
+        Returns:
+            dict: hits, stale_hits, misses, refreshes, refresh_failures, invalidations,
+                  plus 'cached' (whether a value is held) and 'ttl'.
+        """
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot["cached"] = self._value is not _MISSING
+            snapshot["ttl"] = self.ttl
+        return snapshot
+
+
+class LRUTTLCache:
+    """
+    A bounded key/value cache with least-recently-used eviction and a per-entry TTL.
+
+    `max_entries` caps how many values one worker holds, so memory use stays
+    bounded no matter how many distinct keys are seen.
+
+    A value read from the database just before a write, but stored after the
+    write invalidated the cache, would be served stale for a whole TTL. To avoid
+    that, callers take `generation` before loading and pass it to `put`; values
+    loaded before the latest `invalidate`/`clear` are then not stored.
+
+    `get_or_load` adds refresh-ahead per key: an expired entry is served while one
+    background thread reloads it, like RefreshAheadCache does for a single value.
+    """
+    def __init__(self, name, max_entries, ttl):
+        """
+        Initializes the cache.
+
+        Args:
+            name (str): A short name used in logs and stats.
+            max_entries (int): Maximum number of entries kept. 0 disables caching.
+            ttl (float): Seconds an entry stays valid after it was stored.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # key -> (value, expires_at); most recently used last
+        self._generation = 0 # Bumped on every invalidation
+        self._refreshing = set() # Keys being reloaded in the background
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "outdated_puts": 0,
+        }
+
+    @property
+    def generation(self):
+        """Changes whenever entries are invalidated; see `put`."""
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None if it is missing or expired.
+        """
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the value for `key`, calling `loader()` to load it if it is not cached.
+
+        An expired entry is served once more while one background thread reloads it
+        ("stale-while-revalidate"). Only a key that is missing (never loaded, evicted,
+        or dropped by `invalidate`/`clear` after a write) makes the caller wait.
+
+        Args:
+            key: The cache key.
+            loader (callable): Zero-argument function returning the fresh value.
+                               It should raise on failure rather than return a fallback.
+
+        Raises:
+            Exception: Whatever the loader raises on a synchronous load.
+        """
+        if self.max_entries <= 0:
+            return loader()
+
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+            else:
+                value, expires_at = entry
+                self._entries.move_to_end(key)
+                if time.monotonic() < expires_at:
+                    self._counters["hits"] += 1
+                    return value
+                self._counters["stale_hits"] += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+
+        if entry is not None:
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(key, loader, generation),
+                                 name=f"{self.name}-refresh", daemon=True).start()
+            return value
+
+        value = loader()
+        self.put(key, value, generation)
+        return value
+
+    def _refresh(self, key, loader, generation):
+        try:
+            value = loader()
+            self.put(key, value, generation)
+            with self._lock:
+                self._counters["refreshes"] += 1
+            logger.debug("Cache '%s' refreshed %r in the background.", self.name, key)
+        except Exception:
+            with self._lock:
+                self._counters["refresh_failures"] += 1
+            logger.exception("Background refresh of %r in cache '%s' failed; serving stale data.", key, self.name)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def put(self, key, value, generation=None):
+        """
+        Stores `value` under `key`, evicting the least recently used entries if full.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            generation (int, optional): `generation` as read before `value` was loaded.
+                If the cache has been invalidated since, `value` may predate that
+                write and is dropped.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self._counters["outdated_puts"] += 1
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key):
+        """Removes `key` from the cache (e.g., after the underlying row was written)."""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(key, None) is not None:
+                self._counters["invalidations"] += 1
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache's counters.
+
+        Returns:
+            dict: hits, stale_hits, misses, refreshes, refresh_failures, expirations,
+                  evictions, invalidations, outdated_puts, plus the current 'size' and
+                  the configured 'max_entries' and 'ttl'.
+        """
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot["size"] = len(self._entries)
+            snapshot["max_entries"] = self.max_entries
+            snapshot["ttl"] = self.ttl
+        return snapshot
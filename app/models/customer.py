@@ -1,8 +1,26 @@
 # bookstore_app_with_login/app/models/customer.py
 
+import os
+from psycopg2 import errors
 from flask_login import UserMixin # Provides default implementations for Flask-Login
 from logger import logger
-from app.models.db import get_db_connection # Function to get DB connection
+from app.models.db import get_db_connection, identity_map_get, identity_map_put, identity_map_discard # DB connection and per-request identity map
+from app.models.cache import LRUTTLCache # Per-worker cache of logged-in customers
+from app.auth_exceptions import UserAlreadyExists
+
+# --- Session User Cache Configuration ---
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024")) # Customers kept per worker (0 = off)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300")) # Seconds before a cached customer is reloaded
+
+# Unique indexes on customers.email: the case-insensitive one and the older exact-match one
+EMAIL_UNIQUE_CONSTRAINTS = ("unique_lower_email", "customers_email_key")
+
+
+def is_duplicate_email_error(error):
+    """Tells whether a database error is a unique violation on a customer's email."""
+    return (isinstance(error, errors.UniqueViolation)
+            and getattr(error.diag, "constraint_name", None) in EMAIL_UNIQUE_CONSTRAINTS)
+
 
 class Customer(UserMixin):
     """
@@ -110,6 +128,11 @@ class Customer(UserMixin):
         Returns:
             Customer | None: A Customer object if found, otherwise None.
         """
+        # Reuse the instance if this request already loaded the row (e.g., in load_user)
+        customer = identity_map_get(cls, customer_id)
+        if customer is not None:
+            return customer
+
         query = "SELECT * FROM customers WHERE customer_id = %s"
         try:
             with get_db_connection() as conn:
@@ -118,12 +141,13 @@ class Customer(UserMixin):
                     row = cur.fetchone() # Returns dict or None
             customer = cls.from_row(row)
             if customer:
-                 logger.debug(f"Customer found for ID: {customer_id}")
+                 identity_map_put(cls, customer.customer_id, customer)
+                 logger.debug("Customer found for ID: %s", customer_id)
             else:
-                 logger.warning(f"No customer found for ID: {customer_id}")
+                 logger.warning("No customer found for ID: %s", customer_id)
             return customer
         except Exception as e:
-            logger.exception(f"Error fetching customer by ID {customer_id}: {e}")
+            logger.exception("Error fetching customer by ID %s: %s", customer_id, e)
             return None # Return None on database error
 
     @classmethod
@@ -150,12 +174,13 @@ class Customer(UserMixin):
                     row = cur.fetchone()
             customer = cls.from_row(row)
             if customer:
-                logger.debug(f"Customer found for email: {normalized_email}")
+                identity_map_put(cls, customer.customer_id, customer)
+                logger.debug("Customer found for email: %s", normalized_email)
             else:
-                logger.warning(f"No customer found for email: {normalized_email}")
+                logger.warning("No customer found for email: %s", normalized_email)
             return customer
         except Exception as e:
-            logger.exception(f"Error fetching customer by email {normalized_email}: {e}")
+            logger.exception("Error fetching customer by email %s: %s", normalized_email, e)
             return None # Return None on database error
 
     # --- Instance Methods ---
@@ -166,11 +191,18 @@ class Customer(UserMixin):
         Assumes `self.customer_id` is None before saving.
         Updates `self.customer_id` with the ID generated by the database.
 
+        Duplicate emails are detected by the insert itself (the unique_lower_email
+        index), so there is no separate lookup and no window for two registrations
+        of the same address to both succeed. When two registrations race, the loser
+        may instead fail on customers_email_key, which ON CONFLICT can't also target;
+        that is reported as a duplicate too.
+
         Raises:
+            UserAlreadyExists: If a customer with this email (in any letter case) exists.
             Exception: If the database insertion fails.
         """
         if self.customer_id is not None:
-            logger.error(f"Attempted to save customer {self.email} which already has ID {self.customer_id}.")
+            logger.error("Attempted to save customer %s which already has ID %s.", self.email, self.customer_id)
             raise ValueError("Cannot save a customer that already has an ID. Use an update method instead.")
 
         insert_query = """
@@ -178,6 +210,7 @@ class Customer(UserMixin):
                                    first_name, last_name, address_line1, address_line2,
                                    city, state, zip_code, created_at)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (lower(email)) DO NOTHING -- unique_lower_email
             RETURNING customer_id;
         """
         # Combine first/last name if 'name' wasn't explicitly provided
@@ -186,26 +219,68 @@ class Customer(UserMixin):
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cur:
-                    cur.execute(insert_query, (
-                        calculated_name, self.email, self.phone_number, self.password,
-                        self.first_name, self.last_name,
-                        self.address_line1, self.address_line2, self.city,
-                        self.state, self.zip_code
-                    ))
-                    # Fetch the newly generated customer_id
+                    try:
+                        cur.execute(insert_query, (
+                            calculated_name, self.email, self.phone_number, self.password,
+                            self.first_name, self.last_name,
+                            self.address_line1, self.address_line2, self.city,
+                            self.state, self.zip_code
+                        ))
+                    except errors.UniqueViolation as e:
+                        if not is_duplicate_email_error(e):
+                            raise
+                        raise UserAlreadyExists(self.email) from e
+                    # Fetch the newly generated customer_id; no row means the email was taken
                     result = cur.fetchone()
-                    if result and result['customer_id']:
-                        self.customer_id = result['customer_id']
-                        logger.info(f"Customer '{self.email}' saved successfully with ID {self.customer_id}")
-                    else:
-                        # This case should ideally not happen with RETURNING clause if insert worked
-                        raise Exception("Failed to retrieve customer_id after insert.")
+                    if result is None:
+                        raise UserAlreadyExists(self.email)
+                    self.customer_id = result['customer_id']
+                    logger.info("Customer '%s' saved successfully with ID %s", self.email, self.customer_id)
                 conn.commit() # Commit the transaction
+            principal_cache.invalidate(self.customer_id) # Never serve a cached copy of a written row
+        except UserAlreadyExists:
+            logger.warning("Registration attempt with existing email: %s", self.email)
+            raise
         except Exception as e:
-            logger.exception(f"Error saving customer '{self.email}' to database: {e}")
+            logger.exception("Error saving customer '%s' to database: %s", self.email, e)
             # Consider rolling back if part of a larger transaction elsewhere
             raise # Re-raise the exception
 
+    def update_password_hash(self, new_hash):
+        """
+        Replaces the customer's stored password hash (e.g., to upgrade its algorithm).
+
+        The update only applies if the stored hash is still the one this instance
+        holds, so a password changed concurrently is never overwritten.
+
+        Args:
+            new_hash (str): The new werkzeug password hash.
+
+        Returns:
+            bool: True if the hash was replaced, False if the stored hash had changed.
+
+        Raises:
+            Exception: If the database update fails.
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE customers SET password = %s WHERE customer_id = %s AND password = %s;",
+                        (new_hash, self.customer_id, self.password)
+                    )
+                    updated = cur.rowcount == 1
+                conn.commit()
+        except Exception as e:
+            logger.exception("Error updating password hash for customer %s: %s", self.customer_id, e)
+            raise
+
+        principal_cache.invalidate(self.customer_id) # Drop the copy holding the old hash
+        identity_map_discard(Customer, self.customer_id) # Also any other copy loaded in this request
+        if updated:
+            self.password = new_hash
+        return updated
+
     def get_full_name(self):
         """
         Returns the customer's full name, prioritizing first and last names.
@@ -252,4 +327,10 @@ class Customer(UserMixin):
 
     def __repr__(self):
         """String representation for debugging purposes."""
-        return f"<Customer(id={self.customer_id}, email='{self.email}')>"
\ No newline at end of file
+        return f"<Customer(id={self.customer_id}, email='{self.email}')>"
+
+
+# --- Session User Cache ---
+# Customers loaded by Flask-Login's user_loader, keyed by customer_id. Bounded by
+# USER_CACHE_MAX_ENTRIES per worker; methods that write a customer row invalidate it.
+principal_cache = LRUTTLCache("customers", USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
@@ -1,46 +1,717 @@
-# bookstore_app_with_login/app/models/db.py
-
-import os
-import psycopg2 # PostgreSQL adapter for Python
-from psycopg2.extras import DictCursor # Allows accessing columns by name (like dictionaries)
-from logger import logger # Import the custom logger
-
-def get_db_connection():
-    """
-    Establishes and returns a connection to the PostgreSQL database.
-
-    Reads the connection string from the DATABASE_URL environment variable.
-    Uses DictCursor to return rows as dictionary-like objects.
-
-    Raises:
-        ValueError: If the DATABASE_URL environment variable is not set.
-        psycopg2.Error: If any database connection error occurs.
-
-    Returns:
-        psycopg2.connection: A database connection object, or raises an error.
-    """
-    database_url = os.getenv("DATABASE_URL")
-
-    if not database_url:
-        logger.error("DATABASE_URL environment variable is not set.")
-        raise ValueError("Database connection configuration is missing (DATABASE_URL not set).")
-
-    try:
-        # Establish the connection using the URL and specify DictCursor
-        conn = psycopg2.connect(dsn=database_url, cursor_factory=DictCursor)
-        logger.debug("Database connection established successfully.")
-        return conn
-
-    except psycopg2.OperationalError as e:
-        # Handle specific connection errors (e.g., bad hostname, database doesn't exist)
-        logger.exception(f"Failed to establish database connection: {e}")
-        # Re-raise the specific psycopg2 error for potentially more specific handling upstream
-        raise
-    except Exception as e:
-        # Catch any other unexpected exceptions during connection
-        logger.exception("An unexpected error occurred while connecting to the database.")
-        raise # Re-raise the generic exception
-
-# Note: It's the responsibility of the calling function to close the connection
-# when done, typically using a 'with' statement or explicit 'conn.close()'.
-# The 'with get_db_connection() as conn:' pattern handles this automatically.
\ No newline at end of file
+# bookstore_app_with_login/app/models/db.py
+
+import os
+import threading
+import time
+from collections import Counter, deque
+import psycopg2 # PostgreSQL adapter for Python
+from psycopg2 import extensions
+from psycopg2.extras import DictCursor # Allows accessing columns by name (like dictionaries)
+from psycopg2.pool import PoolError
+from flask import g, has_request_context, request # Request-scoped storage for the shared connection
+from logger import logger # Import the custom logger
+
+# --- Pool Configuration ---
+# Every gunicorn worker process keeps its own pool. These values can be tuned
+# per deployment through environment variables.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))  # Connections opened when the pool is created
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))  # Hard cap on open connections per worker
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))  # Seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # Seconds before a connection is recycled
+DB_POOL_HEALTH_CHECK = os.getenv("DB_POOL_HEALTH_CHECK", "true").lower() in ("1", "true", "yes")
+# Only connections that sat idle longer than this are pinged on checkout (0 = ping every checkout).
+DB_POOL_HEALTH_CHECK_IDLE = float(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", "30"))
+
+# --- Query Instrumentation ---
+# Count every request's queries, DB time and connection checkouts, and report them
+# in a Server-Timing response header and a debug log line.
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "false").lower() in ("1", "true", "yes")
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "0")) # Max queries per request (0 = no limit)
+# Max times one statement may run per request before it looks like an N+1 (0 = no limit).
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "0"))
+SQL_BUDGET_ACTION = os.getenv("SQL_BUDGET_ACTION", "warn").lower() # 'warn' or 'raise'
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no pooled connection becomes available within the acquire timeout."""
+    pass
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised (with SQL_BUDGET_ACTION=raise) when a request runs too many or too repetitive queries."""
+    pass
+
+
+class SqlStats:
+    """The database work done by one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0 # Seconds spent in execute() calls
+        self.checkouts = 0 # Connections taken from the pool
+        self.connects = 0 # New physical connections opened
+        self.statements = Counter() # SQL text (without parameters) -> executions
+        self.flagged = set() # Budget problems already reported for this request
+
+    def record(self, statement, elapsed, enforce=True):
+        """Counts one executed statement and, if `enforce`, checks the query budget."""
+        self.queries += 1
+        self.duration += elapsed
+        self.statements[statement] += 1
+        if not enforce:
+            return
+
+        if SQL_QUERY_BUDGET and self.queries > SQL_QUERY_BUDGET and "budget" not in self.flagged:
+            self._exceeded("budget", f"{request.method} {request.path} ran more than {SQL_QUERY_BUDGET} queries.")
+        repeats = self.statements[statement]
+        if SQL_REPEAT_THRESHOLD and repeats > SQL_REPEAT_THRESHOLD and statement not in self.flagged:
+            self._exceeded(statement, f"{request.method} {request.path} ran the same statement more than "
+                                      f"{SQL_REPEAT_THRESHOLD} times (possible N+1): {' '.join(statement.split())[:300]}")
+
+    def _exceeded(self, key, message):
+        self.flagged.add(key) # Report each problem once per request
+        if SQL_BUDGET_ACTION == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def most_repeated(self):
+        """Returns (statement, count) for the statement run most often, or (None, 0)."""
+        return self.statements.most_common(1)[0] if self.statements else (None, 0)
+
+    def server_timing(self):
+        """Returns the Server-Timing header value describing this request's database work."""
+        return (f'db;dur={self.duration * 1000:.2f};desc="{self.queries} queries, '
+                f'{self.checkouts} checkouts, {self.connects} connects"')
+
+
+def _current_sql_stats():
+    """Returns the current request's SqlStats, or None outside an instrumented request."""
+    return g.get("_sql_stats") if has_request_context() else None
+
+
+class InstrumentedCursor(DictCursor):
+    """A DictCursor that records every statement in the current request's SqlStats."""
+
+    def _statement_text(self, query):
+        if isinstance(query, bytes):
+            return query.decode("utf-8", "replace")
+        if not isinstance(query, str):
+            return query.as_string(self.connection) # psycopg2.sql.Composable
+        return query
+
+    def _timed(self, method, query, args):
+        stats = _current_sql_stats()
+        if stats is None:
+            return method(query, args)
+        started = time.perf_counter()
+        try:
+            result = method(query, args)
+        except Exception:
+            # Count the failed statement, but let its own error propagate
+            stats.record(self._statement_text(query), time.perf_counter() - started, enforce=False)
+            raise
+        stats.record(self._statement_text(query), time.perf_counter() - started)
+        return result
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+
+class ConnectionPool:
+    """
+    A thread-safe, bounded pool of psycopg2 connections.
+
+    Connections are opened lazily up to `max_size`, recycled once they are older
+    than `max_lifetime`, and optionally pinged on checkout if they have been idle
+    for a while. Callers that cannot get a connection within `acquire_timeout`
+    receive a PoolTimeoutError instead of queueing forever.
+    """
+    def __init__(self, dsn, min_size=1, max_size=10, acquire_timeout=5.0,
+                 max_lifetime=1800.0, health_check=True, health_check_idle=30.0):
+        """
+        Initializes the pool and opens `min_size` connections up front.
+
+        Args:
+            dsn (str): The PostgreSQL connection string.
+            min_size (int): Number of connections to open when the pool is created.
+            max_size (int): Maximum number of open connections (idle + in use).
+            acquire_timeout (float): Seconds to wait for a connection before giving up.
+            max_lifetime (float): Seconds after which a connection is closed instead of reused.
+            health_check (bool): Whether to ping idle connections on checkout.
+            health_check_idle (float): Minimum idle time (seconds) before a ping is issued.
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool sizing: min_size={min_size}, max_size={max_size}.")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check = health_check
+        self.health_check_idle = health_check_idle
+
+        self._cond = threading.Condition()
+        self._idle = deque() # (connection, returned_at) pairs; used as a LIFO stack
+        self._created_at = {} # id(connection) -> monotonic creation time
+        self._size = 0 # Open connections, including slots reserved for connects in progress
+        self._in_use = 0
+        self._counters = {
+            "checkouts": 0,
+            "connects": 0,
+            "closes": 0,
+            "health_check_failures": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+
+    # --- Internal Helpers ---
+
+    def _connect(self):
+        """Opens a new physical connection. Called without holding the pool lock."""
+        try:
+            conn = psycopg2.connect(dsn=self.dsn,
+                                    cursor_factory=InstrumentedCursor if SQL_INSTRUMENTATION else DictCursor)
+        except psycopg2.OperationalError as e:
+            # Handle specific connection errors (e.g., bad hostname, database doesn't exist)
+            logger.exception("Failed to establish database connection: %s", e)
+            raise
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._counters["connects"] += 1
+        stats = _current_sql_stats()
+        if stats is not None:
+            stats.connects += 1
+        logger.debug("Database connection established successfully.")
+        return conn
+
+    def _is_expired(self, conn):
+        created = self._created_at.get(id(conn))
+        return created is None or (self.max_lifetime > 0 and time.monotonic() - created > self.max_lifetime)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            logger.debug("Ignoring error while closing pooled connection.", exc_info=True)
+
+    def _discard(self, conn):
+        """Closes a checked-out connection and frees its slot."""
+        self._close_quietly(conn)
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._in_use -= 1
+            self._counters["closes"] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn):
+        """Pings the server with a trivial query; returns False if the connection is unusable."""
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback() # Leave the connection idle (outside a transaction)
+            return True
+        except Exception:
+            logger.warning("Discarding pooled connection that failed its health check.")
+            with self._cond:
+                self._counters["health_check_failures"] += 1
+            return False
+
+    def _checkout_or_reserve(self, deadline):
+        """
+        Pops a reusable idle connection, or reserves a slot for a new one.
+
+        Returns:
+            tuple: (connection, idle_seconds) for a reused connection, or (None, None)
+                   when the caller should open a new connection in the reserved slot.
+
+        Raises:
+            PoolTimeoutError: If the pool stays exhausted until `deadline`.
+        """
+        with self._cond:
+            while True:
+                while self._idle:
+                    conn, returned_at = self._idle.pop()
+                    if conn.closed or self._is_expired(conn):
+                        self._close_quietly(conn)
+                        self._created_at.pop(id(conn), None)
+                        self._size -= 1
+                        self._counters["closes"] += 1
+                        continue
+                    self._in_use += 1
+                    return conn, time.monotonic() - returned_at
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._in_use += 1
+                    return None, None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    logger.warning("Connection pool exhausted: no connection available after %ss.", self.acquire_timeout)
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                        f"(max_size={self.max_size}, in_use={self._in_use})."
+                    )
+                self._cond.wait(remaining)
+
+    # --- Public API ---
+
+    def getconn(self):
+        """
+        Checks a connection out of the pool, opening a new one if allowed.
+
+        Returns:
+            psycopg2.connection: A connection with no transaction in progress.
+
+        Raises:
+            PoolTimeoutError: If no connection is available within the acquire timeout.
+            psycopg2.Error: If a new connection cannot be established.
+        """
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        while True:
+            conn, idle_for = self._checkout_or_reserve(deadline)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            elif (self.health_check and idle_for >= self.health_check_idle
+                  and not self._is_healthy(conn)):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._counters["checkouts"] += 1
+                self._counters["wait_time_total"] += waited
+                self._counters["wait_time_max"] = max(self._counters["wait_time_max"], waited)
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Returns a connection to the pool.
+
+        Any open transaction is rolled back first. Broken, expired, or explicitly
+        discarded connections are closed instead of being reused.
+
+        Args:
+            conn (psycopg2.connection): A connection previously obtained from `getconn`.
+            discard (bool): If True, close the connection rather than reusing it.
+        """
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        if discard or conn.closed or self._is_expired(conn):
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        """Closes every idle connection. Checked-out connections are closed when returned."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._created_at.pop(id(conn), None)
+                self._size -= 1
+                self._counters["closes"] += 1
+
+    def stats(self):
+        """
+        Returns a snapshot of pool usage, useful for sizing the pool.
+
+        Returns:
+            dict: Current sizes (size, idle, in_use, min_size, max_size) and cumulative
+                  counters (checkouts, connects, closes, timeouts, wait times, ...).
+        """
+        with self._cond:
+            snapshot = dict(self._counters)
+            snapshot.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        return snapshot
+
+
+class PooledConnection:
+    """
+    A checked-out connection that goes back to the pool when it is closed.
+
+    Behaves like a psycopg2 connection (attribute access is delegated), including
+    the `with get_db_connection() as conn:` pattern: leaving the block commits on
+    success or rolls back on error, and then returns the connection to the pool.
+    Work that must only happen once a write is durable (e.g., updating in-process
+    caches) can be registered with `after_commit`.
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._after_commit = [] # Callbacks waiting for the current transaction to commit
+
+    @property
+    def raw(self):
+        """The underlying psycopg2 connection."""
+        if self._conn is None:
+            raise psycopg2.InterfaceError("Connection has already been returned to the pool.")
+        return self._conn
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+        return False # Never swallow exceptions
+
+    def after_commit(self, callback):
+        """
+        Runs `callback()` once the current transaction commits.
+
+        If no transaction is open, the callback runs right away. If the transaction
+        rolls back, or the connection is released without committing, it never runs.
+
+        Args:
+            callback (callable): A zero-argument function. Errors it raises are logged,
+                                 never propagated to the code that committed.
+        """
+        if self.raw.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE:
+            _run_callbacks([callback])
+        else:
+            self._after_commit.append(callback)
+
+    def commit(self):
+        """Commits the transaction, then runs the callbacks registered with `after_commit`."""
+        callbacks, self._after_commit = self._after_commit, []
+        self.raw.commit()
+        _run_callbacks(callbacks)
+
+    def rollback(self):
+        """Rolls back the transaction and drops the callbacks registered with `after_commit`."""
+        self._after_commit = []
+        self.raw.rollback()
+
+    def close(self):
+        """Returns the connection to the pool. Safe to call more than once."""
+        self._after_commit = [] # Uncommitted work is rolled back by the pool
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn)
+
+
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("After-commit callback %r failed.", callback)
+
+
+def after_commit(conn, callback):
+    """
+    Runs `callback()` once `conn`'s current transaction commits.
+
+    Connections from get_db_connection() defer the callback until commit (and drop
+    it on rollback). A bare psycopg2 connection has no commit hook, so the callback
+    runs immediately.
+
+    Args:
+        conn: A connection from get_db_connection(), or a psycopg2 connection.
+        callback (callable): A zero-argument function.
+    """
+    if isinstance(conn, PooledConnection):
+        conn.after_commit(callback)
+    else:
+        _run_callbacks([callback])
+
+
+class RequestConnection(PooledConnection):
+    """
+    The single connection shared by every model call made during one Flask request.
+
+    `with` blocks only commit or roll back if they started the transaction
+    themselves, so a model method called in the middle of a larger unit of work
+    (e.g., order creation) never commits that work early. `close()` is a no-op;
+    the connection goes back to the pool when the request's app context ends.
+    """
+    def __init__(self, pool, conn):
+        super().__init__(pool, conn)
+        self._owns_transaction = [] # One flag per open `with` block (innermost last)
+
+    def __enter__(self):
+        status = self.raw.info.transaction_status
+        self._owns_transaction.append(status == extensions.TRANSACTION_STATUS_IDLE)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        owns_transaction = self._owns_transaction.pop()
+        if owns_transaction and not self.closed:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        return False # Never swallow exceptions
+
+    def close(self):
+        """No-op: the connection is released automatically when the request ends."""
+        pass
+
+    def release(self):
+        """Returns the connection to the pool, rolling back any uncommitted work."""
+        super().close()
+
+
+# --- Per-Worker Pool ---
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the connection pool for the current process, creating it on first use.
+
+    The pool is keyed by process ID so that gunicorn workers forked from a parent
+    never share sockets with each other.
+
+    Raises:
+        ValueError: If the DATABASE_URL environment variable is not set.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            database_url = os.getenv("DATABASE_URL")
+            if not database_url:
+                logger.error("DATABASE_URL environment variable is not set.")
+                raise ValueError("Database connection configuration is missing (DATABASE_URL not set).")
+
+            _pool = ConnectionPool(
+                database_url,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                health_check=DB_POOL_HEALTH_CHECK,
+                health_check_idle=DB_POOL_HEALTH_CHECK_IDLE,
+            )
+            _pool_pid = pid
+            logger.info("Database connection pool created (min=%s, max=%s) for worker %s.", DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, pid)
+    return _pool
+
+
+def get_pool_stats():
+    """
+    Returns usage statistics for this worker's pool.
+
+    Returns:
+        dict: The pool's `stats()` snapshot, or an empty dict if no pool exists yet.
+    """
+    if _pool is None or _pool_pid != os.getpid():
+        return {}
+    return _pool.stats()
+
+
+def close_pool():
+    """Closes all idle connections in this worker's pool (e.g., at shutdown)."""
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.closeall()
+
+
+def get_db_connection():
+    """
+    Returns a connection to the PostgreSQL database.
+
+    Inside a Flask request, every call returns the same request-scoped connection,
+    checked out from the pool on first use and released when the request ends.
+    Outside a request (scripts, background threads), a connection is checked out
+    from the worker's pool for the caller alone.
+
+    Reads the connection string from the DATABASE_URL environment variable.
+    Uses DictCursor to return rows as dictionary-like objects.
+
+    Raises:
+        ValueError: If the DATABASE_URL environment variable is not set.
+        PoolTimeoutError: If the pool is exhausted for longer than the acquire timeout.
+        psycopg2.Error: If any database connection error occurs.
+
+    Returns:
+        PooledConnection: A connection wrapper that is returned to the pool when
+                          closed or when its `with` block ends (or, for the
+                          request-scoped RequestConnection, when the request ends).
+    """
+    try:
+        if has_request_context():
+            conn = g.get("_db_conn")
+            if conn is None or conn.closed:
+                if conn is not None:
+                    conn.release() # The server dropped it; free its pool slot before replacing it
+                    g.pop("_db_conn", None)
+                pool = get_pool()
+                conn = RequestConnection(pool, pool.getconn())
+                g._db_conn = conn
+                _count_checkout()
+            return conn
+
+        pool = get_pool()
+        conn = PooledConnection(pool, pool.getconn())
+        _count_checkout() # Background threads started by a request have no request context
+        return conn
+    except (ValueError, PoolError, psycopg2.OperationalError):
+        # Already logged where they were raised; re-raise for handling upstream
+        raise
+    except Exception as e:
+        # Catch any other unexpected exceptions during connection
+        logger.exception("An unexpected error occurred while connecting to the database.")
+        raise # Re-raise the generic exception
+
+# Note: It's the responsibility of the calling function to release the connection
+# when done, either with a 'with get_db_connection() as conn:' block or an explicit
+# 'conn.close()'. Both hand the connection back to the pool instead of closing it.
+
+
+def release_request_connection(exception=None):
+    """
+    Teardown callback that returns the request-scoped connection to the pool
+    and drops the request's identity map.
+    """
+    conn = g.pop("_db_conn", None)
+    g.pop("_identity_map", None)
+    if conn is not None:
+        try:
+            conn.release()
+        except Exception:
+            logger.exception("Error releasing request-scoped database connection.")
+
+
+def _count_checkout():
+    stats = _current_sql_stats()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+def _start_sql_stats():
+    g._sql_stats = SqlStats()
+
+
+def _report_sql_stats(response):
+    """Adds the Server-Timing header and logs the request's database work at DEBUG."""
+    stats = g.get("_sql_stats")
+    if stats is None:
+        return response
+    response.headers.add("Server-Timing", stats.server_timing())
+    statement, repeats = stats.most_repeated()
+    logger.debug("%s %s: %d queries in %.1f ms, %d connection checkouts, %d new connections; "
+                 "most repeated statement ran %dx: %s", request.method, request.path, stats.queries,
+                 stats.duration * 1000, stats.checkouts, stats.connects, repeats,
+                 " ".join(statement.split())[:200] if statement else "-")
+    return response
+
+
+def get_request_sql_stats():
+    """
+    Returns the current request's database work so far.
+
+    Returns:
+        SqlStats | None: The stats, or None outside a request or with SQL_INSTRUMENTATION off.
+    """
+    return _current_sql_stats()
+
+
+def init_db(app):
+    """
+    Registers the request-scoped connection teardown with the Flask app, and the
+    per-request query instrumentation when SQL_INSTRUMENTATION is on.
+    """
+    app.teardown_appcontext(release_request_connection)
+    if SQL_INSTRUMENTATION:
+        app.before_request(_start_sql_stats)
+        app.after_request(_report_sql_stats)
+
+
+# --- Per-Request Identity Map ---
+# Keeps one model instance per (model class, primary key) for the duration of a
+# request, so the same row is only loaded once no matter how many layers ask for it.
+# Outside a request these helpers do nothing.
+
+def identity_map_get(model, key):
+    """
+    Returns the instance of `model` with primary key `key` already loaded in this request.
+
+    Returns:
+        object | None: The cached instance, or None if it hasn't been loaded yet.
+    """
+    if not has_request_context():
+        return None
+    identity_map = g.get("_identity_map")
+    return identity_map.get((model, key)) if identity_map else None
+
+
+def identity_map_put(model, key, instance):
+    """Records `instance` as the loaded copy of `model` row `key` for this request."""
+    if not has_request_context() or instance is None:
+        return
+    identity_map = g.get("_identity_map")
+    if identity_map is None:
+        identity_map = g._identity_map = {}
+    identity_map[(model, key)] = instance
+
+
+def identity_map_discard(model, key):
+    """Forgets any loaded copy of `model` row `key` (e.g., after it was written)."""
+    if has_request_context():
+        identity_map = g.get("_identity_map")
+        if identity_map:
+            identity_map.pop((model, key), None)
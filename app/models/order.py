@@ -6,6 +6,7 @@ from logger import logger
 from app.models.db import get_db_connection
 from app.models.order_item import OrderItem
 from app.models.book import Book # Needed to resolve item details
+from app.models.customer import Customer # Needed to format the customer's name and address
 
 class Order:
     """
@@ -54,6 +55,9 @@ class Order:
         Saves the order header and all associated items to the database
         within a single transaction managed by the provided connection.
 
+        The header and every item are written by one statement (a data-modifying
+        CTE), so a cart of any size costs a single round trip.
+
         Args:
             conn (psycopg2.connection): An active database connection. The caller
                                         is responsible for committing or rolling back.
@@ -65,35 +69,55 @@ class Order:
             Exception: If saving the order header or any item fails.
         """
         if self.order_id is not None:
-            logger.error(f"Attempted to save order which already has ID {self.order_id}.")
+            logger.error("Attempted to save order which already has ID %s.", self.order_id)
             raise ValueError("Cannot save an order that already has an ID.")
         if not self.items:
-            logger.warning(f"Attempted to save order for customer {self.customer_id} with no items.")
+            logger.warning("Attempted to save order for customer %s with no items.", self.customer_id)
             raise ValueError("Cannot save an order with no items.")
 
+        # Items are inserted in cart order, so their serial IDs come back in the same order.
+        query = """
+            WITH new_order AS (
+                INSERT INTO orders (customer_id, order_date, total_amount)
+                VALUES (%s, %s, %s)
+                RETURNING order_id
+            ),
+            new_items AS (
+                INSERT INTO order_items (order_id, book_id, quantity)
+                SELECT new_order.order_id, i.book_id, i.quantity
+                  FROM new_order,
+                       unnest(%s::int[], %s::int[]) WITH ORDINALITY AS i(book_id, quantity, position)
+                 ORDER BY i.position
+                RETURNING order_item_id
+            )
+            SELECT new_order.order_id,
+                   (SELECT array_agg(order_item_id ORDER BY order_item_id) FROM new_items) AS order_item_ids
+              FROM new_order;
+        """
         try:
             with conn.cursor() as cur:
-                # 1. Insert the order header
-                cur.execute(
-                    """
-                    INSERT INTO orders (customer_id, order_date, total_amount)
-                    VALUES (%s, %s, %s) RETURNING order_id;
-                    """,
-                    (self.customer_id, self.order_date, self.total_amount)
-                )
+                cur.execute(query, (
+                    self.customer_id, self.order_date, self.total_amount,
+                    [item.book_id for item in self.items],
+                    [item.quantity for item in self.items]
+                ))
                 result = cur.fetchone()
                 if not result or not result['order_id']:
                     raise Exception("Failed to create order header or retrieve order_id.")
-                self.order_id = result['order_id'] # Assign the generated ID back to the object
+                order_item_ids = result['order_item_ids'] or []
+                if len(order_item_ids) != len(self.items):
+                    raise Exception(f"Expected {len(self.items)} order items to be inserted, got {len(order_item_ids)}.")
 
-                # 2. Insert each order item, linking it to the new order_id
-                for item in self.items:
-                    item.save(conn, self.order_id) # Call save on the OrderItem instance
+                self.order_id = result['order_id'] # Assign the generated ID back to the object
+                # Link each item to the new order and its generated ID
+                for item, order_item_id in zip(self.items, order_item_ids):
+                    item.order_id = self.order_id
+                    item.order_item_id = order_item_id
 
-            logger.info(f"Order {self.order_id} and its {len(self.items)} items saved successfully to DB (pending commit).")
+            logger.info("Order %s and its %d items saved successfully to DB (pending commit).", self.order_id, len(self.items))
             return self.order_id # Return the new order ID
         except Exception as e:
-            logger.exception(f"Error saving order for customer {self.customer_id}: {e}")
+            logger.exception("Error saving order for customer %s: %s", self.customer_id, e)
             # The caller (service layer) should handle rollback
             raise # Re-raise the exception
 
@@ -123,7 +147,7 @@ class Order:
                 order_row = cur.fetchone()
 
                 if not order_row:
-                    logger.warning(f"Order with ID {order_id} not found in database.")
+                    logger.warning("Order with ID %s not found in database.", order_id)
                     return None # Order doesn't exist
 
                 # Create the Order object
@@ -152,12 +176,106 @@ class Order:
                     # order_item.order_item_id = item_row["order_item_id"]
                     order.add_item(order_item)
 
-            logger.info(f"Order {order_id} loaded successfully with {len(order.items)} items.")
+            logger.debug("Order %s loaded successfully with %d items.", order_id, len(order.items))
             return order
         except Exception as e:
-            logger.exception(f"Error loading order ID {order_id} from database: {e}")
+            logger.exception("Error loading order ID %s from database: %s", order_id, e)
             return None # Return None on error
 
+    @classmethod
+    def load_confirmation(cls, order_id, conn=None):
+        """
+        Loads everything an order confirmation needs with a single query.
+
+        The order header, its items joined to their books, and the customer's
+        name and address are fetched together, instead of loading the order,
+        the customer and each book separately.
+
+        Args:
+            order_id (int): The ID of the order to load.
+            conn (psycopg2.connection, optional): An active database connection to use.
+                                                  If omitted, one is obtained here.
+
+        Returns:
+            dict | None: The confirmation details, or None if the order doesn't exist:
+                         {
+                             "id": 123,
+                             "customer_id": 7,
+                             "customer_name": "Jane Doe",
+                             "shipping_address": "123 Main St, Anytown, Ca, 90210",
+                             "total": Decimal('59.97'),
+                             "created_at": "2024-01-15",
+                             "items": [{"book_id": 1, "title": "...", "price": 19.99,
+                                        "quantity": 1, "subtotal": 19.99}, ...]
+                         }
+
+        Raises:
+            Exception: If the database query fails.
+        """
+        query = """
+            SELECT o.order_id, o.customer_id, o.order_date, o.total_amount,
+                   c.name, c.first_name, c.last_name,
+                   c.address_line1, c.address_line2, c.city, c.state, c.zip_code,
+                   oi.book_id, oi.quantity, b.title, b.price
+              FROM orders o
+              JOIN customers c ON c.customer_id = o.customer_id
+              LEFT JOIN order_items oi ON oi.order_id = o.order_id
+              LEFT JOIN books b ON b.book_id = oi.book_id
+             WHERE o.order_id = %s
+             ORDER BY oi.order_item_id;
+        """
+        if conn is not None:
+            with conn.cursor() as cur:
+                cur.execute(query, (order_id,))
+                rows = cur.fetchall()
+        else:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query, (order_id,))
+                    rows = cur.fetchall()
+
+        if not rows:
+            logger.warning("Order with ID %s not found in database.", order_id)
+            return None
+
+        header = rows[0]
+        # Only the name and address columns were selected; that's all the formatting needs.
+        customer = Customer.from_row(header)
+
+        items = []
+        for row in rows:
+            if row["book_id"] is None:
+                continue # Order without items (LEFT JOIN produced a single empty row)
+            if row["title"] is None:
+                logger.warning("Book ID %s not found for order %s item.", row['book_id'], order_id)
+                items.append({
+                    "book_id": row["book_id"],
+                    "title": "Book Not Found",
+                    "price": 0.0,
+                    "quantity": row["quantity"],
+                    "subtotal": 0.0
+                })
+                continue
+            price = Decimal(row["price"])
+            items.append({
+                "book_id": row["book_id"],
+                "title": row["title"],
+                "price": float(price), # Convert Decimal to float for JSON
+                "quantity": row["quantity"],
+                "subtotal": float(price * row["quantity"]) # Convert Decimal to float for JSON
+            })
+
+        logger.debug("Confirmation details for order %s loaded with %d items in one query.", order_id, len(items))
+        return {
+            "id": header["order_id"],
+            "customer_id": header["customer_id"],
+            "customer_name": customer.get_full_name().title(), # Get formatted name
+            "shipping_address": customer.get_single_line_address().title(), # Get formatted address
+            "total": header["total_amount"], # Keep as Decimal
+            "created_at": header["order_date"].isoformat() if header["order_date"] else None,
+            "items": items
+        }
+
     def to_dict(self, include_item_details=True):
         """
         Converts the Order object and optionally its items into a dictionary.
@@ -182,33 +300,32 @@ class Order:
         if include_item_details:
             item_details_list = []
             try:
-                # Use a single connection for fetching all book details
-                with get_db_connection() as conn:
-                    for item in self.items:
-                        # Fetch book details using the connection
-                        book = Book.get_by_id(item.book_id) # Assuming Book.get_by_id handles its own connection/cursor
-                        if book:
-                            subtotal = book.price * item.quantity
-                            item_details_list.append({
-                                "book_id": book.book_id,
-                                "title": book.title,
-                                "price": float(book.price), # Convert Decimal to float for JSON
-                                "quantity": item.quantity,
-                                "subtotal": float(subtotal) # Convert Decimal to float for JSON
-                            })
-                        else:
-                            logger.warning(f"Book ID {item.book_id} not found for order {self.order_id} item.")
-                            # Optionally add placeholder or skip item
-                            item_details_list.append({
-                                "book_id": item.book_id,
-                                "title": "Book Not Found",
-                                "price": 0.0,
-                                "quantity": item.quantity,
-                                "subtotal": 0.0
-                            })
+                # Fetch all book details in a single query
+                books = Book.get_many([item.book_id for item in self.items])
+                for item in self.items:
+                    book = books.get(item.book_id)
+                    if book:
+                        subtotal = book.price * item.quantity
+                        item_details_list.append({
+                            "book_id": book.book_id,
+                            "title": book.title,
+                            "price": float(book.price), # Convert Decimal to float for JSON
+                            "quantity": item.quantity,
+                            "subtotal": float(subtotal) # Convert Decimal to float for JSON
+                        })
+                    else:
+                        logger.warning("Book ID %s not found for order %s item.", item.book_id, self.order_id)
+                        # Optionally add placeholder or skip item
+                        item_details_list.append({
+                            "book_id": item.book_id,
+                            "title": "Book Not Found",
+                            "price": 0.0,
+                            "quantity": item.quantity,
+                            "subtotal": 0.0
+                        })
                 order_data["items"] = item_details_list
             except Exception as e:
-                 logger.exception(f"Error fetching book details for order {self.order_id} items: {e}")
+                 logger.exception("Error fetching book details for order %s items: %s", self.order_id, e)
                  # Decide how to handle partial data: return what we have, or indicate error
                  order_data["items_error"] = "Could not retrieve full item details."
         else:
@@ -45,7 +45,7 @@ class OrderItem:
         if self.order_item_id is not None:
             # This prevents accidentally trying to re-insert an item that might already exist
             # Although usually, OrderItems are created and saved once per order creation.
-            logger.warning(f"Attempted to save OrderItem for book {self.book_id} which may already have an ID.")
+            logger.warning("Attempted to save OrderItem for book %s which may already have an ID.", self.book_id)
             # Depending on logic, you might allow updates or raise an error.
             # For simple order creation, raising might be safer if this state is unexpected.
             # raise ValueError("Cannot re-save an OrderItem that might already exist in DB.")
@@ -64,7 +64,7 @@ class OrderItem:
                 result = cur.fetchone()
                 if result and result['order_item_id']:
                      self.order_item_id = result['order_item_id']
-                     logger.debug(f"OrderItem for book {self.book_id} (qty: {self.quantity}) saved with ID {self.order_item_id} for order {self.order_id}.")
+                     logger.debug("OrderItem for book %s (qty: %s) saved with ID %s for order %s.", self.book_id, self.quantity, self.order_item_id, self.order_id)
                 else:
                      # This shouldn't happen with RETURNING if insert worked, but good to check
                      raise Exception(f"Failed to retrieve order_item_id after inserting item for book {self.book_id}.")
@@ -72,7 +72,7 @@ class OrderItem:
                 # Commit is handled by the caller (typically the Order.save method or service layer)
 
         except Exception as e:
-            logger.exception(f"Error saving OrderItem for book {self.book_id}, order {self.order_id}: {e}")
+            logger.exception("Error saving OrderItem for book %s, order %s: %s", self.book_id, self.order_id, e)
             # Rollback should be handled by the caller
             raise # Re-raise the exception
 
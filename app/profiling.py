@@ -0,0 +1,149 @@
+# bookstore_app_with_login/app/profiling.py
+
+"""
+On-demand profiling of single requests.
+
+A request carrying the header `X-Profile: 1` (or the query flag `?_profile=1`)
+runs under cProfile, and the profile is written to PROFILING_DIR as a .pstats
+file named after the route, e.g. `main.index.20250101-120000.4242.7.pstats`.
+The file name is returned in the `X-Profile-File` response header. Only callers
+sending `X-Profile-Token: <PROFILING_TOKEN>` can ask for a profile; anyone
+else's flag is ignored, and with no PROFILING_TOKEN set nobody can. (Customers
+have no role column, so there are no admin accounts to grant this to.)
+
+With PROFILING_SAMPLE_RATE above 0, that fraction of all requests to the `main`
+blueprint's routes is also profiled, which catches regressions that are hard to
+reproduce on demand.
+
+cProfile can only profile one request per process at a time, so a request that
+arrives while another is being profiled is served unprofiled (`X-Profile: busy`).
+
+Read the files with `python -m pstats <file>`, or render them with snakeviz or
+flameprof (flame graph).
+"""
+
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from flask import g, request
+from app.routes import bp as main_bp
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() in ("1", "true", "yes")
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join("logs", "profiles"))
+# Required to request a profile (e.g., by an operator with curl). Empty = on-demand profiling is off.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0")) # Fraction of requests always profiled
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "500")) # Oldest profiles are deleted beyond this
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_FLAG = "_profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+_profile_lock = threading.Lock() # Held while a request of this process is being profiled
+_sequence = itertools.count(1)
+
+
+def _is_requested():
+    return bool(request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_FLAG))
+
+
+def _is_authorized():
+    """Tells whether the caller may request a profile, i.e. sent the PROFILING_TOKEN."""
+    token = request.headers.get(PROFILE_TOKEN_HEADER, "")
+    return bool(PROFILING_TOKEN and token and hmac.compare_digest(token, PROFILING_TOKEN))
+
+
+def _profile_path(endpoint):
+    safe_endpoint = re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint or "unmatched")
+    filename = f"{safe_endpoint}.{datetime.now():%Y%m%d-%H%M%S}.{os.getpid()}.{next(_sequence)}.pstats"
+    return os.path.join(PROFILING_DIR, filename)
+
+
+def _prune_profiles():
+    """Deletes the oldest profiles beyond PROFILING_MAX_FILES."""
+    if PROFILING_MAX_FILES <= 0:
+        return
+    paths = [entry.path for entry in os.scandir(PROFILING_DIR) if entry.name.endswith(".pstats")]
+    if len(paths) <= PROFILING_MAX_FILES:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - PROFILING_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass # Another worker removed it first
+
+
+def _start_profile():
+    if _is_requested():
+        if not _is_authorized():
+            logger.warning("Ignoring unauthorized profiling request for %s from %s.", request.path, request.remote_addr)
+            return
+        requested = True
+    elif (PROFILING_SAMPLE_RATE > 0 and request.blueprint == main_bp.name
+          and random.random() < PROFILING_SAMPLE_RATE):
+        requested = False
+    else:
+        return
+
+    if not _profile_lock.acquire(blocking=False):
+        g._profile_busy = requested
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g., a debugger's) is already active in this process
+        _profile_lock.release()
+        g._profile_busy = requested
+        return
+    g._profile = (profiler, _profile_path(request.endpoint), requested, time.perf_counter())
+
+
+def _add_profile_header(response):
+    state = g.get("_profile")
+    if state is not None and state[2]:
+        response.headers["X-Profile-File"] = os.path.basename(state[1])
+    elif g.get("_profile_busy"):
+        response.headers[PROFILE_HEADER] = "busy"
+    return response
+
+
+def _finish_profile(exception=None):
+    state = g.pop("_profile", None)
+    if state is None:
+        return
+    profiler, path, requested, started = state
+    try:
+        profiler.disable()
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        profiler.dump_stats(path)
+        _prune_profiles()
+        logger.info("Profiled %s %s (%s, %.1f ms) to %s", request.method, request.path,
+                    "requested" if requested else "sampled", (time.perf_counter() - started) * 1000, path)
+    except OSError:
+        logger.exception("Could not write profile %s.", path)
+    finally:
+        _profile_lock.release()
+
+
+def init_app(app):
+    """
+    Registers the profiling hooks on the Flask app.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    if not PROFILING_ENABLED:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_add_profile_header)
+    app.teardown_request(_finish_profile)
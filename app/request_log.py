@@ -0,0 +1,78 @@
+# bookstore_app_with_login/app/request_log.py
+
+"""
+One summary log record per request.
+
+Instead of every layer logging its own INFO line for routine requests, a single
+record at the end of each request carries the method, path, endpoint, status,
+duration, response size and user as structured fields (rendered as JSON keys when
+LOG_OUTPUT=json). Sample it like any other source with LOG_SAMPLE_RATES, using
+the source name 'request_log'.
+"""
+
+import os
+import time
+from flask import g, request
+from app.models.db import get_request_sql_stats
+from logger import logger # Import the custom logger
+
+# Set to false to turn off the per-request summary records.
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "true").lower() in ("1", "true", "yes")
+
+
+def _start_timer():
+    g._request_started = time.perf_counter()
+
+
+def _request_fields(status, response=None):
+    """Collects the structured fields describing the current request."""
+    started = g.get("_request_started")
+    duration_ms = (time.perf_counter() - started) * 1000 if started is not None else None
+    # Read the user Flask-Login already loaded instead of loading one just for the log
+    user = g.get("_login_user")
+    fields = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": status,
+        "duration_ms": round(duration_ms, 2) if duration_ms is not None else None,
+        "bytes": response.content_length if response is not None else None,
+        "user_id": getattr(user, "customer_id", None),
+        "remote_addr": request.remote_addr,
+    }
+    sql_stats = get_request_sql_stats() # Only with SQL_INSTRUMENTATION on
+    if sql_stats is not None:
+        fields["db_queries"] = sql_stats.queries
+        fields["db_ms"] = round(sql_stats.duration * 1000, 2)
+    return fields
+
+
+def _log_request(response):
+    fields = _request_fields(response.status_code, response)
+    g._request_logged = True
+    logger.info("%s %s -> %s in %.1f ms", fields["method"], fields["path"], fields["status"],
+                fields["duration_ms"] or 0.0, extra={"fields": fields})
+    return response
+
+
+def _log_failed_request(exception=None):
+    # after_request handlers don't run when a view raises, so log those here
+    if exception is None or g.get("_request_logged"):
+        return
+    fields = _request_fields(500)
+    logger.error("%s %s -> 500 in %.1f ms (%s)", fields["method"], fields["path"],
+                 fields["duration_ms"] or 0.0, type(exception).__name__, extra={"fields": fields})
+
+
+def init_app(app):
+    """
+    Registers the request timing and summary hooks on the Flask app.
+
+    Args:
+        app (Flask): The application instance.
+    """
+    if not LOG_REQUESTS:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_log_request)
+    app.teardown_request(_log_failed_request)
@@ -2,24 +2,25 @@
 
 # Import models
 from app.models.book import Book
-from app.models.order import Order
 from app.models.customer import Customer
-from app.models.db import get_db_connection # Import DB connection function
 
 # Import custom exceptions
-from app.auth_exceptions import RegistrationError
-from app.order_exceptions import QuantityExceedsStock, InvalidOrderFormat
+from app.auth_exceptions import RegistrationError, PasswordHashingBusy, TooManyLoginAttempts
+from app.order_exceptions import QuantityExceedsStock, InvalidOrderFormat, DatabaseOperationError
 
 # Import services
 from app.services.auth_service import authenticate_user
+from app.services.login_throttle import login_throttle
 from app.services.reg_service import register_user, sanitize_form_input
 from app.services.order_service import create_order, get_confirmation_details
+from app.services.book_service import search_books
+from app.metrics import record_order_outcome
 
 # Import other necessities 
 import json
 from logger import logger # Import custom logger
 from flask_login import login_user, logout_user, login_required, current_user
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, make_response
 
 # Create a Blueprint named 'main'
 # Blueprints help organize routes in larger applications.
@@ -35,7 +36,8 @@ def order_confirmation():
 
     Fetches the order ID from the URL query parameters and retrieves
     the detailed order information (including customer and item details)
-    using the `get_confirmation_details` service function.
+    using the `get_confirmation_details` service function, which loads
+    everything with a single query.
     """
     order_id = request.args.get("order_id") # Get 'order_id' from query string (?order_id=123)
 
@@ -46,27 +48,23 @@ def order_confirmation():
 
     try:
         order_id = int(order_id) # Ensure order_id is an integer
-        with get_db_connection() as conn:
-            order_details = get_confirmation_details(order_id, conn) # Fetch details via service
-            customer = Customer.get_by_id(Order.from_db(order_id, conn).customer_id)
-            user_name = customer.get_full_name().title()
-            print(user_name)
+        order_details = get_confirmation_details(order_id) # Fetch details via service
         if not order_details:
             flash("Order not found or you do not have permission to view it.", "warning")
-            logger.warning(f"Order confirmation attempt failed: Order ID {order_id} not found or access denied for user {current_user.customer_id}.")
+            logger.warning("Order confirmation attempt failed: Order ID %s not found or access denied for user %s.", order_id, current_user.customer_id)
             return redirect(url_for("main.index"))
 
-        logger.info(f"Displaying confirmation for Order ID: {order_id}")
-        # Pass the fetched details to the template
-        return render_template("order_confirmation.html", order=order_details, users_name=user_name)
+        logger.debug("Displaying confirmation for Order ID: %s", order_id)
+        # Pass the fetched details to the template; the customer's name comes from the same query
+        return render_template("order_confirmation.html", order=order_details, users_name=order_details["customer_name"])
 
     except ValueError:
         flash("Invalid Order ID format.", "danger")
-        logger.error(f"Invalid Order ID format received: {order_id}")
+        logger.error("Invalid Order ID format received: %s", order_id)
         return redirect(url_for("main.index"))
     except Exception as e:
         flash("An error occurred while retrieving order details.", "danger")
-        logger.exception(f"Error retrieving order confirmation for Order ID {order_id}: {e}")
+        logger.exception("Error retrieving order confirmation for Order ID %s: %s", order_id, e)
         return redirect(url_for("main.index"))
 
 
@@ -91,13 +89,14 @@ def create_order_route():
 
             if not items_json_str:
                 flash("No items selected for the order.", "warning")
-                logger.warning(f"Order creation attempt by user {customer_id} failed: No items provided.")
+                logger.warning("Order creation attempt by user %s failed: No items provided.", customer_id)
                 return redirect(url_for('main.index'))
 
             # Parse the JSON string into a Python list/dict
             items_data = json.loads(items_json_str)
 
-            logger.info(f"Processing order creation for customer {customer_id} with items: {items_data}")
+            logger.info("Processing order creation for customer %s (%d line items).", customer_id, len(items_data))
+            logger.debug("Order items submitted by customer %s: %s", customer_id, items_data)
 
             # Call the order creation service function
             order_result = create_order(customer_id, items_data, total_amount)
@@ -105,70 +104,132 @@ def create_order_route():
             # Check the result from the service
             if order_result.get("success") and order_result.get("order_id"):
                 order_id = order_result["order_id"]
+                record_order_outcome("success")
                 session["last_order_id"] = order_id # Store last order ID in session if needed
-                logger.info(f"Order {order_id} created successfully for customer {customer_id}.")
+                logger.info("Order %s created successfully for customer %s.", order_id, customer_id)
                 flash("Order created successfully!", "success")
                 # Redirect to the confirmation page
                 return redirect(url_for('main.order_confirmation', order_id=order_id))
             else:
                 # If the service indicates failure without a specific exception
                 error_msg = order_result.get('message', 'Order creation failed. Please try again.')
+                record_order_outcome("failed")
                 flash(error_msg, "danger")
-                logger.error(f"Order creation failed for customer {customer_id}: {error_msg}")
+                logger.error("Order creation failed for customer %s: %s", customer_id, error_msg)
                 return redirect(url_for('main.index'))
 
         # Handle specific known exceptions from the service layer
         except (QuantityExceedsStock, InvalidOrderFormat) as e:
+            record_order_outcome(type(e).__name__)
             flash(str(e), "warning") # Show the specific error message to the user
-            logger.warning(f"Order validation error for customer {customer_id}: {e}")
+            logger.warning("Order validation error for customer %s: %s", customer_id, e)
             return redirect(url_for('main.index'))
         except json.JSONDecodeError:
+            record_order_outcome("InvalidOrderFormat")
             flash("Invalid order data submitted.", "danger")
-            logger.error(f"Failed to decode items JSON for customer {customer_id}.")
+            logger.error("Failed to decode items JSON for customer %s.", customer_id)
             return redirect(url_for('main.index'))
         except ValueError:
+             record_order_outcome("InvalidOrderFormat")
              flash("Invalid total amount received.", "danger")
-             logger.error(f"Invalid total amount format received for customer {customer_id}.")
+             logger.error("Invalid total amount format received for customer %s.", customer_id)
              return redirect(url_for('main.index'))
         # Handle unexpected errors
         except Exception as e:
+            record_order_outcome("DatabaseOperationError" if isinstance(e, DatabaseOperationError) else "error")
             flash("An unexpected error occurred while creating the order.", "danger")
-            logger.exception(f"Unexpected error during order creation for customer {customer_id}: {e}")
+            logger.exception("Unexpected error during order creation for customer %s: %s", customer_id, e)
             return redirect(url_for('main.index'))
 
     # Redirect if not a POST request (shouldn't normally happen with route decorator)
     return redirect(url_for('main.index'))
 
 
+# --- Book Routes ---
+
+@bp.route('/books/<int:book_id>/description')
+@login_required
+def book_description(book_id):
+    """
+    Returns a single book's description as JSON.
+
+    The catalog listing doesn't load descriptions; the "View Description"
+    dialog fetches them from here on demand.
+    """
+    try:
+        book = Book.get_by_id(book_id)
+        if not book:
+            return jsonify({"error": "Book not found."}), 404
+
+        response = jsonify({"book_id": book.book_id, "description": book.description})
+        response.headers["Cache-Control"] = "private, max-age=300" # Descriptions rarely change
+        return response
+    except Exception as e:
+        logger.exception("Error fetching description for book %s: %s", book_id, e)
+        return jsonify({"error": "Could not load the description."}), 500
+
+
 # --- Authentication & User Routes ---
 
 @bp.route('/')
 @login_required
 def index():
     """
-    Displays the main bookstore page showing available books.
+    Displays the main bookstore page showing one page of available books.
+
+    Query parameters:
+        q: Search terms. When given, matching books are listed by relevance.
+        page: The 1-based page of search results.
+        sort: 'title' (default), 'price', 'author' or 'genre' (browsing only).
+        after: The cursor of the previous page, as produced by `Book.list_page`.
 
-    Fetches all books from the database and the current user's name
-    to personalize the welcome message.
+    Also fetches the current user's name to personalize the welcome message.
     """
+    query = request.args.get("q", "").strip()
+    sort = request.args.get("sort", "title")
+    if sort not in Book.SORT_EXPRESSIONS:
+        sort = "title"
+    after = request.args.get("after") or None
+
     try:
-        books = Book.get_all_books() # Fetch all books using the model method
+        total_results = None
+        if query:
+            page = max(request.args.get("page", 1, type=int) or 1, 1)
+            books, total_results = search_books(query, page=page, per_page=Book.DEFAULT_PAGE_SIZE)
+            first_page_url = url_for('main.index', q=query) if page > 1 else None
+            has_more = page * Book.DEFAULT_PAGE_SIZE < total_results
+            next_page_url = url_for('main.index', q=query, page=page + 1) if has_more else None
+        else:
+            books, next_cursor = Book.list_page(after=after, limit=Book.DEFAULT_PAGE_SIZE, sort=sort)
+            first_page_url = url_for('main.index', sort=sort) if after else None
+            next_page_url = url_for('main.index', sort=sort, after=next_cursor) if next_cursor else None
+
         # Safely get user's name - assumes Customer model has get_full_name()
         user_customer = Customer.get_by_id(current_user.customer_id)
         users_name = user_customer.get_full_name().title() if user_customer else "Valued Customer"
 
-        if not books:
+        if not books and not after and not query:
             flash("No books available at the moment.", 'warning')
             logger.warning("Book index loaded, but no books found in the database.")
 
-        logger.info(f"Index page loaded successfully for user {current_user.customer_id}.")
-        return render_template('index.html', books=books, users_name=users_name)
+        logger.debug("Index page loaded successfully for user %s.", current_user.customer_id)
+        return render_template('index.html', books=books, users_name=users_name,
+                               query=query, total_results=total_results,
+                               sort=sort, sort_options=list(Book.SORT_EXPRESSIONS),
+                               first_page_url=first_page_url, next_page_url=next_page_url)
 
+    except ValueError:
+        # A malformed or outdated cursor: start over from the first page
+        logger.warning("Invalid catalog cursor received: %s", after)
+        return redirect(url_for('main.index', sort=sort))
     except Exception as e:
         flash("Error loading bookstore contents.", "danger")
-        logger.exception(f"Error loading index page for user {current_user.customer_id}: {e}")
+        logger.exception("Error loading index page for user %s: %s", current_user.customer_id, e)
         # Render template with empty list and default name on error
-        return render_template('index.html', books=[], users_name="Valued Customer")
+        return render_template('index.html', books=[], users_name="Valued Customer",
+                               query=query, total_results=None,
+                               sort=sort, sort_options=list(Book.SORT_EXPRESSIONS),
+                               first_page_url=None, next_page_url=None)
 
 
 @bp.route('/register', methods=['GET', 'POST'])
@@ -183,21 +244,21 @@ def register():
     if request.method == 'POST':
         # Sanitize form data first
         safe_data = sanitize_form_input(request.form)
-        logger.info(f"Registration attempt with email: {safe_data.get('email')}")
+        logger.info("Registration attempt with email: %s", safe_data.get('email'))
 
         # Call the registration service function
         result = register_user(safe_data) # register_user handles validation internally
 
         if result.get("success"):
             flash(result.get("message", "Registration successful. Please log in."), 'success')
-            logger.info(f"Registration successful for email: {safe_data.get('email')}")
+            logger.info("Registration successful for email: %s", safe_data.get('email'))
             return redirect(url_for('main.login')) # Redirect to login page on success
         else:
             # If registration failed, flash the error messages provided by the service
             error_messages = result.get("messages", ["Registration failed."])
             for error in error_messages:
                 flash(error, 'danger')
-            logger.warning(f"Registration failed for email {safe_data.get('email')}: {error_messages}")
+            logger.warning("Registration failed for email %s: %s", safe_data.get('email'), error_messages)
             # Re-render the registration form, passing back the (sanitized) data
             # to repopulate fields, helping the user correct errors.
             return render_template('register.html', form_data=safe_data)
@@ -225,16 +286,20 @@ def login():
             flash("Email and password are required.", "warning")
             return redirect(url_for('main.login'))
 
-        logger.info(f"Login attempt for email: {email}")
+        logger.info("Login attempt for email: %s", email)
 
         try:
+            # Turn away throttled emails/clients before any DB lookup or password hash
+            login_throttle.check(email, request.remote_addr)
+
             # Attempt to authenticate the user using the service
             customer = authenticate_user(email, password)
                 
             if customer is not None:
                 # If authentication is successful, log the user in
+                login_throttle.record_success(email)
                 login_user(customer) # Flask-Login handles session management
-                logger.info(f"User '{email}' logged in successfully.")
+                logger.info("User '%s' logged in successfully.", email)
                 flash('Login successful.', 'success')
 
                 # Redirect to the page the user was trying to access, or index if none
@@ -242,15 +307,27 @@ def login():
                 return redirect(next_page or url_for('main.index'))
             else:
                 # Authentication failed (wrong email/password)
+                login_throttle.record_failure(email, request.remote_addr)
                 flash('Invalid email or password.', 'danger')
-                logger.warning(f"Invalid login attempt for email: {email}")
+                logger.warning("Invalid login attempt for email: %s", email)
                 # Re-render login form, potentially with email pre-filled
                 return render_template('login.html', email=email)
 
+        except TooManyLoginAttempts as e:
+            flash(e.message, 'warning')
+            response = make_response(render_template('login.html', email=email), 429)
+            response.headers['Retry-After'] = str(max(int(e.retry_after + 0.999), 1))
+            return response
+
+        except PasswordHashingBusy as e:
+            # Too many logins being verified right now; fail fast instead of queueing
+            flash(e.message, 'warning')
+            return render_template('login.html', email=email), 503
+
         # Handle unexpected errors during the login process
         except Exception as e:
             flash("An unexpected error occurred during login.", 'danger')
-            logger.exception(f"Unexpected error during login for email {email}: {e}")
+            logger.exception("Unexpected error during login for email %s: %s", email, e)
             return redirect(url_for('main.login'))
 
     # For GET request, render the login form
@@ -265,6 +342,6 @@ def logout():
     """
     user_email = current_user.email # Get email before logging out for logging
     logout_user() # Clears the user session
-    logger.info(f"User '{user_email}' logged out.")
+    logger.info("User '%s' logged out.", user_email)
     flash('You have been successfully logged out.', 'info')
     return redirect(url_for('main.login')) # Redirect to the login page
\ No newline at end of file
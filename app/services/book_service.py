@@ -1,18 +1,33 @@
 # bookstore_app_with_login/app/services/book_service.py
 
-# Note: This service currently is not being used and we can decide as a group
-# how to handle it. I was keeping them to possible use when and if we
-# implement a sort/filter feature on the index page.
-# We will reconsider whether these service functions are necessary or if the
-# model methods suffice for our current needs. If complex logic involving
-# multiple models or external services related to books arises, then a
-# dedicated book service makes more sense.
-
-from app.models.book import Book # Import the Book model
+# Book lookups that go beyond the Book model's own methods. search_books backs
+# the search box on the index page (the 'q' parameter of main.index); the
+# author/genre lookups below are still unused and kept for a future filter feature.
+
+import os
+from app.models.book import Book, add_catalog_listener # Import the Book model
+from app.models.cache import RefreshAheadCache # Holds the search index and rebuilds it periodically
 from app.models.db import get_db_connection # Import DB connection utility
+from app.services.search_index import BookSearchIndex, tokenize, MIN_PREFIX_LENGTH
 from logger import logger # Import custom logger
 from decimal import Decimal # For price handling
 
+# Where search_books looks for matches:
+#   'memory'   - an inverted index held by each worker (default; best for small catalogs)
+#   'postgres' - the books.search_vector full-text column and its GIN index
+#                (needs migration 0002_books_fulltext_search; best for large catalogs)
+SEARCH_BACKENDS = ("memory", "postgres")
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "memory").strip().lower()
+if SEARCH_BACKEND not in SEARCH_BACKENDS:
+    logger.warning("Unknown SEARCH_BACKEND '%s'; using 'memory'.", SEARCH_BACKEND)
+    SEARCH_BACKEND = "memory"
+
+# Seconds between full rebuilds of a worker's search index. Writes made through the
+# Book model are applied incrementally; the rebuild picks up writes made by other
+# workers or directly in the database.
+SEARCH_INDEX_REFRESH = float(os.getenv("SEARCH_INDEX_REFRESH", "300"))
+SEARCH_INDEX_FETCH_SIZE = 2000 # Rows fetched per round trip while building the index
+
 # --- Potentially Redundant Functions (Consider using Model methods directly) we can consider---
 
 # If you decide to keep these, ensure the Book model doesn't already provide identical methods.
@@ -35,24 +50,17 @@ def get_books_by_author(author_name):
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Use LOWER for case-insensitive comparison
-                query = """SELECT book_id, title, author, genre, price, stock_quantity
+                query = f"""SELECT {Book.LISTING_COLUMNS}
                            FROM books WHERE LOWER(author) = LOWER(%s) ORDER BY title;"""
                 cur.execute(query, (author_name.strip(),))
                 rows = cur.fetchall()
 
-        for row in rows:
-            books_by_author.append(Book(
-                book_id=row["book_id"],
-                title=row["title"],
-                author=row["author"],
-                genre=row["genre"],
-                price=row["price"],
-                stock_quantity=row["stock_quantity"]
-            ))
-        logger.info(f"Found {len(books_by_author)} books for author '{author_name}'.")
+        # Descriptions weren't selected; they load lazily (in one batch) if accessed
+        books_by_author.extend(Book.from_rows(rows))
+        logger.info("Found %d books for author '%s'.", len(books_by_author), author_name)
         return books_by_author
     except Exception as e:
-        logger.exception(f"Error retrieving books by author '{author_name}'.")
+        logger.exception("Error retrieving books by author '%s'.", author_name)
         return []
 
 
@@ -74,27 +82,140 @@ def get_books_by_genre(genre_name):
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                  # Use LOWER for case-insensitive comparison
-                query = """SELECT book_id, title, author, genre, price, stock_quantity
+                query = f"""SELECT {Book.LISTING_COLUMNS}
                            FROM books WHERE LOWER(genre) = LOWER(%s) ORDER BY title;"""
                 cur.execute(query, (genre_name.strip(),))
                 rows = cur.fetchall()
 
-        for row in rows:
-             books_by_genre.append(Book(
-                book_id=row["book_id"],
-                title=row["title"],
-                author=row["author"],
-                genre=row["genre"],
-                price=row["price"],
-                stock_quantity=row["stock_quantity"]
-            ))
-        logger.info(f"Found {len(books_by_genre)} books for genre '{genre_name}'.")
+        # Descriptions weren't selected; they load lazily (in one batch) if accessed
+        books_by_genre.extend(Book.from_rows(rows))
+        logger.info("Found %d books for genre '%s'.", len(books_by_genre), genre_name)
         return books_by_genre
     except Exception as e:
-         logger.exception(f"Error retrieving books by genre '{genre_name}'.")
+         logger.exception("Error retrieving books by genre '%s'.", genre_name)
          return []
 
+
+# --- Search ---
+
+def _build_search_index():
+    """
+    Builds a fresh search index from every book in the database.
+
+    Rows are streamed through a server-side cursor so the whole table (including
+    descriptions) is never held in memory at once.
+
+    Returns:
+        BookSearchIndex: The populated index.
+    """
+    index = BookSearchIndex()
+    with get_db_connection() as conn:
+        with conn.cursor(name="search_index_build") as cur:
+            cur.itersize = SEARCH_INDEX_FETCH_SIZE
+            cur.execute(f"SELECT {Book.LISTING_COLUMNS}, description FROM books;")
+            for row in cur:
+                index.add(row["book_id"], row)
+    logger.info("Built book search index with %d books.", len(index))
+    return index
+
+
+# One index per worker. It is built on the first search and then served while a
+# background thread rebuilds it every SEARCH_INDEX_REFRESH seconds.
+search_index = RefreshAheadCache("search_index", _build_search_index, SEARCH_INDEX_REFRESH)
+
+
+def _apply_book_change(book_id, changes):
+    """Catalog listener: applies a book write to the index, if one has been built."""
+    index = search_index.peek()
+    if index is not None:
+        index.update(book_id, changes)
+
+
+add_catalog_listener(_apply_book_change)
+
+
+def _search_postgres(query, offset, limit):
+    """
+    Runs a ranked full-text search against books.search_vector.
+
+    The query is tokenized the same way as for the in-memory index and turned into
+    a prefix tsquery ('tolk:* & hobb:*'), so both backends match the same way and
+    no user input reaches the tsquery parser unsanitized.
+
+    Args:
+        query (str): The search terms.
+        offset (int): Number of ranked results to skip.
+        limit (int): Maximum number of results to return.
+
+    Returns:
+        tuple[list[DictRow], int]: The matching rows (listing columns plus 'score') and
+                                   the total number of matches.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return [], 0
+    tsquery = " & ".join(f"{term}:*" if len(term) >= MIN_PREFIX_LENGTH else term for term in terms)
+
+    sql = f"""
+        SELECT {Book.LISTING_COLUMNS},
+               ts_rank(search_vector, query) AS score,
+               count(*) OVER () AS total_matches
+          FROM books, to_tsquery('english', %s) AS query
+         WHERE search_vector @@ query
+         ORDER BY score DESC, title, book_id
+         LIMIT %s OFFSET %s;
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (tsquery, limit, offset))
+            rows = cur.fetchall()
+
+    if rows:
+        return rows, rows[0]["total_matches"]
+    if offset == 0:
+        return [], 0
+    # Past the last page: the window count is empty, so count separately
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM books WHERE search_vector @@ to_tsquery('english', %s);", (tsquery,))
+            return [], cur.fetchone()[0]
+
+
+def search_books(query, page=1, per_page=Book.DEFAULT_PAGE_SIZE):
+    """
+    Searches book titles, authors, genres and descriptions, best matches first.
+
+    Every word of the query must match; the last letters of a word may be left
+    off ("tolk" finds "Tolkien"). With the 'memory' backend results come from the
+    in-process index, so no database query is made except to build the index the
+    first time; with 'postgres' they come from one ranked full-text query.
+
+    Args:
+        query (str): The search terms.
+        page (int): The 1-based page of results to return.
+        per_page (int): Results per page (capped at Book.MAX_PAGE_SIZE).
+
+    Returns:
+        tuple[list[Book], int]: The books on the requested page (descriptions load
+                                lazily if accessed) and the total number of matches.
+    """
+    if not query or not query.strip():
+        return [], 0
+    page = max(int(page), 1)
+    per_page = max(1, min(int(per_page), Book.MAX_PAGE_SIZE))
+
+    try:
+        if SEARCH_BACKEND == "postgres":
+            results, total = _search_postgres(query, offset=(page - 1) * per_page, limit=per_page)
+        else:
+            index = search_index.get()
+            results, total = index.search(query, offset=(page - 1) * per_page, limit=per_page)
+        logger.debug("Search for '%s' matched %d books (page %d).", query, total, page)
+        return Book.from_rows(results), total
+    except Exception as e:
+        logger.exception("Error searching books for '%s': %s", query, e)
+        return [], 0
+
 # We will consider adding functions for more complex book-related logic if needed as a group, e.g.,
 # - get_featured_books()
-# - search_books(query)
 # - update_book_details(book_id, ...) -> interacts with Book model's update
\ No newline at end of file
@@ -0,0 +1,174 @@
+# bookstore_app_with_login/app/services/login_throttle.py
+
+"""
+Failed-login throttling.
+
+Each email address and each client IP gets a token bucket. A failed login
+takes a token; tokens come back at a steady rate. While a bucket is empty,
+logins for that key are rejected before any database lookup or password hash
+is attempted, which is what makes credential-stuffing traffic cheap to turn
+away. A successful login refills the email's bucket.
+
+Buckets live in this worker's memory and the number of tracked keys is capped
+(least recently used keys are forgotten first), so the limiter's own memory is
+bounded. With several gunicorn workers each enforces its own budget.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.auth_exceptions import TooManyLoginAttempts
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+# Failed attempts allowed in a burst, and how many are forgiven per minute afterwards.
+LOGIN_THROTTLE_EMAIL_BURST = float(os.getenv("LOGIN_THROTTLE_EMAIL_BURST", "5"))
+LOGIN_THROTTLE_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_THROTTLE_EMAIL_PER_MINUTE", "1"))
+LOGIN_THROTTLE_IP_BURST = float(os.getenv("LOGIN_THROTTLE_IP_BURST", "20"))
+LOGIN_THROTTLE_IP_PER_MINUTE = float(os.getenv("LOGIN_THROTTLE_IP_PER_MINUTE", "10"))
+# Keys (emails + IPs) tracked per worker. 0 disables throttling.
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "10000"))
+# Longest wait reported to a throttled client (seconds). With a per-minute rate of 0
+# an empty bucket never refills, and this is reported instead of an infinite wait.
+MAX_RETRY_AFTER = 3600.0
+
+
+class TokenBucketLimiter:
+    """
+    A set of token buckets, one per key, with a bounded number of keys.
+
+    A bucket holds at most `burst` tokens and regains `rate` tokens per second.
+    Buckets are created full and only stored once a token has been taken, so keys
+    that never fail cost nothing.
+    """
+    def __init__(self, burst, per_minute, max_keys):
+        """
+        Initializes the limiter.
+
+        Args:
+            burst (float): Bucket capacity (attempts allowed back to back).
+            per_minute (float): Tokens regained per minute.
+            max_keys (int): Maximum number of buckets kept.
+        """
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> (tokens, updated_at); most recently used last
+        self.evictions = 0
+
+    def _tokens(self, key, now):
+        """Returns the key's current token count after refilling (caller holds the lock)."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        tokens, updated_at = bucket
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def retry_after(self, key, now):
+        """
+        Returns 0 if the key may try now, otherwise the seconds until a token is back
+        (at most MAX_RETRY_AFTER).
+        """
+        tokens = self._tokens(key, now)
+        if tokens >= 1.0:
+            return 0.0
+        if self.rate <= 0:
+            return MAX_RETRY_AFTER
+        return min((1.0 - tokens) / self.rate, MAX_RETRY_AFTER)
+
+    def take(self, key, now):
+        """Takes one token from the key's bucket (floored at zero)."""
+        tokens = max(self._tokens(key, now) - 1.0, 0.0)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+
+    def reset(self, key):
+        """Forgets the key's bucket (i.e., refills it)."""
+        self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LoginThrottle:
+    """Combines per-email and per-IP token buckets for the login route."""
+
+    def __init__(self, max_keys=LOGIN_THROTTLE_MAX_KEYS):
+        self.enabled = max_keys > 0
+        self._lock = threading.Lock()
+        self._emails = TokenBucketLimiter(LOGIN_THROTTLE_EMAIL_BURST, LOGIN_THROTTLE_EMAIL_PER_MINUTE, max_keys)
+        self._ips = TokenBucketLimiter(LOGIN_THROTTLE_IP_BURST, LOGIN_THROTTLE_IP_PER_MINUTE, max_keys)
+        self._counters = {
+            "checks": 0,
+            "rejected_email": 0,
+            "rejected_ip": 0,
+            "failures": 0,
+            "successes": 0,
+        }
+
+    def check(self, email, remote_addr):
+        """
+        Rejects the attempt if the email or the client IP is out of tokens.
+
+        Args:
+            email (str): The normalized email being logged into.
+            remote_addr (str): The client's IP address.
+
+        Raises:
+            TooManyLoginAttempts: If either bucket is empty.
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._counters["checks"] += 1
+            wait_ip = self._ips.retry_after(remote_addr, now)
+            wait_email = self._emails.retry_after(email, now)
+            if wait_ip:
+                self._counters["rejected_ip"] += 1
+            elif wait_email:
+                self._counters["rejected_email"] += 1
+        wait = max(wait_ip, wait_email)
+        if wait:
+            logger.warning("Login throttled for email %s from %s (retry in %.0fs).", email, remote_addr, wait)
+            raise TooManyLoginAttempts(retry_after=wait)
+
+    def record_failure(self, email, remote_addr):
+        """Takes a token from both the email's and the IP's bucket."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._counters["failures"] += 1
+            self._emails.take(email, now)
+            self._ips.take(remote_addr, now)
+
+    def record_success(self, email):
+        """Refills the email's bucket; the IP's bucket keeps its history."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters["successes"] += 1
+            self._emails.reset(email)
+
+    def stats(self):
+        """
+        Returns the throttle's counters.
+
+        Returns:
+            dict: checks, rejected_email, rejected_ip, failures, successes, plus the
+                  number of tracked 'email_keys' and 'ip_keys' and total 'evictions'.
+        """
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot["email_keys"] = len(self._emails)
+            snapshot["ip_keys"] = len(self._ips)
+            snapshot["evictions"] = self._emails.evictions + self._ips.evictions
+        return snapshot
+
+
+login_throttle = LoginThrottle()
@@ -5,7 +5,6 @@ from logger import logger
 from datetime import datetime
 from app.models.book import Book
 from app.models.order import Order
-from app.models.customer import Customer # Needed for getting customer details
 from app.models.order_item import OrderItem
 from app.models.db import get_db_connection
 from decimal import Decimal, InvalidOperation # Use Decimal for accurate money calculations
@@ -37,7 +36,7 @@ def create_order(customer_id, items_data, total_amount_from_form):
         DatabaseOperationError: If a database error occurs during the save process.
         ValueError: If input data types are incorrect (should be caught earlier ideally).
     """
-    logger.info(f"Attempting to create order for customer_id: {customer_id} with items: {items_data}")
+    logger.info("Attempting to create order for customer_id: %s (%d line items).", customer_id, len(items_data) if isinstance(items_data, list) else 0)
 
     # --- Input Validation ---
     if not customer_id or not isinstance(customer_id, int):
@@ -59,24 +58,30 @@ def create_order(customer_id, items_data, total_amount_from_form):
         order_items_to_create = [] # List to hold validated OrderItem objects
 
         # --- Item Validation and Calculation (within the 'try' block, before DB writes) ---
+        # Validate item structure and types before touching the database
         for item_dict in items_data:
+            if not isinstance(item_dict, dict):
+                raise InvalidOrderFormat(f"Invalid data for item: {item_dict}.")
             book_id = item_dict.get("book_id")
             quantity = item_dict.get("quantity")
-
-            # Validate item structure and types
             if not isinstance(book_id, int) or not isinstance(quantity, int) or quantity <= 0:
                 raise InvalidOrderFormat(f"Invalid data for item: book_id={book_id}, quantity={quantity}.")
 
-            # Fetch the book details (use the connection context if model methods require it)
-            # Assuming Book.get_by_id handles its own connection/cursor or can accept one
-            book = Book.get_by_id(book_id) # Fetch within the transaction scope potentially
+        # Fetch every book in the cart with a single query on the transaction's connection
+        books = Book.get_many([item_dict["book_id"] for item_dict in items_data], conn)
+
+        requested_quantities = {} # Total quantity per book (a book may appear on several lines)
+        for item_dict in items_data:
+            book_id = item_dict["book_id"]
+            quantity = item_dict["quantity"]
+
+            book = books.get(book_id)
             if not book:
                 raise InvalidOrderFormat(f"Book with ID {book_id} not found.")
 
-            # Check stock availability
-            if not book.has_stock(quantity):
-                 # Raise specific exception for stock issues
-                raise QuantityExceedsStock(book.title, quantity, book.stock_quantity)
+            # Stock is not checked against this (possibly stale) read; the conditional
+            # decrement below lets the database decide.
+            requested_quantities[book_id] = requested_quantities.get(book_id, 0) + quantity
 
             # Calculate item subtotal and add to total
             item_price = book.price * quantity # Decimal arithmetic
@@ -91,15 +96,22 @@ def create_order(customer_id, items_data, total_amount_from_form):
              form_total_decimal = Decimal(total_amount_from_form)
              # Use is_close for floating point comparison robustness if needed, or exact match for Decimal
              if calculated_total_price != form_total_decimal:
-                 logger.warning(f"Order total mismatch for customer {customer_id}. Calculated: {calculated_total_price}, Form: {form_total_decimal}. Proceeding with calculated total.")
+                 logger.warning("Order total mismatch for customer %s. Calculated: %s, Form: %s. Proceeding with calculated total.", customer_id, calculated_total_price, form_total_decimal)
                  # Decide whether to proceed, raise error, or just log
                  # For now, we proceed using the server-calculated total.
         except (InvalidOperation, TypeError):
-             logger.error(f"Invalid total amount received from form for customer {customer_id}: {total_amount_from_form}")
+             logger.error("Invalid total amount received from form for customer %s: %s", customer_id, total_amount_from_form)
              raise InvalidOrderFormat("Invalid total amount format received.")
 
 
-        # --- Database Operations (Order and Stock Update) ---
+        # --- Database Operations (Stock Update and Order) ---
+
+        # Decrease stock for every book in one conditional statement. The database
+        # reports any book that no longer has enough copies.
+        shortages = Book.decrease_stock_many(requested_quantities, conn)
+        if shortages:
+            shortage = shortages[0]
+            raise QuantityExceedsStock(shortage["title"], shortage["requested"], shortage["available"])
 
         # Create the Order object (header)
         order_header = Order(
@@ -111,33 +123,20 @@ def create_order(customer_id, items_data, total_amount_from_form):
         for oi in order_items_to_create:
             order_header.add_item(oi)
 
-        # Save the order header and all items (this handles inserts)
-        # The Order.save method should handle inserting items via OrderItem.save
+        # Save the order header and all items in a single round trip
         new_order_id = order_header.save(conn) # Pass the connection
 
-        # Decrease stock for each book AFTER order and items are successfully inserted
-        for item in order_items_to_create:
-            # Re-fetch book within the same transaction context might be safer if stock could change,
-            # but decreases atomicity. Assuming stock check earlier is sufficient for this operation.
-            # OR, pass 'conn' to decrease_stock if it needs the cursor.
-             book_to_update = Book.get_by_id(item.book_id) # Fetch again or use previously fetched 'book' if safe
-             if book_to_update:
-                 book_to_update.decrease_stock(item.quantity, conn) # Pass the connection
-             else:
-                 # This case implies book was deleted between validation and stock update - very unlikely but possible
-                 raise DatabaseOperationError(f"Book {item.book_id} disappeared during order processing.")
-
 
         # --- Commit Transaction ---
         conn.commit()
-        logger.info(f"Order {new_order_id} created and committed successfully for customer {customer_id}.")
+        logger.info("Order %s created and committed successfully for customer %s.", new_order_id, customer_id)
 
         # Return success indicator and the new order ID
         return {"success": True, "order_id": new_order_id}
 
     except (InvalidOrderFormat, QuantityExceedsStock) as e:
         # Handle validation/stock errors: Log, rollback, return failure
-        logger.warning(f"Order creation failed for customer {customer_id} due to validation/stock issue: {e}")
+        logger.warning("Order creation failed for customer %s due to validation/stock issue: %s", customer_id, e)
         if conn:
             conn.rollback() # Rollback any partial changes if validation failed mid-process
         # Re-raise the specific exception to be caught by the route
@@ -145,7 +144,7 @@ def create_order(customer_id, items_data, total_amount_from_form):
 
     except Exception as e:
         # Handle unexpected database or other errors
-        logger.exception(f"Unexpected error during order creation for customer {customer_id}: {e}")
+        logger.exception("Unexpected error during order creation for customer %s: %s", customer_id, e)
         if conn:
             conn.rollback() # Rollback the transaction on any error
         # Raise a generic DB error for the route to handle
@@ -157,16 +156,18 @@ def create_order(customer_id, items_data, total_amount_from_form):
             conn.close()
             logger.debug("Database connection closed for create_order.")
 
-def get_confirmation_details(order_id, conn):
+def get_confirmation_details(order_id, conn=None):
     """
     Retrieves detailed information for an order confirmation page.
 
     Fetches the order, its items (including book details like title/price),
-    and customer information (name, address).
+    and customer information (name, address) with a single query via
+    `Order.load_confirmation`.
 
     Args:
         order_id (int): The ID of the order to retrieve details for.
-        conn (psycopg2.connection): An active database connection.
+        conn (psycopg2.connection, optional): An active database connection.
+                                              Defaults to the request's connection.
 
     Returns:
         dict | None: A dictionary containing structured order details suitable for
@@ -174,6 +175,7 @@ def get_confirmation_details(order_id, conn):
                      Example structure:
                      {
                          "id": 123,
+                         "customer_id": 7,
                          "customer_name": "Jane Doe",
                          "shipping_address": "123 Main St, Anytown, CA 90210",
                          "total": Decimal('59.97'),
@@ -184,42 +186,21 @@ def get_confirmation_details(order_id, conn):
                          ]
                      }
     """
-    logger.info(f"Fetching confirmation details for Order ID: {order_id}")
+    logger.debug("Fetching confirmation details for Order ID: %s", order_id)
     try:
-        # 1. Load the Order object and its basic items from the DB
-        # The `from_db` method should handle joining/fetching necessary item data.
-        order = Order.from_db(order_id, conn)
+        # Load the order, its items with book details, and the customer's name and
+        # address in one query. Orders always reference an existing customer (FK).
+        order_details = Order.load_confirmation(order_id, conn)
 
-        if not order:
-            logger.warning(f"Attempted to get confirmation details for non-existent Order ID: {order_id}")
+        if not order_details:
+            logger.warning("Attempted to get confirmation details for non-existent Order ID: %s", order_id)
             return None # Order not found
 
-        order_dict = order.to_dict()
-        order_items = order_dict.get("items", [])
-        
-        # 2. Fetch Customer details associated with the order
-        customer = Customer.get_by_id(order.customer_id) # Assumes get_by_id uses its own connection or accepts `conn`
-        if not customer:
-            logger.error(f"Customer data not found for Customer ID {order.customer_id} associated with Order ID {order_id}.")
-            # Decide how to handle missing customer: return None, or return partial order data?
-            # Returning None might be safer.
-            return None
-
-        # 3. Prepare the dictionary for the template, enriching item data
-        order_details = {
-            "id": order.order_id,
-            "customer_name": customer.get_full_name().title(), # Get formatted name
-            "shipping_address": customer.get_single_line_address().title(), # Get formatted address
-            "total": order.total_amount, # Keep as Decimal or convert as needed
-            "created_at": order.order_date.isoformat(), # Format date
-            "items": order_items
-        }
-
-        logger.info(f"Successfully retrieved confirmation details for Order ID: {order_id}")
+        logger.debug("Successfully retrieved confirmation details for Order ID: %s", order_id)
         return order_details
 
     except Exception as e:
-        logger.exception(f"Error retrieving confirmation details for Order ID {order_id}: {e}")
+        logger.exception("Error retrieving confirmation details for Order ID %s: %s", order_id, e)
         # Don't expose internal errors directly, return None or raise a custom exception
         return None
 
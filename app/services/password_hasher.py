@@ -0,0 +1,240 @@
+# bookstore_app_with_login/app/services/password_hasher.py
+
+"""
+Password hashing and verification on a bounded process pool.
+
+Werkzeug's password hashes (scrypt/pbkdf2) are deliberately CPU-expensive and
+hold the GIL while they run, so computing them inside a request thread stalls
+every other request in the same gunicorn worker. Here they run in separate
+processes instead: the request thread waits on a future without holding the
+GIL, and at most PASSWORD_HASH_MAX_PENDING jobs may wait per worker, so a
+login storm is turned away quickly instead of queueing without limit.
+"""
+
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.auth_exceptions import PasswordHashingBusy
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+# Werkzeug method string for new hashes, i.e. the work factor
+# (e.g., 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000').
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# Hashing processes per gunicorn worker. 0 hashes inline in the request thread.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Jobs allowed to be running or waiting at once per worker; more are rejected.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(PASSWORD_HASH_WORKERS, 1) * 8)))
+# Seconds a request waits for a free slot and then for the result.
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+# Re-hash a customer's password with PASSWORD_HASH_METHOD when they log in with an
+# older or weaker hash.
+PASSWORD_REHASH_ON_LOGIN = os.getenv("PASSWORD_REHASH_ON_LOGIN", "true").lower() in ("1", "true", "yes")
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's hash functions on a lazily created process pool.
+
+    The pool is keyed by process ID (like the database pool), so a gunicorn worker
+    forked from a parent that already used it builds its own. Child processes are
+    started with 'spawn' so they never inherit a copy of a threaded parent.
+    """
+    def __init__(self, workers, max_pending, timeout):
+        """
+        Initializes the hasher.
+
+        Args:
+            workers (int): Number of hashing processes. 0 hashes inline.
+            max_pending (int): Jobs allowed to run or wait at once.
+            timeout (float): Seconds to wait for a free slot, and then for the result.
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._pending = 0
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "failures": 0,
+            "pending_max": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def _get_executor(self):
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                self._executor_pid = pid
+                logger.info("Password hashing pool started with %d processes for worker %s.", self.workers, pid)
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drops a broken pool (e.g., a child was killed) so the next job starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, func, *args):
+        """
+        Runs func(*args) on the pool and returns its result.
+
+        Raises:
+            PasswordHashingBusy: If no slot frees up within the timeout, or the result
+                                 doesn't arrive in time.
+            Exception: Whatever `func` raises.
+        """
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._counters["rejected"] += 1
+            logger.warning("Password hashing pool is saturated; rejecting request.")
+            raise PasswordHashingBusy()
+
+        started = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+            self._counters["submitted"] += 1
+            self._counters["pending_max"] = max(self._counters["pending_max"], self._pending)
+        executor = future = None
+        ok = False
+        try:
+            executor = self._get_executor()
+            future = executor.submit(func, *args)
+            # The slot stays taken until the job really finishes, even if we stop waiting
+            future.add_done_callback(self._job_done)
+            result = future.result(timeout=self.timeout)
+            ok = True
+            return result
+        except FutureTimeoutError:
+            # The job keeps its process busy until it finishes; only the caller gives up
+            logger.warning("Password hashing did not finish within %ss.", self.timeout)
+            raise PasswordHashingBusy()
+        except BrokenProcessPool:
+            logger.exception("Password hashing pool broke; it will be restarted.")
+            if executor is not None:
+                self._discard_executor(executor)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._counters["completed" if ok else "failures"] += 1
+                self._counters["latency_total"] += elapsed
+                self._counters["latency_max"] = max(self._counters["latency_max"], elapsed)
+            if future is None:
+                self._job_done(None) # Never submitted; free the slot now
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def shutdown(self):
+        """Stops the hashing processes (used at exit and in tests)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._executor_pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """
+        Returns the hasher's counters.
+
+        Returns:
+            dict: submitted, completed, rejected, failures, pending_max, latency_total,
+                  latency_max (seconds), plus the current 'pending' and the configured
+                  'workers', 'max_pending' and 'method'.
+        """
+        with self._lock:
+            snapshot = dict(self._counters)
+            snapshot["pending"] = self._pending
+        snapshot["workers"] = self.workers
+        snapshot["max_pending"] = self.max_pending
+        snapshot["method"] = PASSWORD_HASH_METHOD
+        return snapshot
+
+
+_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT)
+
+
+def hash_password(password):
+    """
+    Hashes a password with PASSWORD_HASH_METHOD on the hashing pool.
+
+    Args:
+        password (str): The plain-text password.
+
+    Returns:
+        str: The werkzeug password hash.
+
+    Raises:
+        PasswordHashingBusy: If the hashing pool is saturated.
+    """
+    return _hasher.run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(pwhash, password):
+    """
+    Checks a password against a stored werkzeug hash on the hashing pool.
+
+    Args:
+        pwhash (str): The stored hash.
+        password (str): The plain-text password to check.
+
+    Returns:
+        bool: True if the password matches.
+
+    Raises:
+        PasswordHashingBusy: If the hashing pool is saturated.
+    """
+    return _hasher.run(check_password_hash, pwhash, password)
+
+
+@functools.lru_cache(maxsize=1)
+def target_method():
+    """
+    Returns PASSWORD_HASH_METHOD the way werkzeug writes it into a hash.
+
+    Werkzeug fills in defaults ('scrypt' is stored as 'scrypt:32768:8:1'), so the
+    canonical form is taken from one real hash, computed once per process.
+    """
+    return generate_password_hash("", PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def needs_rehash(pwhash):
+    """
+    Tells whether a stored hash was made with something other than PASSWORD_HASH_METHOD.
+
+    Args:
+        pwhash (str): A werkzeug password hash ('method$salt$hash').
+
+    Returns:
+        bool: True if the hash should be replaced on the next successful login.
+    """
+    return bool(pwhash) and pwhash.split("$", 1)[0] != target_method()
+
+
+def get_hasher_stats():
+    """Returns the hashing pool's counters (see PasswordHasher.stats)."""
+    return _hasher.stats()
+
+
+def shutdown_hasher():
+    """Stops this worker's hashing processes."""
+    _hasher.shutdown()
@@ -5,9 +5,8 @@ from html import escape # For basic XSS prevention on string inputs
 from logger import logger
 from app.models.customer import Customer # Customer database model
 from app.models.db import get_db_connection # Database connection utility
-from werkzeug.security import generate_password_hash # For hashing passwords
-# Import custom exceptions if needed for specific registration errors
-# from app.auth_exceptions import RegistrationError, UserAlreadyExists
+from app.services.password_hasher import hash_password # Hashes passwords on the hashing pool
+from app.auth_exceptions import PasswordHashingBusy, UserAlreadyExists
 
 # --- Constants for Validation ---
 # Regex patterns can be adjusted based on specific requirements
@@ -40,7 +39,7 @@ def register_user(form_data):
               {'success': True, 'message': 'Registration successful.'} on success.
               {'success': False, 'messages': ['Error message 1', ...]} on failure.
     """
-    logger.info(f"Starting registration process for email: {form_data.get('email')}")
+    logger.info("Starting registration process for email: %s", form_data.get('email'))
 
     # 1. Sanitize input first to prevent injection issues before validation/processing
     # Note: sanitize_form_input might be better placed in the route before calling this service
@@ -49,15 +48,17 @@ def register_user(form_data):
     # 2. Validate the sanitized data
     validation_errors = validate_registration(safe_data)
     if validation_errors:
-        logger.warning(f"Registration validation failed for {safe_data.get('email')}: {validation_errors}")
+        logger.warning("Registration validation failed for %s: %s", safe_data.get('email'), validation_errors)
         # Return specific validation errors
         return {'success': False, 'messages': validation_errors}
 
     # 3. Hash the password securely
     try:
-        hashed_password = generate_password_hash(safe_data['password'])
+        hashed_password = hash_password(safe_data['password'])
+    except PasswordHashingBusy as e:
+        return {'success': False, 'messages': [e.message]}
     except Exception as e:
-        logger.exception(f"Password hashing failed for {safe_data.get('email')}: {e}")
+        logger.exception("Password hashing failed for %s: %s", safe_data.get('email'), e)
         # Return a generic internal error message
         return {'success': False, 'messages': ['An internal error occurred during registration.']}
 
@@ -84,15 +85,17 @@ def register_user(form_data):
             zip_code=safe_data.get('zip_code')
         )
 
-        # Use the Customer model's save method
+        # Use the Customer model's save method; its single INSERT also rejects duplicate emails
         new_customer.save_to_db() # This handles the DB connection and commit
 
-        logger.info(f"Successfully registered new customer: {new_customer.email} with ID: {new_customer.customer_id}")
+        logger.info("Successfully registered new customer: %s with ID: %s", new_customer.email, new_customer.customer_id)
         return {'success': True, 'message': 'Registration successful. Please log in.'}
 
+    except UserAlreadyExists:
+        return {'success': False, 'messages': ["This email address is already registered."]}
     except Exception as e:
         # Catch potential database errors (e.g., unique constraint violation if email check failed somehow, connection issues)
-        logger.exception(f"Database error during registration for {safe_data.get('email')}: {e}")
+        logger.exception("Database error during registration for %s: %s", safe_data.get('email'), e)
         # Check for specific DB errors if possible (e.g., unique violation)
         # For now, return a generic error
         return {'success': False, 'messages': ['Registration failed due to a database error. Please try again later.']}
@@ -130,22 +133,10 @@ def validate_registration(data):
     if not re.match(NAME_REGEX, data['last_name']):
         errors.append("Invalid last name format (letters, spaces, hyphens, apostrophes allowed, max 50 chars).")
 
-    # Email validation and uniqueness check
+    # Email validation (uniqueness is enforced by the insert in Customer.save_to_db)
     email = data['email']
     if not re.match(EMAIL_REGEX, email):
         errors.append("Invalid email format.")
-    else:
-        # Check if email already exists in the database
-        # This requires a database query - potentially move this check earlier or handle DB error in register_user
-        try:
-            if Customer.get_by_email(email):
-                errors.append("This email address is already registered.")
-                logger.warning(f"Registration attempt with existing email: {email}")
-        except Exception as e:
-            # Log DB error during validation but might let registration proceed to catch DB constraint error later
-            logger.error(f"Database error during email uniqueness check for {email}: {e}")
-            errors.append("Could not verify email uniqueness at this time.")
-
 
     # Phone number validation (check digits after stripping formatting)
     phone_digits = re.sub(r"[-()\s]", "", data['phone_number'])
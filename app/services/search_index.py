@@ -0,0 +1,223 @@
+# bookstore_app_with_login/app/services/search_index.py
+
+"""
+An in-process inverted index for searching books.
+
+The index maps every token found in a book's title, author, genre and
+description to the books that contain it, so a query is answered with a few
+dictionary lookups instead of a database scan. It is kept up to date
+incrementally as books are written, and rebuilt periodically by book_service.
+"""
+
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+# --- Tokenization ---
+TOKEN_PATTERN = re.compile(r"[^\W_]+") # Runs of letters/digits (Unicode-aware)
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "to", "with",
+})
+
+# --- Ranking ---
+# A match in the title counts more than one in the description.
+FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "genre": 1.5, "description": 1.0}
+PREFIX_MATCH_WEIGHT = 0.7 # Score multiplier for "tolk" matching "tolkien" vs. an exact match
+MIN_PREFIX_LENGTH = 2 # Shorter query terms only match whole tokens
+MAX_PREFIX_EXPANSIONS = 50 # Bounds the work done for very short prefixes
+
+# Book columns kept in memory so results can be rendered without querying Postgres.
+SUMMARY_FIELDS = ("book_id", "title", "author", "genre", "price", "stock_quantity")
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase search tokens, dropping common stop words.
+
+    Args:
+        text (str | None): The text to tokenize.
+
+    Returns:
+        list[str]: The tokens, in order of appearance.
+    """
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(str(text).casefold()) if token not in STOP_WORDS]
+
+
+class BookSearchIndex:
+    """
+    A thread-safe inverted index over book title, author, genre and description.
+
+    Queries use AND semantics (every query term must match), support prefix
+    matching ("hobb" finds "hobbit"), and rank results with a TF-IDF style score
+    weighted by the field a term was found in.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {} # term -> {book_id: weighted term frequency}
+        self._terms = [] # Sorted vocabulary, for prefix lookups
+        self._doc_fields = {} # book_id -> {field: Counter(tokens)}
+        self._summaries = {} # book_id -> {column: value} for SUMMARY_FIELDS
+
+    def __len__(self):
+        return len(self._summaries)
+
+    # --- Maintenance ---
+
+    def add(self, book_id, fields):
+        """
+        Adds a book to the index, or replaces the indexed copy if it already exists.
+
+        Args:
+            book_id (int): The book's ID.
+            fields (dict): Column values; any of FIELD_WEIGHTS' keys are indexed and
+                           SUMMARY_FIELDS are kept for rendering results.
+        """
+        with self._lock:
+            self._remove_locked(book_id)
+            self._summaries[book_id] = {column: fields.get(column) for column in SUMMARY_FIELDS}
+            self._summaries[book_id]["book_id"] = book_id
+            self._doc_fields[book_id] = {
+                field: Counter(tokenize(fields.get(field))) for field in FIELD_WEIGHTS
+            }
+            self._index_doc_locked(book_id)
+
+    def update(self, book_id, changes):
+        """
+        Applies changed column values to an indexed book.
+
+        Only the changed text fields are re-tokenized. Unknown books are added if
+        `changes` carries a title (i.e., looks like a complete new row) and ignored
+        otherwise; the periodic rebuild picks them up.
+
+        Args:
+            book_id (int): The book's ID.
+            changes (dict): The columns that changed, mapped to their new values.
+        """
+        with self._lock:
+            summary = self._summaries.get(book_id)
+            if summary is not None:
+                for column in SUMMARY_FIELDS:
+                    if column in changes and column != "book_id":
+                        summary[column] = changes[column]
+
+                changed_text = [field for field in FIELD_WEIGHTS if field in changes]
+                if changed_text:
+                    self._unindex_doc_locked(book_id)
+                    for field in changed_text:
+                        self._doc_fields[book_id][field] = Counter(tokenize(changes[field]))
+                    self._index_doc_locked(book_id)
+                return
+
+        if "title" in changes:
+            self.add(book_id, changes)
+
+    def remove(self, book_id):
+        """Removes a book from the index (no-op if it isn't indexed)."""
+        with self._lock:
+            self._remove_locked(book_id)
+
+    def _remove_locked(self, book_id):
+        if book_id in self._doc_fields:
+            self._unindex_doc_locked(book_id)
+            del self._doc_fields[book_id]
+        self._summaries.pop(book_id, None)
+
+    def _doc_weights(self, book_id):
+        """Returns {term: weighted term frequency} for one book."""
+        weights = Counter()
+        for field, counts in self._doc_fields[book_id].items():
+            field_weight = FIELD_WEIGHTS[field]
+            for term, count in counts.items():
+                weights[term] += field_weight * (1.0 + math.log(count))
+        return weights
+
+    def _index_doc_locked(self, book_id):
+        for term, weight in self._doc_weights(book_id).items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._terms, term)
+            postings[book_id] = weight
+
+    def _unindex_doc_locked(self, book_id):
+        for term in self._doc_weights(book_id):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._terms, term)
+                if position < len(self._terms) and self._terms[position] == term:
+                    del self._terms[position]
+
+    # --- Querying ---
+
+    def _expand_locked(self, query_term):
+        """Returns [(term, match_weight)] for the exact term and its prefix completions."""
+        expansions = []
+        if query_term in self._postings:
+            expansions.append((query_term, 1.0))
+        if len(query_term) >= MIN_PREFIX_LENGTH:
+            position = bisect_left(self._terms, query_term)
+            while position < len(self._terms) and len(expansions) < MAX_PREFIX_EXPANSIONS:
+                term = self._terms[position]
+                if not term.startswith(query_term):
+                    break
+                if term != query_term:
+                    expansions.append((term, PREFIX_MATCH_WEIGHT))
+                position += 1
+        return expansions
+
+    def search(self, query, offset=0, limit=20):
+        """
+        Finds the books matching every term of `query`, best matches first.
+
+        Args:
+            query (str): Free-text search terms.
+            offset (int): Number of ranked results to skip (for pagination).
+            limit (int): Maximum number of results to return.
+
+        Returns:
+            tuple[list[dict], int]: The summaries of the matching books on the requested
+                                    page (SUMMARY_FIELDS plus 'score'), and the total
+                                    number of matches.
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return [], 0
+
+        with self._lock:
+            total_docs = len(self._summaries) or 1
+            scores = None
+            for query_term in query_terms:
+                term_scores = {}
+                for term, match_weight in self._expand_locked(query_term):
+                    postings = self._postings[term]
+                    idf = math.log(1.0 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for book_id, weight in postings.items():
+                        score = idf * weight * match_weight
+                        # A document matching several completions counts its best one
+                        if score > term_scores.get(book_id, 0.0):
+                            term_scores[book_id] = score
+                if not term_scores:
+                    return [], 0 # AND semantics: one unmatched term means no results
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {book_id: score + term_scores[book_id]
+                              for book_id, score in scores.items() if book_id in term_scores}
+                    if not scores:
+                        return [], 0
+
+            ranked = sorted(scores.items(),
+                            key=lambda item: (-item[1], (self._summaries[item[0]]["title"] or "").casefold(), item[0]))
+            page = [dict(self._summaries[book_id], score=score)
+                    for book_id, score in ranked[offset:offset + limit]]
+        return page, len(ranked)
@@ -0,0 +1,12 @@
+# bookstore_app_with_login/benchmarks/__init__.py
+
+"""
+End-to-end benchmarks for the bookstore app.
+
+    python -m benchmarks.seed     # (re)build the benchmark database
+    python -m benchmarks.run      # drive the app and write a results JSON file
+    python -m benchmarks.compare  # compare two results files
+
+Everything runs against BENCH_DATABASE_URL, never DATABASE_URL, because seeding
+drops and recreates the schema.
+"""
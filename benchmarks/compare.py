@@ -0,0 +1,92 @@
+# bookstore_app_with_login/benchmarks/compare.py
+
+"""
+Compares two benchmark results files (see benchmarks/run.py).
+
+Prints each endpoint's throughput and p50/p95/p99 latency side by side with the
+relative change, and flags changes worse than the threshold. The exit code is 1
+if anything regressed, so the comparison can gate a CI job.
+
+Usage:
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --threshold 5
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 10.0 # Percent change treated as a regression
+# (metric label, path into an endpoint's stats, True if higher is better)
+METRICS = (
+    ("req/s", ("throughput_rps",), True),
+    ("p50 ms", ("latency_ms", "p50"), False),
+    ("p95 ms", ("latency_ms", "p95"), False),
+    ("p99 ms", ("latency_ms", "p99"), False),
+)
+
+
+def _lookup(stats, path):
+    for key in path:
+        stats = (stats or {}).get(key)
+    return stats
+
+
+def compare(before, after, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares the endpoint statistics of two results documents.
+
+    Args:
+        before (dict): The baseline results.
+        after (dict): The new results.
+        threshold (float): Percent change beyond which a metric counts as regressed.
+
+    Returns:
+        list[dict]: One row per endpoint and metric with 'endpoint', 'metric',
+                    'before', 'after', 'change_pct' and 'regressed'.
+    """
+    rows = []
+    for endpoint, new_stats in after["endpoints"].items():
+        old_stats = before["endpoints"].get(endpoint)
+        for label, path, higher_is_better in METRICS:
+            old, new = _lookup(old_stats, path), _lookup(new_stats, path)
+            change = (new - old) / old * 100 if old and new is not None else None
+            worse = change is not None and (-change if higher_is_better else change) > threshold
+            rows.append({"endpoint": endpoint, "metric": label, "before": old, "after": new,
+                         "change_pct": change, "regressed": worse})
+    return rows
+
+
+def main(argv=None):
+    """Command-line entry point. Returns 1 if any metric regressed, else 0."""
+    parser = argparse.ArgumentParser(description="Compare two benchmark results files.")
+    parser.add_argument("before", help="Baseline results JSON.")
+    parser.add_argument("after", help="New results JSON.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Percent change counted as a regression (default: {DEFAULT_THRESHOLD:g}).")
+    args = parser.parse_args(argv)
+
+    documents = []
+    for path in (args.before, args.after):
+        with open(path, encoding="utf-8") as f:
+            documents.append(json.load(f))
+    before, after = documents
+
+    print(f"before: {(before.get('commit') or 'unknown')[:12]} ({before.get('target')}, {before.get('started_at')})")
+    print(f"after:  {(after.get('commit') or 'unknown')[:12]} ({after.get('target')}, {after.get('started_at')})")
+    if before.get("config") != after.get("config") or before.get("dataset") != after.get("dataset"):
+        print("warning: the runs used different settings or datasets; the numbers may not be comparable.")
+
+    rows = compare(before, after, args.threshold)
+    print(f"\n{'endpoint':<20} {'metric':<7} {'before':>10} {'after':>10} {'change':>9}")
+    for row in rows:
+        change = f"{row['change_pct']:+.1f}%" if row["change_pct"] is not None else "-"
+        fmt = lambda value: f"{value:.2f}" if value is not None else "-"
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(f"{row['endpoint']:<20} {row['metric']:<7} {fmt(row['before']):>10} {fmt(row['after']):>10} "
+              f"{change:>9}{flag}")
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+# bookstore_app_with_login/benchmarks/generate.py
+
+"""
+Generates a synthetic bookstore dataset at any scale.
+
+Writes books, customers, orders and order_items as PostgreSQL COPY text files,
+and can bulk load them into the benchmark database. Popularity is skewed the way
+real catalogs are, following a Zipf distribution (the k-th most popular item is
+picked in proportion to 1 / k^s):
+
+    - a few authors write many of the books, most authors write one or two;
+    - each author mostly writes in one genre, and a few genres dominate;
+    - a few bestsellers appear on many order lines, most books rarely sell;
+    - some customers order much more often than others.
+
+Customer i has the email benchmarks.seed.bench_email(i) and the password
+BENCH_PASSWORD, so the generated customers are the benchmark's users. Hashing is
+the slow part of generating customers, so only --distinct-hashes hashes are
+computed and reused (each with its own salt).
+
+The generator is deterministic for a given --seed (apart from order dates, which
+are relative to today).
+
+Usage:
+    python -m benchmarks.generate --out /tmp/bench-data --books 1000000 --order-items 10000000
+    python -m benchmarks.generate --out /tmp/bench-data --load      # also load into BENCH_DATABASE_URL
+    python -m benchmarks.seed --data /tmp/bench-data                 # or seed from the files later
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+import psycopg2
+from werkzeug.security import generate_password_hash
+from benchmarks.seed import BENCH_PASSWORD, DEFAULT_METHOD, bench_database_url, bench_email
+from gen_password_hash import copy_escape
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+DEFAULT_BOOKS = 100_000
+DEFAULT_CUSTOMERS = 10_000
+DEFAULT_ORDER_ITEMS = 1_000_000
+DEFAULT_ITEMS_PER_ORDER = 3 # Mean order lines per order
+DEFAULT_SKEW = 1.0 # Zipf exponent for authors and book sales
+DEFAULT_DISTINCT_HASHES = 16
+CHUNK_SIZE = 50_000 # Rows generated and written at a time
+MANIFEST_FILE = "manifest.json"
+
+# Table -> (COPY file, columns), in load order (parents before children).
+TABLES = {
+    "books": ("books.copy", ("book_id", "title", "author", "price", "stock_quantity", "genre", "description")),
+    "customers": ("customers.copy", ("customer_id", "name", "email", "phone_number", "password", "is_guest",
+                                     "created_at", "first_name", "last_name", "address_line1", "address_line2",
+                                     "city", "state", "zip_code")),
+    "orders": ("orders.copy", ("order_id", "customer_id", "order_date", "total_amount")),
+    "order_items": ("order_items.copy", ("order_item_id", "order_id", "book_id", "quantity")),
+}
+# Serial columns whose sequences must continue after the loaded IDs.
+SEQUENCES = {"books": "book_id", "customers": "customer_id", "orders": "order_id", "order_items": "order_item_id"}
+
+GENRES = ("Fantasy", "Mystery", "Romance", "Thriller", "Science Fiction", "Historical Fiction", "Horror",
+          "Adventure", "Drama", "Crime", "Non-Fiction", "Biography", "Classics", "Young Adult", "Technology",
+          "Psychology", "Self-Help", "Poetry", "Action", "Humor", "History", "Travel", "Cooking", "Art")
+FIRST_NAMES = ("James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William",
+               "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+               "Charles", "Karen", "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Sandra",
+               "Steven", "Ashley", "Paul", "Emily", "Andrew", "Donna", "Joshua", "Michelle", "Kevin", "Carol",
+               "Brian", "Amanda", "George", "Melissa", "Oscar", "Grace", "Liam", "Sophia", "Ethan", "Olivia",
+               "Lucas", "Hannah", "Nina", "Fiona", "Samuel", "Lily", "Harper", "Isabella", "Ava", "Benjamin")
+LAST_NAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore",
+              "Jackson", "Martin", "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez",
+              "Lewis", "Robinson", "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen",
+              "Hill", "Flores", "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+              "Carter", "Roberts", "Turner", "Collins", "Patel", "Gray", "Black", "Blue", "Reynolds", "Clarke")
+TITLE_ADJECTIVES = ("Silent", "Hidden", "Broken", "Golden", "Last", "Lost", "Crimson", "Midnight", "Forgotten",
+                    "Burning", "Distant", "Secret", "Endless", "Shattered", "Wild", "Quiet", "Iron", "Winter",
+                    "Ancient", "Final", "Hollow", "Silver", "Fallen", "Bright")
+TITLE_NOUNS = ("Kingdom", "River", "Garden", "Empire", "Shadow", "Letter", "Promise", "Storm", "City", "Voyage",
+               "Crown", "Echo", "Harbor", "Mountain", "Road", "House", "Sky", "Forest", "Mirror", "Island",
+               "Machine", "Heart", "Signal", "Witness")
+TITLE_PATTERNS = ("The {adj} {noun}", "{adj} {noun}", "The {noun} of {other}", "A {adj} {noun}",
+                  "{noun} and {other}", "Beyond the {adj} {noun}")
+CITIES = (("Springfield", "IL", "62701"), ("Austin", "TX", "73301"), ("Portland", "OR", "97201"),
+          ("Denver", "CO", "80201"), ("Columbus", "OH", "43004"), ("Madison", "WI", "53703"),
+          ("Raleigh", "NC", "27601"), ("Boise", "ID", "83702"), ("Albany", "NY", "12207"),
+          ("Tampa", "FL", "33602"), ("Phoenix", "AZ", "85001"), ("Seattle", "WA", "98101"))
+STREETS = ("Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Park Rd", "Elm St", "Pine St", "Lake View Dr")
+
+
+def zipf_cum_weights(n, skew):
+    """
+    Returns cumulative Zipf weights for ranks 1..n, for `random.choices(cum_weights=...)`.
+
+    Args:
+        n (int): Number of items.
+        skew (float): The exponent s; 0 is uniform, larger is more skewed.
+    """
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def author_name(index):
+    """Returns a distinct author name for every index (first name, middle initial, last name)."""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    index //= len(FIRST_NAMES)
+    last = LAST_NAMES[index % len(LAST_NAMES)]
+    index //= len(LAST_NAMES)
+    name = f"{first} {chr(ord('A') + index % 26)}. {last}"
+    return name if index < 26 else f"{name} {index // 26 + 1}"
+
+
+def _write_rows(f, rows):
+    f.write("".join("\t".join(copy_escape(value) for value in row) + "\n" for row in rows))
+
+
+def _money(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def generate_books(path, count, authors, skew, rng):
+    """
+    Writes `count` books and returns their prices in cents (index = book_id - 1).
+
+    Authors are Zipf-distributed; each author has a main genre (itself
+    Zipf-distributed over GENRES) used for 80% of their books.
+    """
+    author_genre = rng.choices(range(len(GENRES)), cum_weights=zipf_cum_weights(len(GENRES), skew), k=authors)
+    author_weights = zipf_cum_weights(authors, skew)
+    genre_weights = zipf_cum_weights(len(GENRES), skew)
+    prices = []
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, count, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, count - start)
+            book_authors = rng.choices(range(authors), cum_weights=author_weights, k=size)
+            rows = []
+            for offset, author in enumerate(book_authors):
+                name = author_name(author)
+                if rng.random() < 0.8:
+                    genre = GENRES[author_genre[author]]
+                else:
+                    genre = GENRES[rng.choices(range(len(GENRES)), cum_weights=genre_weights)[0]]
+                title = rng.choice(TITLE_PATTERNS).format(adj=rng.choice(TITLE_ADJECTIVES),
+                                                          noun=rng.choice(TITLE_NOUNS),
+                                                          other=rng.choice(TITLE_NOUNS))
+                price = rng.randrange(499, 4000)
+                prices.append(price)
+                rows.append((str(start + offset + 1), title, name, _money(price), str(rng.randint(0, 200)), genre,
+                             f"A {genre.lower()} novel by {name}: {title.lower()}."))
+            _write_rows(f, rows)
+    return prices
+
+
+def generate_customers(path, count, hashes, rng):
+    """Writes `count` customers; customer i (ID i + 1) is bench user i."""
+    now = datetime.now().replace(microsecond=0)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, count, CHUNK_SIZE):
+            rows = []
+            for number in range(start, min(start + CHUNK_SIZE, count)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                city, state, zip_code = rng.choice(CITIES)
+                created_at = now - timedelta(seconds=rng.randrange(3 * 365 * 86400))
+                rows.append((str(number + 1), f"{first} {last}", bench_email(number), f"555{number % 10_000_000:07d}",
+                             hashes[number % len(hashes)], "f", created_at.isoformat(sep=" "), first, last,
+                             f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", None, city, state, zip_code))
+            _write_rows(f, rows)
+
+
+def generate_orders(orders_path, items_path, order_items, items_per_order, customers, prices, skew, rng):
+    """
+    Writes orders and their order lines until `order_items` lines exist.
+
+    Each order has between 1 and 2 * items_per_order - 1 lines, picked from
+    Zipf-distributed books (bestsellers first), and a total matching its lines.
+
+    Returns:
+        int: The number of orders written.
+    """
+    book_weights = zipf_cum_weights(len(prices), skew)
+    # Heavy buyers are far less pronounced than bestsellers
+    customer_weights = zipf_cum_weights(customers, skew / 2)
+    today = date.today()
+    order_id = item_id = 0
+    with open(orders_path, "w", encoding="utf-8", newline="") as orders_file, \
+         open(items_path, "w", encoding="utf-8", newline="") as items_file:
+        while item_id < order_items:
+            order_count = max(min(CHUNK_SIZE, (order_items - item_id) // items_per_order), 1)
+            buyers = rng.choices(range(customers), cum_weights=customer_weights, k=order_count)
+            order_rows, item_rows = [], []
+            for buyer in buyers:
+                if item_id >= order_items:
+                    break
+                order_id += 1
+                lines = min(rng.randint(1, 2 * items_per_order - 1), order_items - item_id)
+                total = 0
+                for book in rng.choices(range(len(prices)), cum_weights=book_weights, k=lines):
+                    item_id += 1
+                    quantity = rng.choice((1, 1, 1, 2, 2, 3))
+                    total += prices[book] * quantity
+                    item_rows.append((str(item_id), str(order_id), str(book + 1), str(quantity)))
+                order_date = today - timedelta(days=rng.randrange(730))
+                order_rows.append((str(order_id), str(buyer + 1), order_date.isoformat(), _money(total)))
+            _write_rows(orders_file, order_rows)
+            _write_rows(items_file, item_rows)
+    return order_id
+
+
+def generate(out_dir, books=DEFAULT_BOOKS, customers=DEFAULT_CUSTOMERS, order_items=DEFAULT_ORDER_ITEMS,
+             items_per_order=DEFAULT_ITEMS_PER_ORDER, authors=None, skew=DEFAULT_SKEW,
+             distinct_hashes=DEFAULT_DISTINCT_HASHES, method=DEFAULT_METHOD, seed=0):
+    """
+    Generates a dataset into `out_dir`, with a manifest of its row counts and settings.
+
+    Args:
+        out_dir (str): Directory for the .copy files (created if missing).
+        books (int): Number of books.
+        customers (int): Number of customers.
+        order_items (int): Number of order lines; orders are derived from it.
+        items_per_order (int): Mean order lines per order.
+        authors (int, optional): Number of authors. Defaults to one per 10 books.
+        skew (float): Zipf exponent for authors, genres and book sales.
+        distinct_hashes (int): Password hashes computed and shared among customers.
+        method (str): The werkzeug hash method.
+        seed (int): Random seed.
+
+    Returns:
+        dict: The manifest (row counts and generation settings).
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    authors = authors or max(books // 10, 1)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {table: os.path.join(out_dir, filename) for table, (filename, _) in TABLES.items()}
+
+    prices = generate_books(paths["books"], books, authors, skew, rng)
+    hashes = [generate_password_hash(BENCH_PASSWORD, method) for _ in range(max(distinct_hashes, 1))]
+    generate_customers(paths["customers"], customers, hashes, rng)
+    orders = generate_orders(paths["orders"], paths["order_items"], order_items, max(items_per_order, 1),
+                             customers, prices, skew, rng)
+
+    manifest = {
+        "rows": {"books": books, "customers": customers, "orders": orders, "order_items": order_items},
+        "settings": {"authors": authors, "items_per_order": items_per_order, "skew": skew,
+                     "distinct_hashes": distinct_hashes, "method": method, "seed": seed},
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info("Generated %s in '%s' in %.1fs.", manifest["rows"], out_dir, time.perf_counter() - started)
+    return manifest
+
+
+def load(conn, data_dir):
+    """
+    Replaces the contents of the bookstore tables with a generated dataset.
+
+    Runs in one transaction: the tables are truncated, their foreign keys and
+    secondary indexes are dropped, the files are COPYed in, and the constraints
+    and indexes are recreated, which is much faster than maintaining them row by
+    row. The serial sequences are then moved past the loaded IDs.
+
+    Args:
+        conn: An open psycopg2 connection (not in autocommit mode).
+        data_dir (str): A directory written by `generate`.
+
+    Raises:
+        psycopg2.Error: If loading fails; nothing is changed in that case.
+    """
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"TRUNCATE {', '.join(reversed(TABLES))} RESTART IDENTITY CASCADE;")
+
+            # Remember, then drop, what would otherwise be checked or updated per row
+            cur.execute("""
+                SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+                  FROM pg_constraint
+                 WHERE contype = 'f' AND connamespace = 'public'::regnamespace;
+            """)
+            foreign_keys = cur.fetchall()
+            cur.execute("""
+                SELECT i.indexname, i.indexdef
+                  FROM pg_indexes i
+                 WHERE i.schemaname = 'public' AND i.tablename = ANY(%s)
+                   AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname);
+            """, (list(TABLES),))
+            indexes = cur.fetchall()
+            for table, name, _ in foreign_keys:
+                cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}";')
+            for name, _ in indexes:
+                cur.execute(f'DROP INDEX public."{name}";')
+
+            for table, (filename, columns) in TABLES.items():
+                with open(os.path.join(data_dir, filename), encoding="utf-8") as f:
+                    cur.copy_expert(f"COPY public.{table} ({', '.join(columns)}) FROM STDIN", f)
+                logger.info("Loaded %s (%.1fs).", table, time.perf_counter() - started)
+
+            for _, definition in indexes:
+                cur.execute(definition)
+            for table, name, definition in foreign_keys:
+                cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition};')
+            for table, column in SEQUENCES.items():
+                cur.execute(f"""
+                    SELECT setval(pg_get_serial_sequence('public.{table}', '{column}'),
+                                  COALESCE(max({column}), 0) + 1, false)
+                      FROM public.{table};
+                """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("Loaded the dataset from '%s' in %.1fs.", data_dir, time.perf_counter() - started)
+
+
+def main(argv=None):
+    """Command-line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic bookstore dataset as COPY files.")
+    parser.add_argument("--out", required=True, help="Directory for the generated files.")
+    parser.add_argument("--books", type=int, default=DEFAULT_BOOKS, help=f"Books (default: {DEFAULT_BOOKS}).")
+    parser.add_argument("--customers", type=int, default=DEFAULT_CUSTOMERS,
+                        help=f"Customers (default: {DEFAULT_CUSTOMERS}).")
+    parser.add_argument("--order-items", type=int, default=DEFAULT_ORDER_ITEMS,
+                        help=f"Order lines; orders follow from --items-per-order (default: {DEFAULT_ORDER_ITEMS}).")
+    parser.add_argument("--items-per-order", type=int, default=DEFAULT_ITEMS_PER_ORDER,
+                        help=f"Mean order lines per order (default: {DEFAULT_ITEMS_PER_ORDER}).")
+    parser.add_argument("--authors", type=int, help="Distinct authors (default: one per 10 books).")
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW,
+                        help=f"Zipf exponent for author, genre and sales popularity (default: {DEFAULT_SKEW:g}).")
+    parser.add_argument("--distinct-hashes", type=int, default=DEFAULT_DISTINCT_HASHES,
+                        help=f"Password hashes shared among customers (default: {DEFAULT_DISTINCT_HASHES}).")
+    parser.add_argument("--method", default=DEFAULT_METHOD, help=f"Werkzeug hash method (default: {DEFAULT_METHOD}).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    parser.add_argument("--load", action="store_true",
+                        help="Also replace the data in BENCH_DATABASE_URL (whose schema must exist).")
+    args = parser.parse_args(argv)
+
+    if min(args.books, args.customers) < 1 or args.order_items < 0:
+        parser.error("--books and --customers must be at least 1, and --order-items not negative.")
+
+    try:
+        manifest = generate(args.out, args.books, args.customers, args.order_items, args.items_per_order,
+                            args.authors, args.skew, args.distinct_hashes, args.method, args.seed)
+        if args.load:
+            conn = psycopg2.connect(dsn=bench_database_url())
+            try:
+                load(conn, args.out)
+            finally:
+                conn.close()
+    except (OSError, psycopg2.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(", ".join(f"{count} {table}" for table, count in manifest["rows"].items()) + f" written to {args.out}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+# bookstore_app_with_login/benchmarks/run.py
+
+"""
+Drives the bookstore app and reports throughput and latency per endpoint.
+
+Each virtual user is a thread with its own cookie jar, logged in as its own
+bench customer (see benchmarks/seed.py). After logging in it loops over a
+weighted mix of operations until the run ends:
+
+    index   GET /                      (cycling through the sort orders)
+    login   POST /login                (a full password verification)
+    order   POST /create_order, then GET /order/confirmation for the new order
+
+Two targets are supported:
+
+    client    create_app() in this process, driven through Flask's test client.
+              No network or server overhead, so it isolates the app's own cost;
+              all virtual users share one GIL.
+    gunicorn  a real `gunicorn main:app` started on a free local port and driven
+              over HTTP, as in production.
+
+Requests made during the warm-up period are not counted. The results, with
+p50/p95/p99 latencies, the git commit and the relevant settings, are written to a
+JSON file that `python -m benchmarks.compare` can diff against another run.
+
+Usage (seed first with `python -m benchmarks.seed`):
+    python -m benchmarks.run --target client --concurrency 8 --duration 30
+    python -m benchmarks.run --target gunicorn --workers 4 --threads 4 --concurrency 32
+    python -m benchmarks.run --mix index=6,login=1,order=3 --output before.json
+"""
+
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from decimal import Decimal
+import psycopg2
+from benchmarks.seed import REPO_ROOT, BENCH_PASSWORD, bench_database_url, bench_email, dataset_summary
+
+# --- Configuration ---
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+DEFAULT_MIX = "index=6,login=1,order=3"
+ENDPOINTS = ("login", "index", "create_order", "order_confirmation")
+INDEX_SORTS = ("title", "price", "author", "genre")
+REQUEST_TIMEOUT = 30 # Seconds before an HTTP request counts as failed
+SERVER_START_TIMEOUT = 30 # Seconds to wait for gunicorn to accept requests
+# Settings recorded with the results, since they change what is being measured.
+RECORDED_ENV_PREFIXES = ("DB_POOL_", "CATALOG_", "USER_CACHE_", "PASSWORD_", "LOGIN_THROTTLE_", "SEARCH_", "LOG_")
+
+
+class TestClientSession:
+    """Sends requests to an in-process app through Flask's test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client() # Keeps its own cookies, i.e. its own login session
+
+    def request(self, method, path, data=None):
+        """Returns (status, Location header) of one request; redirects are not followed."""
+        response = self.client.open(path, method=method, data=data)
+        response.get_data() # Make sure the whole body was produced
+        return response.status_code, response.headers.get("Location")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Leaves 3xx responses to the caller (urllib raises them as HTTPError)."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class HttpSession:
+    """Sends requests to a running server over HTTP, with a cookie jar."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        """Returns (status, Location header) of one request; redirects are not followed."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=REQUEST_TIMEOUT) as response:
+                response.read()
+                return response.status, response.headers.get("Location")
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get("Location")
+
+
+class Recorder:
+    """Per-thread latency samples and outcome counts, merged after the run."""
+
+    def __init__(self, count_after):
+        self.count_after = count_after # perf_counter value at the end of the warm-up
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.statuses = {name: {} for name in ENDPOINTS}
+
+    def timed(self, session, endpoint, method, path, data=None, expect=200, redirect_to=None):
+        """
+        Sends one request, records its latency and outcome, and returns its Location.
+
+        A request succeeds when it returns `expect` and, if given, redirects to the
+        path `redirect_to` (the app redirects failures elsewhere, e.g. back to /login).
+        """
+        started = time.perf_counter()
+        try:
+            status, location = session.request(method, path, data)
+        except (OSError, urllib.error.URLError) as e:
+            status, location = type(e).__name__, None
+        elapsed = time.perf_counter() - started
+
+        ok = status == expect and (redirect_to is None or urllib.parse.urlsplit(location or "").path == redirect_to)
+        if started >= self.count_after:
+            self.samples[endpoint].append(elapsed)
+            self.statuses[endpoint][str(status)] = self.statuses[endpoint].get(str(status), 0) + 1
+            if not ok:
+                self.errors[endpoint] += 1
+        return location if ok else None
+
+
+def percentile(sorted_values, pct):
+    """Returns the nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(text):
+    """
+    Parses an operation mix like 'index=6,login=1,order=3'.
+
+    Returns:
+        dict: Operation name -> weight.
+
+    Raises:
+        ValueError: On unknown operations or bad weights.
+    """
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in ("index", "login", "order"):
+            raise ValueError(f"Unknown operation '{name}' (expected index, login or order).")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Weight of '{name}' must not be negative.")
+    if not any(mix.values()):
+        raise ValueError("The operation mix is empty.")
+    return mix
+
+
+def load_books(database_url, limit=1000):
+    """Returns up to `limit` random (book_id, price) pairs with stock, for building orders."""
+    conn = psycopg2.connect(dsn=database_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT book_id, price FROM books WHERE stock_quantity > 10 ORDER BY random() LIMIT %s;",
+                        (limit,))
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def _order_form(rng, books):
+    """Builds the /create_order form for 1-3 random books, with the matching total."""
+    lines = rng.sample(books, k=min(rng.randint(1, 3), len(books)))
+    items = [{"book_id": book_id, "quantity": rng.randint(1, 2)} for book_id, _ in lines]
+    total = sum((Decimal(price) * item["quantity"] for (_, price), item in zip(lines, items)), Decimal("0"))
+    return {"items": json.dumps(items), "total_amount": str(total)}
+
+
+def _virtual_user(number, session, recorder, mix, books, users, stop_at, seed):
+    """The loop one virtual user runs until `stop_at`."""
+    rng = random.Random(seed + number)
+    credentials = {"email": bench_email(number % users), "password": BENCH_PASSWORD}
+    operations, weights = list(mix), list(mix.values())
+
+    def login():
+        return recorder.timed(session, "login", "POST", "/login", credentials, expect=302, redirect_to="/")
+
+    login()
+    while time.perf_counter() < stop_at:
+        operation = rng.choices(operations, weights)[0]
+        if operation == "index":
+            recorder.timed(session, "index", "GET", f"/?sort={rng.choice(INDEX_SORTS)}")
+        elif operation == "login":
+            login()
+        elif operation == "order":
+            location = recorder.timed(session, "create_order", "POST", "/create_order", _order_form(rng, books),
+                                      expect=302, redirect_to="/order/confirmation")
+            if location:
+                target = urllib.parse.urlsplit(location)
+                recorder.timed(session, "order_confirmation", "GET", f"{target.path}?{target.query}")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_url, workers, threads):
+    """
+    Starts `gunicorn main:app` on a free local port and waits until it serves /login.
+
+    Returns:
+        tuple: (subprocess.Popen, base URL)
+
+    Raises:
+        RuntimeError: If the server exits or doesn't answer within SERVER_START_TIMEOUT.
+    """
+    port = _free_port()
+    command = [sys.executable, "-m", "gunicorn", "main:app", "--bind", f"127.0.0.1:{port}",
+               "--workers", str(workers), "--threads", str(threads), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env={**os.environ, "DATABASE_URL": database_url})
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode} during startup.")
+        try:
+            with urllib.request.urlopen(f"{base_url}/login", timeout=1) as response:
+                if response.status == 200:
+                    return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    stop_gunicorn(process)
+    raise RuntimeError(f"gunicorn did not answer within {SERVER_START_TIMEOUT}s.")
+
+
+def stop_gunicorn(process):
+    """Stops the server gracefully, killing it if it doesn't exit in time."""
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def git_commit():
+    """Returns (commit hash, has uncommitted changes), or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def summarize(recorders, measured_seconds):
+    """
+    Merges the per-thread recorders into per-endpoint statistics.
+
+    Returns:
+        dict: endpoint -> requests, errors, statuses, throughput_rps and latency_ms
+              (mean, p50, p95, p99, max), plus a 'total' entry over all endpoints.
+    """
+    def stats(samples, errors, statuses):
+        samples = sorted(samples)
+        to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "statuses": statuses,
+            "throughput_rps": round(len(samples) / measured_seconds, 2) if measured_seconds else None,
+            "latency_ms": {
+                "mean": to_ms(sum(samples) / len(samples)) if samples else None,
+                "p50": to_ms(percentile(samples, 50)),
+                "p95": to_ms(percentile(samples, 95)),
+                "p99": to_ms(percentile(samples, 99)),
+                "max": to_ms(samples[-1] if samples else None),
+            },
+        }
+
+    results = {}
+    all_samples, all_errors, all_statuses = [], 0, {}
+    for endpoint in ENDPOINTS:
+        samples = [value for recorder in recorders for value in recorder.samples[endpoint]]
+        errors = sum(recorder.errors[endpoint] for recorder in recorders)
+        statuses = {}
+        for recorder in recorders:
+            for status, count in recorder.statuses[endpoint].items():
+                statuses[status] = statuses.get(status, 0) + count
+                all_statuses[status] = all_statuses.get(status, 0) + count
+        results[endpoint] = stats(samples, errors, statuses)
+        all_samples.extend(samples)
+        all_errors += errors
+    results["total"] = stats(all_samples, all_errors, all_statuses)
+    return results
+
+
+def run(target, concurrency, duration, warmup, mix, users, workers=4, threads=4, seed=0):
+    """
+    Runs one benchmark.
+
+    Args:
+        target (str): 'client' or 'gunicorn'.
+        concurrency (int): Virtual users (threads).
+        duration (float): Measured seconds, after the warm-up.
+        warmup (float): Seconds of traffic that are not counted.
+        mix (dict): Operation weights (see parse_mix).
+        users (int): Bench customers to spread the virtual users over.
+        workers (int): gunicorn worker processes (gunicorn target only).
+        threads (int): Threads per gunicorn worker (gunicorn target only).
+        seed (int): Random seed, so runs issue the same request sequence.
+
+    Returns:
+        dict: The results document written to JSON.
+    """
+    database_url = bench_database_url()
+    books = load_books(database_url)
+    if not books:
+        raise RuntimeError("The benchmark database has no books in stock; run `python -m benchmarks.seed`.")
+
+    server = None
+    if target == "gunicorn":
+        server, base_url = start_gunicorn(database_url, workers, threads)
+        make_session = lambda: HttpSession(base_url)
+    else:
+        os.environ["DATABASE_URL"] = database_url # Read by the app's connection pool
+        from app import create_app
+        app = create_app()
+        make_session = lambda: TestClientSession(app)
+
+    try:
+        started_at = datetime.now(timezone.utc)
+        count_after = time.perf_counter() + warmup
+        stop_at = count_after + duration
+        recorders = [Recorder(count_after) for _ in range(concurrency)]
+        threads_list = [threading.Thread(target=_virtual_user, name=f"bench-user-{number}",
+                                         args=(number, make_session(), recorders[number], mix, books,
+                                               users, stop_at, seed))
+                        for number in range(concurrency)]
+        for thread in threads_list:
+            thread.start()
+        for thread in threads_list:
+            thread.join()
+        measured = max(min(time.perf_counter(), stop_at) - count_after, 0.0)
+    finally:
+        if server is not None:
+            stop_gunicorn(server)
+
+    conn = psycopg2.connect(dsn=database_url)
+    try:
+        dataset = dataset_summary(conn)
+    finally:
+        conn.close()
+
+    commit, dirty = git_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "target": target,
+        "config": {
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "measured_s": round(measured, 2),
+            "mix": mix,
+            "users": users,
+            "seed": seed,
+            "gunicorn_workers": workers if target == "gunicorn" else None,
+            "gunicorn_threads": threads if target == "gunicorn" else None,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {key: value for key, value in sorted(os.environ.items())
+                         if key.startswith(RECORDED_ENV_PREFIXES)},
+        },
+        "dataset": dataset,
+        "endpoints": summarize(recorders, measured),
+    }
+
+
+def main(argv=None):
+    """Command-line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Benchmark the bookstore app against BENCH_DATABASE_URL.")
+    parser.add_argument("--target", choices=("client", "gunicorn"), default="client",
+                        help="Flask test client in-process, or a real gunicorn server (default: client).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Virtual users (default: 8).")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds (default: 30).")
+    parser.add_argument("--warmup", type=float, default=5, help="Uncounted warm-up seconds (default: 5).")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights (default: {DEFAULT_MIX}).")
+    parser.add_argument("--users", type=int, default=100,
+                        help="Bench customers seeded (default: 100, as benchmarks.seed creates).")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes (default: 4).")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker (default: 4).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the request sequence (default: 0).")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<time>-<commit>-<target>.json).")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        results = run(args.target, max(args.concurrency, 1), args.duration, args.warmup, mix,
+                      max(args.users, 1), args.workers, args.threads, args.seed)
+    except (ValueError, RuntimeError, OSError, psycopg2.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(results['commit'] or 'nogit')[:8]}-{args.target}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'endpoint':<20} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, stats in results["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"{endpoint:<20} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps'] or 0:>9.1f} "
+              + " ".join(f"{latency[key] if latency[key] is not None else '-':>9}" for key in ("p50", "p95", "p99")))
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
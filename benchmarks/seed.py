@@ -0,0 +1,202 @@
+# bookstore_app_with_login/benchmarks/seed.py
+
+"""
+Builds the benchmark database.
+
+Drops and recreates the `public` schema of BENCH_DATABASE_URL and loads
+`bookstore_backup.sql` into it with psql. With --data, the dump's rows are then
+replaced by a synthetic dataset written by `python -m benchmarks.generate`.
+Finally it creates the bench customers that the benchmark logs in as, tops up
+book stock so long runs don't sell out, and applies the schema migrations.
+Every bench customer shares the password BENCH_PASSWORD, hashed with
+PASSWORD_HASH_METHOD so logins cost what real ones do.
+
+Usage (BENCH_DATABASE_URL must point at a disposable local database):
+    python -m benchmarks.seed                              # the dump as is
+    python -m benchmarks.generate --out /tmp/bench-data --books 1000000 --order-items 10000000
+    python -m benchmarks.seed --data /tmp/bench-data --users 500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import psycopg2
+from werkzeug.security import generate_password_hash
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DUMP = os.path.join(REPO_ROOT, "bookstore_backup.sql")
+DEFAULT_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+DEFAULT_USERS = 100
+DEFAULT_STOCK = 1_000_000 # Stock every book is topped up to
+
+BENCH_PASSWORD = "BenchPass123!"
+BENCH_EMAIL_PREFIX = "bench"
+BENCH_EMAIL_DOMAIN = "@bench.example.com"
+
+
+def bench_email(number):
+    """Returns the email address of bench customer `number` (0-based)."""
+    return f"{BENCH_EMAIL_PREFIX}{number:06d}{BENCH_EMAIL_DOMAIN}"
+
+
+def bench_database_url():
+    """
+    Returns BENCH_DATABASE_URL.
+
+    Raises:
+        SystemExit: If it is not set. DATABASE_URL is deliberately not used as a
+                    fallback, since seeding wipes the database.
+    """
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        sys.exit("BENCH_DATABASE_URL environment variable is not set (seeding wipes that database).")
+    return database_url
+
+
+def reset_schema(conn):
+    """Drops everything in the public schema and recreates it empty."""
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS public CASCADE;")
+        cur.execute("CREATE SCHEMA public;")
+
+
+def load_dump(database_url, path):
+    """
+    Loads a plain-format pg_dump file with psql.
+
+    Args:
+        database_url (str): The target database.
+        path (str): The .sql dump.
+
+    Raises:
+        subprocess.CalledProcessError: If psql reports an error.
+    """
+    subprocess.run(["psql", "--quiet", "--no-psqlrc", "-v", "ON_ERROR_STOP=1",
+                    "--dbname", database_url, "--file", path],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def create_bench_users(conn, count, method):
+    """
+    Creates (or resets the password of) `count` bench customers.
+
+    Args:
+        conn: An open psycopg2 connection.
+        count (int): Number of bench customers.
+        method (str): The werkzeug hash method for BENCH_PASSWORD.
+    """
+    pwhash = generate_password_hash(BENCH_PASSWORD, method) # One hash shared by every bench user
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO customers (name, email, phone_number, password, first_name, last_name,
+                                   address_line1, city, state, zip_code, created_at)
+            SELECT 'Bench User ' || n, %s || lpad(n::text, 6, '0') || %s, '5550000000', %s,
+                   'Bench', 'User ' || n, '1 Benchmark Way', 'Springfield', 'IL', '62701', CURRENT_TIMESTAMP
+              FROM generate_series(0, %s - 1) AS n
+            ON CONFLICT (email) DO UPDATE SET password = EXCLUDED.password;
+        """, (BENCH_EMAIL_PREFIX, BENCH_EMAIL_DOMAIN, pwhash, count))
+
+
+def apply_migrations(database_url):
+    """Runs `migrate.py apply` against the benchmark database."""
+    subprocess.run([sys.executable, os.path.join(REPO_ROOT, "migrate.py"), "apply"],
+                   env={**os.environ, "DATABASE_URL": database_url}, check=True)
+
+
+def top_up_stock(conn, stock):
+    """Raises every book's stock to at least `stock`."""
+    with conn.cursor() as cur:
+        cur.execute("UPDATE books SET stock_quantity = %s WHERE stock_quantity < %s;", (stock, stock))
+
+
+def dataset_summary(conn):
+    """
+    Returns the row counts of the main tables.
+
+    Returns:
+        dict: books, customers, orders and order_items counts.
+    """
+    counts = {}
+    with conn.cursor() as cur:
+        for table in ("books", "customers", "orders", "order_items"):
+            cur.execute(f"SELECT count(*) FROM {table};")
+            counts[table] = cur.fetchone()[0]
+    return counts
+
+
+def seed(database_url, dump=DEFAULT_DUMP, data_dir=None, users=DEFAULT_USERS, stock=DEFAULT_STOCK,
+         method=DEFAULT_METHOD):
+    """
+    Rebuilds the benchmark database from scratch.
+
+    Args:
+        database_url (str): The (disposable) benchmark database.
+        dump (str): The plain-format dump to load (for its schema, and its rows unless data_dir is given).
+        data_dir (str, optional): A synthetic dataset from benchmarks.generate to load instead of the dump's rows.
+        users (int): Bench customers to create.
+        stock (int): Stock every book is topped up to.
+        method (str): The werkzeug hash method for the bench password.
+
+    Returns:
+        dict: The resulting table row counts.
+    """
+    started = time.perf_counter()
+    conn = psycopg2.connect(dsn=database_url)
+    conn.autocommit = True
+    try:
+        reset_schema(conn)
+        load_dump(database_url, dump)
+        logger.info("Benchmark database loaded from '%s'.", dump)
+
+        conn.autocommit = False
+        if data_dir:
+            from benchmarks.generate import load # Imported here; generate builds on this module
+            load(conn, data_dir)
+        create_bench_users(conn, users, method)
+        top_up_stock(conn, stock)
+        conn.commit()
+        conn.autocommit = True
+
+        # Indexes are built after the bulk inserts, which is faster than maintaining them
+        apply_migrations(database_url)
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE;") # Fresh statistics, as a long-lived database would have
+        summary = dataset_summary(conn)
+    finally:
+        conn.close()
+
+    logger.info("Benchmark database seeded in %.1fs: %s", time.perf_counter() - started, summary)
+    return summary
+
+
+def main(argv=None):
+    """Command-line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Rebuild the benchmark database (BENCH_DATABASE_URL).")
+    parser.add_argument("--dump", default=DEFAULT_DUMP, help="Plain-format dump to load (default: bookstore_backup.sql).")
+    parser.add_argument("--data", help="Directory written by `python -m benchmarks.generate` to load instead "
+                                       "of the dump's rows.")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS,
+                        help=f"Bench customers to create (default: {DEFAULT_USERS}).")
+    parser.add_argument("--stock", type=int, default=DEFAULT_STOCK,
+                        help=f"Stock every book is topped up to (default: {DEFAULT_STOCK}).")
+    parser.add_argument("--method", default=DEFAULT_METHOD,
+                        help=f"Werkzeug hash method for the bench password (default: {DEFAULT_METHOD}).")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = seed(bench_database_url(), args.dump, args.data, max(args.users, 1),
+                       args.stock, args.method)
+    except (OSError, subprocess.CalledProcessError, psycopg2.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(", ".join(f"{count} {table}" for table, count in summary.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
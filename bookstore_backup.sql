@@ -53,7 +53,8 @@ CREATE TABLE public.books (
     price numeric(10,2) DEFAULT 19.99,
     stock_quantity integer DEFAULT 1,
     genre character varying(255) DEFAULT 'Unknown'::character varying,
-    description text DEFAULT 'This is a placeholder book description.'::text
+    description text DEFAULT 'This is a placeholder book description.'::text,
+    search_vector tsvector GENERATED ALWAYS AS ((((setweight(to_tsvector('english'::regconfig, (COALESCE(title, ''::character varying))::text), 'A'::"char") || setweight(to_tsvector('english'::regconfig, (COALESCE(author, ''::character varying))::text), 'B'::"char")) || setweight(to_tsvector('english'::regconfig, (COALESCE(genre, ''::character varying))::text), 'C'::"char")) || setweight(to_tsvector('english'::regconfig, COALESCE(description, ''::text)), 'D'::"char"))) STORED
 );
 
 
@@ -1391,6 +1392,13 @@ ALTER TABLE ONLY public.users
     ADD CONSTRAINT users_username_key UNIQUE (username);
 
 
+--
+-- Name: books_search_vector_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX books_search_vector_idx ON public.books USING gin (search_vector);
+
+
 --
 -- Name: unique_lower_email; Type: INDEX; Schema: public; Owner: -
 --
@@ -1,29 +1,148 @@
 # bookstore_app_with_login/gen_password_hash.py
 
 """
-Utility script to generate a Werkzeug password hash for a given password.
+Utility script to generate Werkzeug password hashes.
 
-This script is typically used for manual database setup or testing purposes.
-It takes a plain-text password, hashes it using Werkzeug's security functions,
-and prints the resulting hash to the console.
+Single mode hashes one password and prints the hash, for manual database
+setup or testing:
+
+    python gen_password_hash.py                    # prompts for the password
+    python gen_password_hash.py 'S3cret!pass'
+
+Bulk mode reads a CSV of credentials (email,password per line; an optional
+'email,password' header is skipped), hashes them on every CPU core, and writes
+PostgreSQL COPY text format (email<TAB>hash) for seeding large test datasets:
+
+    python gen_password_hash.py --input creds.csv --output hashes.copy
+    psql "$DATABASE_URL" -c "\\copy staging_credentials (email, password) FROM 'hashes.copy'"
+
+The hash method defaults to PASSWORD_HASH_METHOD (the same setting the app uses
+for new hashes); lower-cost methods such as 'pbkdf2:sha256:1000' are handy for
+throwaway test data.
 """
 
+import argparse
+import csv
+import getpass
+import multiprocessing
+import os
+import sys
+import time
 from werkzeug.security import generate_password_hash
 
 # --- Configuration ---
-# Set the plain-text password you want to hash here.
-# IMPORTANT: Do not hardcode sensitive passwords in production code.
-# Consider using environment variables or a secure input method if needed.
-PASSWORD_TO_HASH = 'your_password_here' # Replace with the actual password
+DEFAULT_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+CHUNK_SIZE = 64 # Credentials sent to a worker process at a time
 
-# --- Execution ---
-if __name__ == "__main__":
-    # Generate the password hash using Werkzeug's recommended method.
-    # The method automatically includes a salt and uses a strong hashing algorithm.
-    hashed_password = generate_password_hash(PASSWORD_TO_HASH)
+
+def copy_escape(value):
+    """
+    Escapes a value for PostgreSQL's COPY text format.
+
+    Args:
+        value (str | None): The field value. None becomes \\N (NULL).
+
+    Returns:
+        str: The escaped field.
+    """
+    if value is None:
+        return "\\N"
+    return (value.replace("\\", "\\\\").replace("\t", "\\t")
+                 .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def read_credentials(path):
+    """
+    Yields (email, password) pairs from a CSV file, skipping blank lines and a header.
+
+    Args:
+        path (str): The CSV file, or '-' for standard input.
+    """
+    source = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        for line_number, row in enumerate(csv.reader(source), start=1):
+            if not row:
+                continue
+            if line_number == 1 and [cell.strip().lower() for cell in row[:2]] == ["email", "password"]:
+                continue
+            if len(row) < 2:
+                print(f"Skipping line {line_number}: expected email,password.", file=sys.stderr)
+                continue
+            yield row[0].strip().lower(), row[1]
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def _hash_credential(job):
+    """Worker function: hashes one (email, password, method) job."""
+    email, password, method = job
+    return email, generate_password_hash(password, method)
+
+
+def hash_bulk(input_path, output_path, method, workers):
+    """
+    Hashes every credential in `input_path` in parallel and writes COPY-format lines.
+
+    Credentials are streamed through the worker pool in input order, so memory use
+    stays flat however large the file is.
+
+    Args:
+        input_path (str): The CSV of email,password rows ('-' for stdin).
+        output_path (str): Where to write email<TAB>hash lines ('-' for stdout).
+        method (str): The werkzeug hash method.
+        workers (int): Number of hashing processes.
+
+    Returns:
+        int: The number of credentials hashed.
+    """
+    jobs = ((email, password, method) for email, password in read_credentials(input_path))
+    output = sys.stdout if output_path == "-" else open(output_path, "w", newline="", encoding="utf-8")
+    count = 0
+    started = time.perf_counter()
+    try:
+        with multiprocessing.Pool(processes=workers) as pool:
+            for email, pwhash in pool.imap(_hash_credential, jobs, chunksize=CHUNK_SIZE):
+                output.write(f"{copy_escape(email)}\t{copy_escape(pwhash)}\n")
+                count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else 0
+    print(f"Hashed {count} passwords with '{method}' on {workers} processes in {elapsed:.1f}s ({rate:.0f}/s).",
+          file=sys.stderr)
+    return count
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate Werkzeug password hashes (single or bulk).")
+    parser.add_argument("password", nargs="?", help="Password to hash (single mode). Prompted for if omitted.")
+    parser.add_argument("--input", help="CSV of email,password rows to hash in bulk ('-' for stdin).")
+    parser.add_argument("--output", default="-", help="Bulk output file in COPY text format (default: stdout).")
+    parser.add_argument("--method", default=DEFAULT_METHOD, help=f"Werkzeug hash method (default: {DEFAULT_METHOD}).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Hashing processes for bulk mode (default: all cores).")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        hash_bulk(args.input, args.output, args.method, max(args.workers, 1))
+        return 0
+
+    # --- Single mode ---
+    # IMPORTANT: Do not hardcode sensitive passwords in code or shell history in production.
+    password = args.password or getpass.getpass("Password to hash: ")
+    hashed_password = generate_password_hash(password, args.method)
 
     # Print the generated hash to the console.
     # This hash can then be stored in the database (e.g., in the 'customers' table).
     print("Generated Password Hash:")
     print(hashed_password)
-    print("\nCopy this hash and store it securely in your database.")
\ No newline at end of file
+    print("\nCopy this hash and store it securely in your database.")
+    return 0
+
+
+# --- Execution ---
+if __name__ == "__main__":
+    sys.exit(main())
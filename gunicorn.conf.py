@@ -0,0 +1,30 @@
+# bookstore_app_with_login/gunicorn.conf.py
+
+"""
+Gunicorn settings, loaded automatically by `gunicorn main:app`.
+
+Sets up prometheus_client's multiprocess mode so that /metrics reports the sum
+of every worker's metrics: each worker writes its values to files in
+PROMETHEUS_MULTIPROC_DIR, which is emptied when the server starts and from
+which a dead worker's live gauges are removed.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Must be set before any worker imports prometheus_client.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "bookstore_prometheus"))
+
+
+def on_starting(server):
+    """Starts from an empty metrics directory (files from a previous run would be summed in)."""
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drops the exited worker's live gauges (in-flight requests, pool connections, ...)."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,276 @@
+# bookstore_app_with_login/import_customers.py
+
+"""
+Bulk import of customer accounts from a CSV file.
+
+Each row goes through the same rules as the registration form
+(`sanitize_form_input` and `validate_registration`), and its password is
+hashed, on a pool of worker processes. Valid rows are loaded in batches:
+COPY into a temporary staging table, then one
+INSERT ... SELECT ... ON CONFLICT (lower(email)) DO NOTHING into `customers`, so accounts whose
+email is already registered are skipped rather than failing the batch (a batch
+that races a registration of one of its emails is retried). Every rejected row
+is written to an error file with its line number and reasons.
+
+The CSV needs a header row with the registration form's field names:
+
+    first_name,last_name,email,phone_number,password,address_line1,address_line2,city,state,zip_code
+
+(`confirm_password` is optional and defaults to `password`.)
+
+Usage (DATABASE_URL must be set unless --dry-run):
+    python import_customers.py partners.csv
+    python import_customers.py partners.csv --errors rejects.csv --workers 8 --batch-size 20000
+    python import_customers.py partners.csv --method pbkdf2:sha256:1000   # cheap hashes for test data
+
+Throughput is bound by the password hash: with the default scrypt method expect
+roughly 20 rows per second per core; test imports can pass a cheaper --method.
+"""
+
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import re
+import sys
+import time
+import psycopg2
+from werkzeug.security import generate_password_hash
+from app.models.customer import is_duplicate_email_error
+from app.services.reg_service import sanitize_form_input, validate_registration
+from gen_password_hash import copy_escape
+from logger import logger # Import the custom logger
+
+# --- Configuration ---
+DEFAULT_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+DEFAULT_BATCH_SIZE = 20000 # Rows per COPY + INSERT transaction
+LOAD_ATTEMPTS = 3 # Tries per batch when a concurrent registration takes one of its emails
+CHUNK_SIZE = 200 # Rows handed to a worker process at a time
+
+# Column order of the staging table (and of the COPY data).
+STAGING_COLUMNS = ("line_no", "name", "email", "phone_number", "password", "first_name", "last_name",
+                   "address_line1", "address_line2", "city", "state", "zip_code")
+
+
+def _prepare_rows(job):
+    """
+    Worker function: validates and hashes a chunk of CSV rows.
+
+    Args:
+        job (tuple): (rows, method) where rows is a list of (line_no, dict).
+
+    Returns:
+        list[tuple]: ('ok', staging_tuple) or ('rejected', (line_no, email, errors)) per row.
+    """
+    rows, method = job
+    results = []
+    for line_no, row in rows:
+        row = {key: (value or "") for key, value in row.items() if key is not None}
+        row.setdefault("confirm_password", row.get("password", ""))
+        safe_data = sanitize_form_input(row)
+        errors = validate_registration(safe_data)
+        if errors:
+            results.append(("rejected", (line_no, safe_data.get("email", ""), errors)))
+            continue
+
+        # Same column mapping as reg_service.register_user
+        full_name = f"{safe_data.get('first_name', '')} {safe_data.get('last_name', '')}".strip()
+        results.append(("ok", (
+            line_no,
+            full_name,
+            safe_data["email"],
+            re.sub(r"[-()\s]", "", safe_data.get("phone_number", "")),
+            generate_password_hash(safe_data["password"], method),
+            safe_data.get("first_name"),
+            safe_data.get("last_name"),
+            safe_data.get("address_line1"),
+            safe_data.get("address_line2") or None,
+            safe_data.get("city"),
+            safe_data.get("state"),
+            safe_data.get("zip_code"),
+        )))
+    return results
+
+
+def _read_chunks(path, method):
+    """Yields (rows, method) jobs of CHUNK_SIZE CSV rows, keeping their line numbers."""
+    with open(path, newline="", encoding="utf-8") as source:
+        reader = csv.DictReader(source)
+        chunk = []
+        for row in reader:
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= CHUNK_SIZE:
+                yield chunk, method
+                chunk = []
+        if chunk:
+            yield chunk, method
+
+
+class CustomerLoader:
+    """Loads batches of prepared rows through a temporary staging table."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        with conn.cursor() as cur:
+            # Emptied automatically at every commit, i.e. after each batch
+            cur.execute("""
+                CREATE TEMP TABLE customer_import_staging (
+                    line_no integer, name text, email text, phone_number text, password text,
+                    first_name text, last_name text, address_line1 text, address_line2 text,
+                    city text, state text, zip_code text
+                ) ON COMMIT DELETE ROWS;
+            """)
+        conn.commit()
+
+    def load(self, rows):
+        """
+        Inserts one batch of rows, skipping emails that are already registered.
+
+        Args:
+            rows (list[tuple]): Staging tuples in STAGING_COLUMNS order.
+
+        Returns:
+            list[tuple]: (line_no, email) for each row skipped as a duplicate.
+        """
+        data = io.StringIO()
+        for row in rows:
+            data.write("\t".join(copy_escape(None if value is None else str(value)) for value in row))
+            data.write("\n")
+
+        for attempt in range(1, LOAD_ATTEMPTS + 1):
+            data.seek(0)
+            try:
+                with self.conn.cursor() as cur:
+                    cur.copy_expert(f"COPY customer_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN", data)
+                    cur.execute("""
+                        WITH inserted AS (
+                            INSERT INTO customers (name, email, phone_number, password, first_name, last_name,
+                                                   address_line1, address_line2, city, state, zip_code, created_at)
+                            SELECT name, email, phone_number, password, first_name, last_name,
+                                   address_line1, address_line2, city, state, zip_code, CURRENT_TIMESTAMP
+                              FROM customer_import_staging
+                            ON CONFLICT (lower(email)) DO NOTHING -- unique_lower_email
+                            RETURNING email
+                        )
+                        SELECT s.line_no, s.email
+                          FROM customer_import_staging s
+                          LEFT JOIN inserted i ON i.email = s.email
+                         WHERE i.email IS NULL
+                         ORDER BY s.line_no;
+                    """)
+                    duplicates = cur.fetchall()
+                self.conn.commit()
+                return duplicates
+            except Exception as e:
+                self.conn.rollback()
+                # A registration committed one of the batch's emails mid-insert and the row hit
+                # customers_email_key, which ON CONFLICT can't also target. On a retry the
+                # email is already registered, so ON CONFLICT skips it like any other duplicate.
+                if not is_duplicate_email_error(e) or attempt == LOAD_ATTEMPTS:
+                    raise
+                logger.warning("Import batch raced a registration (%s); retrying (attempt %d of %d).",
+                               e.diag.constraint_name, attempt + 1, LOAD_ATTEMPTS)
+
+
+def import_customers(path, errors_path, method, workers, batch_size, dry_run=False):
+    """
+    Runs the import pipeline.
+
+    Args:
+        path (str): The customers CSV.
+        errors_path (str): Where to write rejected rows (CSV: line, email, errors).
+        method (str): The werkzeug hash method for passwords.
+        workers (int): Validation/hashing processes.
+        batch_size (int): Rows per COPY + INSERT transaction.
+        dry_run (bool): Validate and hash only; don't touch the database.
+
+    Returns:
+        dict: Counts of 'read', 'imported' (or importable, on a dry run) and 'rejected' rows.
+    """
+    counts = {"read": 0, "imported": 0, "rejected": 0}
+    seen_emails = set() # Catches duplicates within the file itself
+    batch = []
+    conn = None
+    started = time.perf_counter()
+
+    if not dry_run:
+        conn = psycopg2.connect(dsn=os.environ["DATABASE_URL"])
+        loader = CustomerLoader(conn)
+
+    with open(errors_path, "w", newline="", encoding="utf-8") as error_file:
+        rejects = csv.writer(error_file)
+        rejects.writerow(["line", "email", "errors"])
+
+        def flush():
+            duplicates = loader.load(batch) if batch and not dry_run else []
+            for line_no, email in duplicates:
+                rejects.writerow([line_no, email, "This email address is already registered."])
+            counts["imported"] += len(batch) - len(duplicates)
+            counts["rejected"] += len(duplicates)
+            batch.clear()
+
+        try:
+            with multiprocessing.Pool(processes=workers) as pool:
+                for results in pool.imap(_prepare_rows, _read_chunks(path, method)):
+                    for status, payload in results:
+                        counts["read"] += 1
+                        if status == "rejected":
+                            line_no, email, errors = payload
+                            rejects.writerow([line_no, email, "; ".join(errors)])
+                            counts["rejected"] += 1
+                            continue
+                        email = payload[2]
+                        if email in seen_emails:
+                            rejects.writerow([payload[0], email, "Duplicate email earlier in the file."])
+                            counts["rejected"] += 1
+                            continue
+                        seen_emails.add(email)
+                        batch.append(payload)
+                        if len(batch) >= batch_size:
+                            flush()
+                flush()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = counts["read"] / elapsed * 60 if elapsed else 0
+    logger.info("Customer import of '%s': %d imported, %d rejected of %d rows in %.1fs (%.0f rows/min).",
+                path, counts["imported"], counts["rejected"], counts["read"], elapsed, rate)
+    return counts
+
+
+def main(argv=None):
+    """Command-line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Bulk import customers from a CSV file.")
+    parser.add_argument("input", help="CSV file with a header row of registration field names.")
+    parser.add_argument("--errors", help="CSV file for rejected rows (default: <input>.rejects.csv).")
+    parser.add_argument("--method", default=DEFAULT_METHOD, help=f"Werkzeug hash method (default: {DEFAULT_METHOD}).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Validation/hashing processes (default: all cores).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows per database transaction (default: {DEFAULT_BATCH_SIZE}).")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and hash only; don't write to the database.")
+    args = parser.parse_args(argv)
+
+    if not args.dry_run and not os.getenv("DATABASE_URL"):
+        print("DATABASE_URL environment variable is not set.", file=sys.stderr)
+        return 2
+
+    errors_path = args.errors or f"{os.path.splitext(args.input)[0]}.rejects.csv"
+    try:
+        counts = import_customers(args.input, errors_path, args.method, max(args.workers, 1),
+                                  max(args.batch_size, 1), dry_run=args.dry_run)
+    except (OSError, psycopg2.Error) as e:
+        logger.error("Customer import failed: %s", e)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Read {counts['read']} rows: {counts['imported']} imported, {counts['rejected']} rejected "
+          f"(see {errors_path}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
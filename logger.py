@@ -1,14 +1,189 @@
 # bookstore_app_with_login/logger.py
 
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import time
+import warnings
+from datetime import datetime, timezone
 
 # --- Configuration ---
 LOG_FOLDER = "logs"  # Define the folder name for log files
-LOG_LEVEL = logging.INFO  # Set the minimum logging level (e.g., DEBUG, INFO, WARNING)
+LOG_LEVEL = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)  # Minimum logging level (e.g., DEBUG, INFO, WARNING)
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'  # Define the log message format
 LOG_FILENAME = f"{LOG_FOLDER}/app.log"  # Define the full path for the log file
 
+# 'queued' (default): request threads only put records on an in-memory queue and a
+#                     background thread writes them, so logging never waits on I/O.
+# 'sync':             handlers write directly from the calling thread.
+LOG_MODE = os.getenv("LOG_MODE", "queued").lower()
+# 'size' rotates app.log at LOG_MAX_BYTES, 'time' at LOG_ROTATE_WHEN, 'none' never.
+# Each process rotates its own handle, so with several gunicorn workers prefer 'time'.
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Size at which app.log rotates
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")  # TimedRotatingFileHandler 'when' (e.g., 'midnight', 'H')
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))  # Rotated files kept
+# Records waiting to be written. When the queue is full, records below
+# LOG_QUEUE_BLOCK_LEVEL are dropped (and counted); records at or above it wait
+# up to LOG_QUEUE_BLOCK_TIMEOUT seconds for space so errors are not lost.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_BLOCK_LEVEL = getattr(logging, os.getenv("LOG_QUEUE_BLOCK_LEVEL", "ERROR").upper(), logging.ERROR)
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "1"))
+# 'text' (default) writes LOG_FORMAT lines; 'json' writes one JSON object per line.
+LOG_OUTPUT = os.getenv("LOG_OUTPUT", "text").lower()
+# Fraction of records below WARNING to keep, per source, e.g. "routes=0.1,book=0.01,werkzeug=0".
+# A source is a logger name or the module that logged the record (the app shares one
+# logger, so its modules are told apart by name). Unlisted sources keep everything.
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+
+def _parse_sample_rates(spec):
+    """Parses 'source=rate,...' into {source: rate}, skipping malformed entries."""
+    rates = {}
+    for entry in spec.split(","):
+        source, _, rate = entry.partition("=")
+        try:
+            rates[source.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            if entry.strip():
+                # Logging isn't configured yet, so report it through the warnings module
+                warnings.warn(f"Ignoring malformed LOG_SAMPLE_RATES entry '{entry}'.", RuntimeWarning, stacklevel=2)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a configured fraction of the low-severity records from each source.
+
+    Warnings and errors always pass. The decision is made before the record's
+    message is formatted, so sampled-out records cost almost nothing.
+    """
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.module, self.rates.get(record.name))
+        return rate is None or rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line.
+
+    Keys in a record's `fields` attribute (pass `extra={"fields": {...}}`) are added
+    to the object, so structured data stays machine-readable.
+    """
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler with a bounded queue that never blocks on low-priority records.
+
+    Only the message's arguments are merged in the calling thread (so later changes
+    to those objects can't alter the record); timestamps, formatting and I/O all
+    happen on the listener thread.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self._drop_lock = threading.Lock()
+        self.dropped = 0 # Records discarded because the queue was full
+        self._unreported_drops = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            # Tracebacks hold frames that must not outlive this thread's call stack
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= LOG_QUEUE_BLOCK_LEVEL:
+                try:
+                    self.queue.put(record, timeout=LOG_QUEUE_BLOCK_TIMEOUT)
+                    return
+                except queue.Full:
+                    pass
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+            return
+
+        if self._unreported_drops:
+            self._report_drops(record)
+
+    def _report_drops(self, record):
+        """Queues one warning saying how many records were dropped since the last report."""
+        with self._drop_lock:
+            count, self._unreported_drops = self._unreported_drops, 0
+        if not count:
+            return
+        notice = logging.LogRecord(record.name, logging.WARNING, __file__, 0,
+                                   f"Dropped {count} log records because the log queue was full.", None, None)
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._drop_lock:
+                self._unreported_drops += count
+
+
+def _build_file_handler():
+    """Creates the app.log handler for the configured rotation policy."""
+    if LOG_ROTATION == "time":
+        return logging.handlers.TimedRotatingFileHandler(LOG_FILENAME, when=LOG_ROTATE_WHEN,
+                                                         backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    if LOG_ROTATION == "size":
+        return logging.handlers.RotatingFileHandler(LOG_FILENAME, maxBytes=LOG_MAX_BYTES,
+                                                    backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    return logging.FileHandler(LOG_FILENAME, encoding="utf-8")
+
+
+def _build_handlers():
+    """Creates the handlers that actually write records (file and console)."""
+    formatter = JsonFormatter() if LOG_OUTPUT == "json" else logging.Formatter(LOG_FORMAT)
+    handlers = [
+        # Handler for writing logs to a file
+        _build_file_handler(),
+        # Handler for printing logs to the console (standard output/error)
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
 # --- Initialization ---
 
 # Ensure the log directory exists; create it if it doesn't.
@@ -21,17 +196,80 @@ if not os.path.exists(LOG_FOLDER):
         # Optionally, raise the exception or exit if logging to file is critical
         # raise
 
+_output_handlers = _build_handlers()
+_queue_handler = None
+_listener = None
+_sampling_filter = SamplingFilter(_parse_sample_rates(LOG_SAMPLE_RATES))
+
 # Configure the root logger
-logging.basicConfig(
-    level=LOG_LEVEL,
-    format=LOG_FORMAT,
-    handlers=[
-        # Handler for writing logs to a file
-        logging.FileHandler(LOG_FILENAME),
-        # Handler for printing logs to the console (standard output/error)
-        logging.StreamHandler()
-    ]
-)
+_root = logging.getLogger()
+_root.setLevel(LOG_LEVEL)
+if LOG_MODE == "queued":
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(_sampling_filter) # Sample before anything is queued
+    _root.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+else:
+    for _handler in _output_handlers:
+        _handler.addFilter(_sampling_filter)
+        _root.addHandler(_handler)
+
+
+def _stop_listener():
+    """Flushes every queued record to the handlers before the process exits."""
+    global _listener
+    if _listener is not None:
+        for _ in range(50):
+            try:
+                _listener.stop() # Queues a sentinel, then waits for the backlog to drain
+                break
+            except queue.Full:
+                time.sleep(0.1) # No room for the sentinel yet
+        _listener = None
+    if _queue_handler is not None and _queue_handler.dropped:
+        for handler in _output_handlers:
+            handler.handle(logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                             f"{_queue_handler.dropped} log records were dropped in total.", None, None))
+    for handler in _output_handlers:
+        try:
+            handler.flush()
+        except (OSError, ValueError):
+            pass # The stream was already closed (e.g., a test runner's captured stderr)
+
+
+def _restart_listener_after_fork():
+    """
+    Gives a forked child (e.g., a gunicorn worker started with --preload) its own
+    queue and listener thread; threads don't survive fork().
+    """
+    global _listener
+    if _listener is None:
+        return
+    _queue_handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler._drop_lock = threading.Lock()
+    _queue_handler.dropped = _queue_handler._unreported_drops = 0 # The parent reports its own
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def get_logging_stats():
+    """
+    Returns the state of the log queue.
+
+    Returns:
+        dict: 'mode', 'queued' (records waiting to be written) and 'dropped'
+              (records discarded because the queue was full).
+    """
+    if _queue_handler is None:
+        return {"mode": LOG_MODE, "queued": 0, "dropped": 0}
+    return {"mode": LOG_MODE, "queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
+
 
 # Get a logger instance specifically for this module (best practice)
 logger = logging.getLogger(__name__)
@@ -39,4 +277,4 @@ logger = logging.getLogger(__name__)
 # --- Initial Log Messages ---
 logger.info("Logger initialized.")
 # Example debug message (will only show if LOG_LEVEL is set to DEBUG)
-logger.debug("Debug mode enabled for logger.")
\ No newline at end of file
+logger.debug("Debug mode enabled for logger.")
@@ -1,10 +1,14 @@
 # bookstore_app_with_login/main.py
 
-from app import create_app
-from logger import logger  # Import the custom logger
+# The password hasher starts its processes with 'spawn', which re-imports this script
+# in every child as '__mp_main__'. Only the real entry points (`python main.py` and
+# `gunicorn main:app`) may build the app, with its DB pool and logging thread.
+if __name__ != '__mp_main__':
+    from app import create_app
+    from logger import logger  # Import the custom logger
 
-# Create the Flask application instance by calling the factory function
-app = create_app()
+    # Create the Flask application instance by calling the factory function
+    app = create_app()
 
 # Check if the script is executed directly (not imported)
 if __name__ == '__main__':
@@ -0,0 +1,320 @@
+# bookstore_app_with_login/migrate.py
+
+"""
+Versioned schema migrations for the bookstore database.
+
+Migrations live in the `migrations/` directory as pairs of plain SQL files:
+
+    migrations/0001_performance_indexes.up.sql     # applies the change
+    migrations/0001_performance_indexes.down.sql   # reverts it
+
+They are applied in version order, and each applied version is recorded in the
+`schema_migrations` table, so running `apply` again only runs what is new.
+
+A migration normally runs inside one transaction together with its bookkeeping
+row. Statements that Postgres refuses to run in a transaction block (such as
+CREATE INDEX CONCURRENTLY) need the file to start with the marker line
+
+    -- migrate: no-transaction
+
+in which case its statements run one at a time in autocommit mode. Such files
+should be idempotent (IF [NOT] EXISTS) so a run interrupted halfway can simply
+be repeated.
+
+Usage (DATABASE_URL must be set):
+    python migrate.py status                # list migrations and whether they're applied
+    python migrate.py apply                 # apply every pending migration
+    python migrate.py apply --to 0001       # apply pending migrations up to a version
+    python migrate.py rollback              # revert the most recent migration
+    python migrate.py rollback --steps 2    # revert the two most recent migrations
+"""
+
+import argparse
+import os
+import re
+import sys
+import psycopg2
+from logger import logger # Import the custom logger
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(up|down)\.sql$")
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Arbitrary key for pg_advisory_lock, so two runners never migrate at the same time.
+MIGRATION_LOCK_KEY = 7_216_431_001
+
+
+class MigrationError(Exception):
+    """Raised when the migrations directory or the database is in an unexpected state."""
+    pass
+
+
+class Migration:
+    """A single versioned migration: its up script and, optionally, its down script."""
+
+    def __init__(self, version, name):
+        self.version = version
+        self.name = name
+        self.up_path = None
+        self.down_path = None
+
+    def __repr__(self):
+        return f"<Migration({self.version}_{self.name})>"
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """
+    Finds the migrations in `directory`, ordered by version.
+
+    Args:
+        directory (str): The directory holding the NNNN_name.up/down.sql files.
+
+    Returns:
+        list[Migration]: The migrations, oldest first.
+
+    Raises:
+        MigrationError: If a version is reused under two names or has no up script.
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version, name, direction = match.groups()
+        migration = migrations.setdefault(version, Migration(version, name))
+        if migration.name != name:
+            raise MigrationError(f"Version {version} is used by both '{migration.name}' and '{name}'.")
+        setattr(migration, f"{direction}_path", os.path.join(directory, filename))
+
+    for migration in migrations.values():
+        if migration.up_path is None:
+            raise MigrationError(f"Migration {migration.version}_{migration.name} has no .up.sql file.")
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(sql):
+    """
+    Splits a SQL script into statements on semicolons that end a line.
+
+    Comment-only lines are dropped. This is deliberately simple: it is meant for
+    the DDL in no-transaction migrations, not for function bodies or
+    multi-statement string literals.
+
+    Args:
+        sql (str): The script text.
+
+    Returns:
+        list[str]: The individual statements, without trailing semicolons.
+    """
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("--"):
+            continue
+        current.append(line)
+        if stripped.endswith(";"):
+            statements.append("\n".join(current).rstrip().rstrip(";"))
+            current = []
+    if current:
+        statements.append("\n".join(current))
+    return statements
+
+
+def _read_script(path):
+    with open(path, encoding="utf-8") as script:
+        sql = script.read()
+    no_transaction = sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+    return sql, no_transaction
+
+
+def _ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version    text PRIMARY KEY,
+                name       text NOT NULL,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            );
+        """)
+
+
+def _applied_versions(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version, applied_at FROM schema_migrations ORDER BY version;")
+        return dict(cur.fetchall())
+
+
+def _run_script(conn, path, record_sql, record_args):
+    """
+    Runs one migration script and updates schema_migrations accordingly.
+
+    Transactional scripts and their bookkeeping commit (or roll back) together.
+    No-transaction scripts run statement by statement; the bookkeeping row is only
+    written once every statement has succeeded.
+    """
+    sql, no_transaction = _read_script(path)
+    if no_transaction:
+        for statement in split_statements(sql):
+            with conn.cursor() as cur:
+                cur.execute(statement)
+        with conn.cursor() as cur:
+            cur.execute(record_sql, record_args)
+        return
+
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            cur.execute(record_sql, record_args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+
+
+def _normalize_target(target, migrations):
+    """
+    Turns a --to value such as '1' or '0001' into a known four-digit version.
+
+    Versions are compared as strings, so an unpadded '1' would sort after every
+    real version and silently apply them all.
+
+    Raises:
+        MigrationError: If `target` is not a version number, or no migration has it.
+    """
+    if not re.fullmatch(r"\d{1,4}", target):
+        raise MigrationError(f"Invalid target version '{target}'; expected a number such as 0001.")
+    version = target.zfill(4)
+    if version not in {migration.version for migration in migrations}:
+        raise MigrationError(f"Unknown target version {version}.")
+    return version
+
+
+def apply(conn, migrations, target=None):
+    """
+    Applies pending migrations in version order.
+
+    Args:
+        conn (psycopg2.connection): An autocommit connection holding the migration lock.
+        migrations (list[Migration]): All known migrations, oldest first.
+        target (str, optional): Stop after this version ('1' and '0001' are the same).
+                                Defaults to the newest.
+
+    Returns:
+        list[Migration]: The migrations that were applied.
+
+    Raises:
+        MigrationError: If `target` is not the version of a known migration.
+    """
+    if target is not None:
+        target = _normalize_target(target, migrations)
+    applied = _applied_versions(conn)
+    done = []
+    for migration in migrations:
+        if target is not None and migration.version > target:
+            break
+        if migration.version in applied:
+            continue
+        logger.info("Applying migration %s_%s...", migration.version, migration.name)
+        _run_script(conn, migration.up_path,
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+                    (migration.version, migration.name))
+        done.append(migration)
+        logger.info("Applied migration %s_%s.", migration.version, migration.name)
+    return done
+
+
+def rollback(conn, migrations, steps=1):
+    """
+    Reverts the most recently applied migrations, newest first.
+
+    Args:
+        conn (psycopg2.connection): An autocommit connection holding the migration lock.
+        migrations (list[Migration]): All known migrations, oldest first.
+        steps (int): How many applied migrations to revert.
+
+    Returns:
+        list[Migration]: The migrations that were reverted.
+
+    Raises:
+        MigrationError: If an applied migration has no .down.sql file or is unknown.
+    """
+    applied = _applied_versions(conn)
+    by_version = {migration.version: migration for migration in migrations}
+    done = []
+    for version in sorted(applied, reverse=True)[:steps]:
+        migration = by_version.get(version)
+        if migration is None:
+            raise MigrationError(f"Applied migration {version} has no files in {MIGRATIONS_DIR}.")
+        if migration.down_path is None:
+            raise MigrationError(f"Migration {version}_{migration.name} has no .down.sql file; cannot roll back.")
+        logger.info("Rolling back migration %s_%s...", version, migration.name)
+        _run_script(conn, migration.down_path,
+                    "DELETE FROM schema_migrations WHERE version = %s;", (version,))
+        done.append(migration)
+        logger.info("Rolled back migration %s_%s.", version, migration.name)
+    return done
+
+
+def status(conn, migrations):
+    """
+    Returns each known migration with its applied timestamp (None if pending).
+
+    Returns:
+        list[tuple[Migration, datetime | None]]
+    """
+    applied = _applied_versions(conn)
+    return [(migration, applied.get(migration.version)) for migration in migrations]
+
+
+def main(argv=None):
+    """Command-line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Apply, roll back or list bookstore schema migrations.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("status", help="List migrations and whether they are applied.")
+    apply_parser = subcommands.add_parser("apply", help="Apply pending migrations.")
+    apply_parser.add_argument("--to", dest="target", help="Apply up to and including this version (e.g. 0001).")
+    rollback_parser = subcommands.add_parser("rollback", help="Revert applied migrations.")
+    rollback_parser.add_argument("--steps", type=int, default=1, help="Number of migrations to revert (default 1).")
+    args = parser.parse_args(argv)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL environment variable is not set.", file=sys.stderr)
+        return 2
+
+    try:
+        migrations = discover_migrations()
+        conn = psycopg2.connect(dsn=database_url)
+    except (MigrationError, psycopg2.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+        _ensure_migrations_table(conn)
+
+        if args.command == "status":
+            for migration, applied_at in status(conn, migrations):
+                state = f"applied {applied_at:%Y-%m-%d %H:%M:%S}" if applied_at else "pending"
+                print(f"{migration.version}  {migration.name:<40} {state}")
+        elif args.command == "apply":
+            done = apply(conn, migrations, target=args.target)
+            print(f"Applied {len(done)} migration(s)." if done else "Database is up to date.")
+        elif args.command == "rollback":
+            done = rollback(conn, migrations, steps=args.steps)
+            print(f"Rolled back {len(done)} migration(s)." if done else "Nothing to roll back.")
+        return 0
+    except (MigrationError, psycopg2.Error) as e:
+        logger.error("Migration '%s' failed: %s", args.command, e)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close() # Also releases the advisory lock
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+-- migrate: no-transaction
+
+DROP INDEX CONCURRENTLY IF EXISTS public.books_genre_keyset_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.books_author_keyset_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.books_price_keyset_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.books_title_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.books_lower_genre_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.books_lower_author_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.orders_customer_id_idx;
+DROP INDEX CONCURRENTLY IF EXISTS public.order_items_order_id_idx;
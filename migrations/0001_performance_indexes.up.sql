@@ -0,0 +1,37 @@
+-- migrate: no-transaction
+--
+-- Indexes for the lookups and sorts the app runs on every request. Built
+-- CONCURRENTLY so the tables stay writable while they build. If a build is
+-- interrupted, Postgres leaves an INVALID index behind: drop it and re-run.
+--
+-- The primary keys referenced by these queries already exist in the schema
+-- (books_pkey, customers_pkey, orders_pkey, order_items_pkey).
+
+-- Order.from_db / Order.load_confirmation: items of one order
+CREATE INDEX CONCURRENTLY IF NOT EXISTS order_items_order_id_idx
+    ON public.order_items USING btree (order_id);
+
+-- A customer's orders (and the orders_customer_id_fkey check on customer deletes)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_customer_id_idx
+    ON public.orders USING btree (customer_id);
+
+-- book_service.get_books_by_author / get_books_by_genre: LOWER(col) = LOWER(%s)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_lower_author_idx
+    ON public.books USING btree (lower((author)::text));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_lower_genre_idx
+    ON public.books USING btree (lower((genre)::text));
+
+-- Book.get_all_books (ORDER BY title) and Book.list_page keyset pages, one per
+-- entry in Book.SORT_EXPRESSIONS; book_id breaks ties so pages never overlap.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_title_idx
+    ON public.books USING btree (title, book_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_price_keyset_idx
+    ON public.books USING btree ((COALESCE(price, 0)), book_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_author_keyset_idx
+    ON public.books USING btree ((COALESCE(author, '')), book_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS books_genre_keyset_idx
+    ON public.books USING btree ((COALESCE(genre, '')), book_id);
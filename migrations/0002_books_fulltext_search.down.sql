@@ -0,0 +1,5 @@
+-- Removes the full-text search column and index (SEARCH_BACKEND=postgres stops working).
+
+DROP INDEX IF EXISTS public.books_search_vector_idx;
+
+ALTER TABLE public.books DROP COLUMN IF EXISTS search_vector;
@@ -0,0 +1,18 @@
+-- Full-text search for SEARCH_BACKEND=postgres (PostgreSQL 12+).
+--
+-- Adds a weighted tsvector over title (A), author (B), genre (C) and
+-- description (D), kept up to date by Postgres itself, and a GIN index over it.
+-- Safe to run more than once (bookstore_backup.sql already includes both).
+-- Adding the stored column rewrites the books table under an exclusive lock,
+-- so run it outside peak hours on large catalogs.
+
+ALTER TABLE public.books
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(author, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(genre, '')), 'C') ||
+        setweight(to_tsvector('english', COALESCE(description, '')), 'D')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS books_search_vector_idx ON public.books USING gin (search_vector);
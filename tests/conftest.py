@@ -0,0 +1,32 @@
+# bookstore_app_with_login/tests/conftest.py
+
+import psycopg2
+import pytest
+from flask import Flask
+from app.models import db
+from app.models.db import ConnectionPool
+from tests.fakes import FakeConnect
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    """Makes psycopg2.connect return FakeConnections; the fixture lists those opened."""
+    connect = FakeConnect()
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    return connect
+
+
+@pytest.fixture
+def request_db(fake_connect, monkeypatch):
+    """
+    Runs the test inside a Flask request whose DB connection is a FakeConnection.
+
+    Yields the FakeConnection; queue result sets on its `results` before the
+    code under test runs its queries.
+    """
+    pool = ConnectionPool("postgresql://test", min_size=1, max_size=1, health_check=False)
+    monkeypatch.setattr(db, "get_pool", lambda: pool)
+    app = Flask(__name__)
+    db.init_db(app)
+    with app.test_request_context():
+        yield fake_connect.connections[0]
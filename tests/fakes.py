@@ -0,0 +1,105 @@
+# bookstore_app_with_login/tests/fakes.py
+
+"""
+Stand-ins for psycopg2 connections, so the pool and the models can be tested
+without a PostgreSQL server.
+"""
+
+from collections import deque
+from types import SimpleNamespace
+import psycopg2
+from psycopg2 import errors, extensions
+
+
+class FakeConnectionInfo:
+    def __init__(self):
+        self.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    """Records executed statements and returns the connection's scripted results."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        if self.conn.fail_next_execute:
+            error, self.conn.fail_next_execute = self.conn.fail_next_execute, False
+            if isinstance(error, Exception):
+                raise error
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.executed.append((query, params))
+        self.conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        self._rows = list(self.conn.results.popleft()) if self.conn.results else []
+        self.rowcount = len(self._rows)
+
+    def copy_expert(self, sql, file):
+        self.conn.executed.append((sql, file.read()))
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class FakeConnection:
+    """
+    A psycopg2-like connection.
+
+    Every execute() starts a transaction, like psycopg2 outside autocommit, and
+    takes the next entry of `results` (a list of row dicts) as its result set.
+    """
+
+    def __init__(self, results=()):
+        self.closed = 0
+        self.info = FakeConnectionInfo()
+        self.results = deque(results)
+        self.executed = [] # (query, params) per execute()
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail_next_execute = False # True (a dropped connection) or the exception to raise
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeConnect:
+    """Replacement for psycopg2.connect that hands out FakeConnections and remembers them."""
+
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self, *args, **kwargs):
+        conn = FakeConnection()
+        self.connections.append(conn)
+        return conn
+
+
+def unique_violation(constraint):
+    """A UniqueViolation as psycopg2 raises it for `constraint` (its diag can't be set otherwise)."""
+    class FakeUniqueViolation(errors.UniqueViolation):
+        diag = SimpleNamespace(constraint_name=constraint)
+    return FakeUniqueViolation(f'duplicate key value violates unique constraint "{constraint}"')
@@ -0,0 +1,108 @@
+# bookstore_app_with_login/tests/test_after_commit.py
+
+import pytest
+from app.models import book as book_module
+from app.models.book import Book
+from app.models.db import ConnectionPool, PooledConnection, RequestConnection, after_commit, get_db_connection
+from tests.fakes import FakeConnection
+
+
+@pytest.fixture
+def pool(fake_connect):
+    return ConnectionPool("postgresql://test", min_size=0, max_size=1, health_check=False)
+
+
+def start_transaction(conn):
+    with conn.cursor() as cur:
+        cur.execute("UPDATE books SET stock_quantity = stock_quantity - 1")
+
+
+def test_callback_waits_for_commit(pool):
+    conn = PooledConnection(pool, pool.getconn())
+    calls = []
+    start_transaction(conn)
+    conn.after_commit(lambda: calls.append("published"))
+    assert calls == []
+    conn.commit()
+    assert calls == ["published"]
+    conn.commit() # Runs once
+    assert calls == ["published"]
+
+
+def test_callback_is_dropped_on_rollback(pool):
+    conn = PooledConnection(pool, pool.getconn())
+    calls = []
+    start_transaction(conn)
+    conn.after_commit(lambda: calls.append("published"))
+    conn.rollback()
+    conn.commit()
+    assert calls == []
+
+
+def test_callback_is_dropped_when_released_uncommitted(pool):
+    conn = RequestConnection(pool, pool.getconn())
+    calls = []
+    start_transaction(conn)
+    conn.after_commit(lambda: calls.append("published"))
+    conn.release()
+    assert calls == []
+
+
+def test_callback_runs_immediately_outside_a_transaction(pool):
+    conn = PooledConnection(pool, pool.getconn())
+    calls = []
+    conn.after_commit(lambda: calls.append("published"))
+    assert calls == ["published"]
+
+
+def test_failing_callback_does_not_fail_the_commit(pool):
+    conn = PooledConnection(pool, pool.getconn())
+    calls = []
+    start_transaction(conn)
+    conn.after_commit(lambda: 1 / 0)
+    conn.after_commit(lambda: calls.append("published"))
+    conn.commit()
+    assert calls == ["published"]
+
+
+def test_nested_block_defers_to_the_outer_commit(pool):
+    conn = RequestConnection(pool, pool.getconn())
+    calls = []
+    with conn:
+        start_transaction(conn)
+        with conn:
+            conn.after_commit(lambda: calls.append("published"))
+        assert calls == []
+    assert calls == ["published"]
+
+
+def test_bare_connection_runs_callback_immediately():
+    conn = FakeConnection()
+    start_transaction(conn)
+    calls = []
+    after_commit(conn, lambda: calls.append("published"))
+    assert calls == ["published"]
+
+
+@pytest.fixture
+def listener_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(book_module, "_catalog_listeners", [lambda book_id, changes: calls.append((book_id, changes))])
+    return calls
+
+
+def test_stock_decrement_is_published_after_commit(request_db, listener_calls):
+    request_db.results.append([{"book_id": 1, "quantity": 2, "remaining": 3, "title": "Dune", "available": 3}])
+    conn = get_db_connection()
+    assert Book.decrease_stock_many({1: 2}, conn) == []
+    assert listener_calls == []
+    conn.commit()
+    assert listener_calls == [(1, {"stock_quantity": 3})]
+
+
+def test_rolled_back_stock_decrement_is_never_published(request_db, listener_calls):
+    request_db.results.append([{"book_id": 1, "quantity": 2, "remaining": 3, "title": "Dune", "available": 3}])
+    conn = get_db_connection()
+    Book.decrease_stock_many({1: 2}, conn)
+    conn.rollback() # e.g., Order.save failed
+    assert listener_calls == []
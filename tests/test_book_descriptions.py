@@ -0,0 +1,37 @@
+# bookstore_app_with_login/tests/test_book_descriptions.py
+
+from app.models.book import DESCRIPTION_NOT_LOADED, Book
+
+
+def listing_rows(count):
+    return [{"book_id": book_id, "title": f"Book {book_id}", "author": "Author", "genre": "Fiction",
+             "price": "9.99", "stock_quantity": 1} for book_id in range(1, count + 1)]
+
+
+def description_rows(book_ids):
+    return [{"book_id": book_id, "description": f"About book {book_id}"} for book_id in book_ids]
+
+
+def test_description_loads_the_whole_page_in_one_query(request_db):
+    books = Book.from_rows(listing_rows(24))
+    request_db.results.append(description_rows(range(1, 25)))
+    assert books[5].description == "About book 6"
+    assert books[20].description == "About book 21"
+    assert len(request_db.executed) == 1
+    assert request_db.executed[0][1] == (list(range(1, 25)),)
+
+
+def test_large_result_sets_load_descriptions_in_bounded_groups(request_db):
+    size = Book.DESCRIPTION_BATCH_SIZE
+    books = Book.from_rows(listing_rows(size * 2 + 10))
+    request_db.results.append(description_rows(range(size + 1, size * 2 + 1)))
+    assert books[size].description == f"About book {size + 1}"
+    (query, (book_ids,)), = request_db.executed
+    assert book_ids == list(range(size + 1, size * 2 + 1))
+    assert books[0]._description is DESCRIPTION_NOT_LOADED # Other groups untouched
+
+
+def test_missing_row_leaves_description_empty(request_db):
+    books = Book.from_rows(listing_rows(2))
+    request_db.results.append(description_rows([1]))
+    assert books[1].description is None
@@ -0,0 +1,117 @@
+# bookstore_app_with_login/tests/test_cache.py
+
+import threading
+import time
+import pytest
+from app.models import book as book_module
+from app.models.book import Book, catalog_page_cache
+from app.models.cache import LRUTTLCache
+
+
+def test_put_drops_a_value_loaded_before_an_invalidation():
+    cache = LRUTTLCache("test", 10, 60)
+    generation = cache.generation
+    cache.clear() # A write committed while the value was being loaded
+    cache.put("page", "old", generation)
+    assert cache.get("page") is None
+    assert cache.stats()["outdated_puts"] == 1
+
+    cache.put("page", "new", cache.generation)
+    assert cache.get("page") == "new"
+
+
+def test_invalidating_any_key_bumps_the_generation():
+    cache = LRUTTLCache("test", 10, 60)
+    generation = cache.generation
+    cache.invalidate("other")
+    cache.put("page", "old", generation)
+    assert cache.get("page") is None
+
+
+def wait_for_refresh(cache):
+    for _ in range(200):
+        if not cache._refreshing:
+            return
+        time.sleep(0.01)
+    raise AssertionError("background refresh did not finish")
+
+
+def test_get_or_load_loads_a_missing_key_synchronously():
+    cache = LRUTTLCache("test", 10, 60)
+    assert cache.get_or_load("page", lambda: "v1") == "v1"
+    assert cache.get_or_load("page", lambda: "v2") == "v1"
+    assert (cache.stats()["misses"], cache.stats()["hits"]) == (1, 1)
+
+
+def test_get_or_load_serves_an_expired_entry_while_refreshing_it():
+    cache = LRUTTLCache("test", 10, 0.01)
+    cache.get_or_load("page", lambda: "v1")
+    time.sleep(0.02)
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(1)
+        return "v2"
+
+    assert cache.get_or_load("page", slow_loader) == "v1" # Stale, without waiting
+    assert cache.get_or_load("page", slow_loader) == "v1" # Still one refresh in flight
+    release.set()
+    wait_for_refresh(cache)
+    stats = cache.stats()
+    assert (stats["stale_hits"], stats["refreshes"]) == (2, 1)
+    assert cache._entries["page"][0] == "v2"
+
+
+def test_failed_refresh_keeps_serving_the_stale_entry():
+    cache = LRUTTLCache("test", 10, 0.01)
+    cache.get_or_load("page", lambda: "v1")
+    time.sleep(0.02)
+
+    def failing_loader():
+        raise RuntimeError("database down")
+
+    assert cache.get_or_load("page", failing_loader) == "v1"
+    wait_for_refresh(cache)
+    assert cache.get_or_load("page", failing_loader) == "v1"
+    wait_for_refresh(cache)
+    assert cache.stats()["refresh_failures"] == 2
+
+
+@pytest.fixture
+def empty_page_cache():
+    catalog_page_cache.clear()
+    yield
+    catalog_page_cache.clear()
+
+
+def catalog_rows():
+    return [{"book_id": 1, "title": "Dune", "author": "Frank Herbert", "genre": "Science Fiction",
+             "price": "9.99", "stock_quantity": 5, "sort_value": "dune"}]
+
+
+def test_list_page_does_not_cache_a_page_read_before_a_write(request_db, empty_page_cache, monkeypatch):
+    from_rows = Book.from_rows
+    writes = [1]
+
+    def commit_write_during_read(rows):
+        if writes:
+            writes.pop()
+            book_module.invalidate_catalog_caches() # Another request's stock change commits
+        return from_rows(rows)
+
+    monkeypatch.setattr(Book, "from_rows", commit_write_during_read)
+    request_db.results.append(catalog_rows())
+    Book.list_page()
+
+    request_db.results.append([dict(catalog_rows()[0], stock_quantity=4)])
+    books, _ = Book.list_page()
+    assert books[0].stock_quantity == 4
+    assert len(request_db.executed) == 2
+
+
+def test_list_page_caches_pages(request_db, empty_page_cache):
+    request_db.results.append(catalog_rows())
+    first, _ = Book.list_page()
+    second, _ = Book.list_page()
+    assert [book.book_id for book in second] == [book.book_id for book in first]
+    assert len(request_db.executed) == 1
@@ -0,0 +1,43 @@
+# bookstore_app_with_login/tests/test_customer.py
+
+import pytest
+from psycopg2 import errors
+from app.auth_exceptions import UserAlreadyExists
+from app.models.customer import Customer
+from tests.fakes import unique_violation
+
+
+def new_customer():
+    return Customer(None, None, "Ada@Example.com", "555-0100", "hash", first_name="Ada", last_name="Lovelace")
+
+
+def test_save_to_db_assigns_the_new_id(request_db):
+    request_db.results.append([{"customer_id": 7}])
+    customer = new_customer()
+    customer.save_to_db()
+    assert customer.customer_id == 7
+    assert request_db.executed[0][1][1] == "ada@example.com"
+    assert request_db.commits
+
+
+def test_save_to_db_reports_a_registered_email(request_db):
+    request_db.results.append([]) # ON CONFLICT DO NOTHING skipped the row
+    customer = new_customer()
+    with pytest.raises(UserAlreadyExists):
+        customer.save_to_db()
+    assert customer.customer_id is None
+
+
+@pytest.mark.parametrize("constraint", ["customers_email_key", "unique_lower_email"])
+def test_save_to_db_reports_the_loser_of_a_registration_race(request_db, constraint):
+    # A concurrent registration committed the same email between the conflict check and the insert
+    request_db.fail_next_execute = unique_violation(constraint)
+    with pytest.raises(UserAlreadyExists):
+        new_customer().save_to_db()
+    assert request_db.rollbacks == 1
+
+
+def test_save_to_db_raises_other_unique_violations(request_db):
+    request_db.fail_next_execute = unique_violation("customers_pkey")
+    with pytest.raises(errors.UniqueViolation):
+        new_customer().save_to_db()
@@ -0,0 +1,263 @@
+# bookstore_app_with_login/tests/test_db_pool.py
+
+import threading
+import time
+import psycopg2
+import pytest
+from flask import Flask
+from psycopg2 import extensions
+from app.models import db
+from app.models.db import ConnectionPool, PooledConnection, PoolTimeoutError, RequestConnection
+
+
+def make_pool(**kwargs):
+    settings = {"min_size": 0, "max_size": 2, "acquire_timeout": 0.05, "health_check": False}
+    settings.update(kwargs)
+    return ConnectionPool("postgresql://test", **settings)
+
+
+# --- ConnectionPool ---
+
+def test_rejects_invalid_sizing(fake_connect):
+    with pytest.raises(ValueError):
+        make_pool(min_size=3, max_size=2)
+    with pytest.raises(ValueError):
+        make_pool(max_size=0)
+
+
+def test_opens_min_size_connections_up_front(fake_connect):
+    pool = make_pool(min_size=2, max_size=3)
+    assert len(fake_connect.connections) == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_reuses_returned_connections(fake_connect):
+    pool = make_pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert len(fake_connect.connections) == 1
+
+
+def test_acquire_times_out_when_exhausted(fake_connect):
+    pool = make_pool(max_size=1)
+    pool.getconn()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 1
+    assert stats["size"] == 1
+
+
+def test_waiting_caller_gets_returned_connection(fake_connect):
+    pool = make_pool(max_size=1, acquire_timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+    assert pool.getconn() is conn
+    assert pool.stats()["wait_time_max"] >= 0.04
+
+
+def test_failed_connect_frees_its_slot(fake_connect, monkeypatch):
+    pool = make_pool(max_size=1)
+
+    def refuse(*args, **kwargs):
+        raise psycopg2.OperationalError("could not connect")
+
+    monkeypatch.setattr(psycopg2, "connect", refuse)
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats()["size"] == 0
+    assert pool.stats()["in_use"] == 0
+
+
+def test_expired_connection_is_closed_instead_of_reused(fake_connect):
+    pool = make_pool(max_lifetime=0.05)
+    conn = pool.getconn()
+    time.sleep(0.06)
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["closes"] == 1
+    assert pool.getconn() is not conn
+
+
+def test_expired_idle_connection_is_skipped_on_checkout(fake_connect):
+    pool = make_pool(max_lifetime=0.05)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    time.sleep(0.06)
+    assert pool.getconn() is not conn
+    assert conn.closed
+
+
+def test_health_check_discards_dead_idle_connection(fake_connect):
+    pool = make_pool(health_check=True, health_check_idle=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.fail_next_execute = True
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert conn.closed
+    stats = pool.stats()
+    assert stats["health_check_failures"] == 1
+    assert stats["size"] == 1
+
+
+def test_health_check_skips_recently_used_connections(fake_connect):
+    pool = make_pool(health_check=True, health_check_idle=60)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.executed == [] # Not pinged
+
+
+def test_putconn_rolls_back_open_transaction(fake_connect):
+    pool = make_pool()
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert not conn.closed
+    assert pool.stats()["idle"] == 1
+
+
+def test_putconn_discards_connection_in_unknown_state(fake_connect):
+    pool = make_pool()
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_stats_count_checkouts_and_connects(fake_connect):
+    pool = make_pool(max_size=3)
+    first, _ = pool.getconn(), pool.getconn()
+    pool.putconn(first)
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["connects"] == 2
+    assert (stats["size"], stats["idle"], stats["in_use"]) == (2, 1, 1)
+    assert (stats["min_size"], stats["max_size"]) == (0, 3)
+
+
+def test_closeall_closes_idle_connections(fake_connect):
+    pool = make_pool(min_size=2)
+    pool.closeall()
+    assert all(conn.closed for conn in fake_connect.connections)
+    assert pool.stats()["size"] == 0
+
+
+# --- PooledConnection ---
+
+def test_pooled_connection_commits_and_returns_on_success(fake_connect):
+    pool = make_pool()
+    with PooledConnection(pool, pool.getconn()) as conn:
+        raw = conn.raw
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+    assert raw.commits == 1
+    assert raw.rollbacks == 0
+    assert pool.stats()["idle"] == 1
+
+
+def test_pooled_connection_rolls_back_and_returns_on_error(fake_connect):
+    pool = make_pool()
+    with pytest.raises(RuntimeError):
+        with PooledConnection(pool, pool.getconn()) as conn:
+            raw = conn.raw
+            raise RuntimeError("boom")
+    assert raw.commits == 0
+    assert raw.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_pooled_connection_close_is_idempotent(fake_connect):
+    pool = make_pool()
+    conn = PooledConnection(pool, pool.getconn())
+    conn.close()
+    conn.close()
+    assert conn.closed
+    assert pool.stats()["idle"] == 1
+    with pytest.raises(psycopg2.InterfaceError):
+        conn.cursor()
+
+
+# --- RequestConnection ---
+
+def test_request_connection_commits_only_the_outermost_block(fake_connect):
+    pool = make_pool()
+    conn = RequestConnection(pool, pool.getconn())
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE books SET stock_quantity = 1")
+        with conn: # e.g., a model method called in the middle of a unit of work
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO orders DEFAULT VALUES")
+        assert conn.raw.commits == 0
+    assert conn.raw.commits == 1
+
+
+def test_request_connection_rolls_back_owned_block_on_error(fake_connect):
+    pool = make_pool()
+    conn = RequestConnection(pool, pool.getconn())
+    with pytest.raises(RuntimeError):
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE books SET stock_quantity = 1")
+            raise RuntimeError("boom")
+    assert (conn.raw.commits, conn.raw.rollbacks) == (0, 1)
+
+
+def test_request_connection_leaves_callers_transaction_alone_on_error(fake_connect):
+    pool = make_pool()
+    conn = RequestConnection(pool, pool.getconn())
+    with conn.cursor() as cur:
+        cur.execute("UPDATE books SET stock_quantity = 1") # The caller's transaction
+    with pytest.raises(RuntimeError):
+        with conn:
+            raise RuntimeError("boom")
+    assert (conn.raw.commits, conn.raw.rollbacks) == (0, 0)
+
+
+def test_request_connection_close_is_a_no_op_until_release(fake_connect):
+    pool = make_pool()
+    conn = RequestConnection(pool, pool.getconn())
+    conn.close()
+    assert not conn.closed
+    assert pool.stats()["in_use"] == 1
+    conn.release()
+    assert conn.closed
+    assert pool.stats()["idle"] == 1
+
+
+def test_request_shares_one_connection_and_releases_it(fake_connect, monkeypatch):
+    pool = make_pool()
+    monkeypatch.setattr(db, "get_pool", lambda: pool)
+    app = Flask(__name__)
+    db.init_db(app)
+
+    with app.test_request_context():
+        first = db.get_db_connection()
+        assert db.get_db_connection() is first
+        assert pool.stats()["in_use"] == 1
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["idle"] == 1
+
+
+def test_request_replaces_a_broken_connection_without_leaking_its_slot(fake_connect, monkeypatch):
+    pool = make_pool(max_size=1)
+    monkeypatch.setattr(db, "get_pool", lambda: pool)
+    app = Flask(__name__)
+    db.init_db(app)
+
+    with app.test_request_context():
+        first = db.get_db_connection()
+        first.raw.close() # e.g. the server restarted
+        second = db.get_db_connection()
+        assert second is not first
+        stats = pool.stats()
+        assert (stats["size"], stats["in_use"], stats["timeouts"]) == (1, 1, 0)
+    assert pool.stats()["idle"] == 1
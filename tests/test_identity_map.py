@@ -0,0 +1,35 @@
+# bookstore_app_with_login/tests/test_identity_map.py
+
+from decimal import Decimal
+from app.models.book import Book
+
+
+def book_row(book_id, price):
+    return {"book_id": book_id, "title": "Dune", "author": "Frank Herbert", "genre": "Science Fiction",
+            "price": Decimal(price), "stock_quantity": 5}
+
+
+def test_get_many_reuses_books_loaded_in_the_request(request_db):
+    request_db.results.append([book_row(1, "10.00")])
+    first = Book.get_many([1])[1]
+    assert Book.get_many([1])[1] is first
+    assert len(request_db.executed) == 1
+
+
+def test_update_book_evicts_stale_copy(request_db):
+    request_db.results.extend([[book_row(1, "10.00")], [], [book_row(1, "12.00")]])
+    loaded = Book.get_many([1])[1]
+    Book(1, "Dune", "Frank Herbert", "Science Fiction", "10.00", 5).update_book(price="12.00")
+    reloaded = Book.get_many([1])[1]
+    assert reloaded is not loaded
+    assert reloaded.price == Decimal("12.00")
+
+
+def test_stock_change_evicts_stale_copy(request_db):
+    request_db.results.extend([[book_row(1, "10.00")], [{"stock_quantity": 3}]])
+    loaded = Book.get_many([1])[1]
+    Book(1, "Dune", "Frank Herbert", "Science Fiction", "10.00", 5).decrease_stock(2, request_db)
+    request_db.results.append([dict(book_row(1, "10.00"), stock_quantity=3)])
+    reloaded = Book.get_many([1])[1]
+    assert reloaded is not loaded
+    assert reloaded.stock_quantity == 3
@@ -0,0 +1,53 @@
+# bookstore_app_with_login/tests/test_import_customers.py
+
+import pytest
+from psycopg2 import errors
+from import_customers import LOAD_ATTEMPTS, CustomerLoader
+from tests.fakes import FakeConnection, unique_violation
+
+ROW = (2, "Ada Lovelace", "ada@example.com", "5550100", "hash", "Ada", "Lovelace",
+       "1 Main St", None, "Springfield", "IL", "62701")
+
+
+@pytest.fixture
+def loader():
+    loader = CustomerLoader(FakeConnection())
+    loader.conn.executed.clear() # Forget the staging table's CREATE
+    return loader
+
+
+def test_load_reports_already_registered_emails(loader):
+    conn = loader.conn
+    conn.results.append([(2, "ada@example.com")])
+    assert loader.load([ROW]) == [(2, "ada@example.com")]
+    assert conn.commits == 2 # Staging table, then the batch
+
+
+def test_load_retries_a_batch_that_raced_a_registration(loader):
+    conn = loader.conn
+    conn.fail_next_execute = unique_violation("customers_email_key")
+    conn.results.append([(2, "ada@example.com")]) # The retry sees the committed registration
+    assert loader.load([ROW]) == [(2, "ada@example.com")]
+    assert conn.rollbacks == 1
+    copies = [params for query, params in conn.executed if query.startswith("COPY")]
+    assert len(copies) == 2 and copies[0] == copies[1] # The whole batch was sent again
+
+
+def test_load_gives_up_after_repeated_races(loader):
+    conn = loader.conn
+    class RacingCursor(type(conn.cursor())):
+        def execute(self, query, params=None):
+            raise unique_violation("unique_lower_email")
+
+    conn.cursor = lambda name=None: RacingCursor(conn)
+    with pytest.raises(errors.UniqueViolation):
+        loader.load([ROW])
+    assert conn.rollbacks == LOAD_ATTEMPTS
+
+
+def test_load_does_not_retry_other_errors(loader):
+    conn = loader.conn
+    conn.fail_next_execute = unique_violation("customers_pkey")
+    with pytest.raises(errors.UniqueViolation):
+        loader.load([ROW])
+    assert conn.rollbacks == 1
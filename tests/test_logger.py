@@ -0,0 +1,30 @@
+# bookstore_app_with_login/tests/test_logger.py
+
+import logging
+import pytest
+from logger import SamplingFilter, _parse_sample_rates
+
+
+def record(level, module="routes", name="logger"):
+    return logging.LogRecord(name, level, f"/app/{module}.py", 1, "message %s", ("arg",), None)
+
+
+def test_parse_sample_rates_clamps_values():
+    assert _parse_sample_rates("routes=0.1, book=2,werkzeug=-1") == {"routes": 0.1, "book": 1.0, "werkzeug": 0.0}
+    assert _parse_sample_rates("") == {}
+
+
+def test_parse_sample_rates_warns_about_malformed_entries():
+    with pytest.warns(RuntimeWarning, match="routes=lots"):
+        assert _parse_sample_rates("routes=lots,book=0.5") == {"book": 0.5}
+
+
+def test_sampling_filter_keeps_warnings_and_unlisted_sources():
+    sampling = SamplingFilter({"routes": 0.0})
+    assert not sampling.filter(record(logging.INFO))
+    assert sampling.filter(record(logging.WARNING))
+    assert sampling.filter(record(logging.INFO, module="book"))
+
+
+def test_sampling_filter_matches_logger_names():
+    assert not SamplingFilter({"werkzeug": 0.0}).filter(record(logging.INFO, module="_internal", name="werkzeug"))
@@ -0,0 +1,106 @@
+# bookstore_app_with_login/tests/test_login_throttle.py
+
+import pytest
+from app import create_app
+from app.auth_exceptions import TooManyLoginAttempts
+from app.services.login_throttle import MAX_RETRY_AFTER, LoginThrottle, TokenBucketLimiter
+
+
+# --- TokenBucketLimiter ---
+
+def test_new_keys_start_with_a_full_bucket():
+    limiter = TokenBucketLimiter(burst=2, per_minute=60, max_keys=10)
+    assert limiter.retry_after("alice", now=0.0) == 0.0
+    assert len(limiter) == 0 # Nothing stored until a token is taken
+
+
+def test_empty_bucket_reports_time_until_next_token():
+    limiter = TokenBucketLimiter(burst=2, per_minute=60, max_keys=10) # One token per second
+    limiter.take("alice", now=0.0)
+    limiter.take("alice", now=0.0)
+    assert limiter.retry_after("alice", now=0.0) == pytest.approx(1.0)
+    assert limiter.retry_after("alice", now=0.25) == pytest.approx(0.75)
+
+
+def test_tokens_refill_over_time_up_to_the_burst():
+    limiter = TokenBucketLimiter(burst=2, per_minute=60, max_keys=10)
+    limiter.take("alice", now=0.0)
+    limiter.take("alice", now=0.0)
+    assert limiter.retry_after("alice", now=1.0) == 0.0
+    limiter.take("alice", now=100.0) # Refilled to the burst (2), not to 100
+    limiter.take("alice", now=100.0)
+    assert limiter.retry_after("alice", now=100.0) > 0
+
+
+def test_tokens_never_go_negative():
+    limiter = TokenBucketLimiter(burst=1, per_minute=60, max_keys=10)
+    for _ in range(5):
+        limiter.take("alice", now=0.0)
+    assert limiter.retry_after("alice", now=1.0) == 0.0
+
+
+def test_zero_rate_reports_a_finite_wait():
+    limiter = TokenBucketLimiter(burst=1, per_minute=0, max_keys=10)
+    limiter.take("alice", now=0.0)
+    assert limiter.retry_after("alice", now=1e9) == MAX_RETRY_AFTER
+
+
+def test_slow_rate_wait_is_capped():
+    limiter = TokenBucketLimiter(burst=1, per_minute=0.001, max_keys=10)
+    limiter.take("alice", now=0.0)
+    assert limiter.retry_after("alice", now=0.0) == MAX_RETRY_AFTER
+
+
+def test_least_recently_used_keys_are_evicted():
+    limiter = TokenBucketLimiter(burst=1, per_minute=1, max_keys=2)
+    limiter.take("alice", now=0.0)
+    limiter.take("bob", now=0.0)
+    limiter.take("alice", now=0.0) # alice is now the most recently used
+    limiter.take("carol", now=0.0)
+    assert len(limiter) == 2
+    assert limiter.evictions == 1
+    assert limiter.retry_after("bob", now=0.0) == 0.0 # Forgotten, so full again
+    assert limiter.retry_after("alice", now=0.0) > 0
+
+
+def test_reset_refills_the_bucket():
+    limiter = TokenBucketLimiter(burst=1, per_minute=1, max_keys=10)
+    limiter.take("alice", now=0.0)
+    limiter.reset("alice")
+    assert limiter.retry_after("alice", now=0.0) == 0.0
+
+
+# --- LoginThrottle ---
+
+def test_throttle_rejects_after_burst_and_success_refills_email():
+    throttle = LoginThrottle(max_keys=10)
+    throttle._emails = TokenBucketLimiter(burst=2, per_minute=1, max_keys=10)
+    for _ in range(2):
+        throttle.check("alice@example.com", "10.0.0.1")
+        throttle.record_failure("alice@example.com", "10.0.0.1")
+    with pytest.raises(TooManyLoginAttempts) as excinfo:
+        throttle.check("alice@example.com", "10.0.0.1")
+    assert 0 < excinfo.value.retry_after <= 60
+    throttle.record_success("alice@example.com")
+    throttle.check("alice@example.com", "10.0.0.1")
+    stats = throttle.stats()
+    assert (stats["failures"], stats["rejected_email"], stats["successes"]) == (2, 1, 1)
+
+
+def test_disabled_throttle_never_rejects():
+    throttle = LoginThrottle(max_keys=0)
+    for _ in range(100):
+        throttle.record_failure("alice@example.com", "10.0.0.1")
+    throttle.check("alice@example.com", "10.0.0.1")
+
+
+def test_login_route_answers_429_with_retry_after_when_rate_is_zero(monkeypatch):
+    throttle = LoginThrottle(max_keys=10)
+    throttle._ips = TokenBucketLimiter(burst=1, per_minute=0, max_keys=10)
+    throttle.record_failure("alice@example.com", "127.0.0.1")
+    monkeypatch.setattr("app.routes.login_throttle", throttle)
+
+    client = create_app().test_client()
+    response = client.post("/login", data={"email": "alice@example.com", "password": "whatever"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(int(MAX_RETRY_AFTER))
@@ -0,0 +1,87 @@
+# bookstore_app_with_login/tests/test_metrics.py
+
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+from flask import Flask
+from prometheus_client import CollectorRegistry, Counter
+from app import metrics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def counter():
+    """A labelled counter in its own registry, with no growth recorded for it yet."""
+    registry = CollectorRegistry()
+    events = Counter("test_events", "Events.", ["event"], registry=registry)
+    yield events, registry
+    for key in [key for key in metrics._last_values if key[0] is events]:
+        del metrics._last_values[key]
+
+
+def test_add_growth_adds_only_the_increase(counter):
+    events, registry = counter
+    metrics._add_growth(events, ("hits",), 5)
+    metrics._add_growth(events, ("hits",), 8)
+    metrics._add_growth(events, ("hits",), 8) # No change
+    assert registry.get_sample_value("test_events_total", {"event": "hits"}) == 8
+
+
+def test_add_growth_counts_a_reset_component_from_zero(counter):
+    events, registry = counter
+    metrics._add_growth(events, ("hits",), 10)
+    metrics._add_growth(events, ("hits",), 3) # e.g. the pool was recreated
+    assert registry.get_sample_value("test_events_total", {"event": "hits"}) == 13
+    metrics._add_growth(events, ("hits",), 4)
+    assert registry.get_sample_value("test_events_total", {"event": "hits"}) == 14
+
+
+@pytest.fixture
+def metrics_client():
+    app = Flask(__name__)
+    app.add_url_rule("/metrics", endpoint="metrics", view_func=metrics.metrics_view)
+    return app.test_client()
+
+
+def test_metrics_token_is_required_when_set(metrics_client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert metrics_client.get("/metrics").status_code == 401
+    assert metrics_client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = metrics_client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert b"bookstore_http_requests_total" in response.data
+
+
+def test_metrics_are_public_without_a_token(metrics_client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    assert metrics_client.get("/metrics").status_code == 200
+
+
+WORKER = textwrap.dedent("""
+    import sys
+    from flask import Flask
+    from app import metrics
+
+    for _ in range(int(sys.argv[1])):
+        metrics.record_order_outcome("success")
+    if sys.argv[2] == "scrape":
+        app = Flask(__name__)
+        with app.test_request_context("/metrics"):
+            sys.stdout.write(metrics.metrics_view().get_data(as_text=True))
+""")
+
+
+def test_multiprocess_scrape_sums_every_workers_metrics(tmp_path):
+    # prometheus_client picks its value storage at import, so each "worker" is a process
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), METRICS_TOKEN="")
+
+    def run_worker(orders, action):
+        return subprocess.run([sys.executable, "-c", WORKER, str(orders), action], cwd=PROJECT_ROOT, env=env,
+                              capture_output=True, text=True, check=True, timeout=60).stdout
+
+    run_worker(2, "exit")
+    output = run_worker(1, "scrape")
+    assert 'bookstore_orders_total{outcome="success"} 3.0' in output
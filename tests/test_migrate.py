@@ -0,0 +1,31 @@
+# bookstore_app_with_login/tests/test_migrate.py
+
+import pytest
+from migrate import MigrationError, apply, discover_migrations
+from tests.fakes import FakeConnection
+
+
+@pytest.fixture
+def migrations():
+    return discover_migrations()
+
+
+@pytest.mark.parametrize("target", ["1", "01", "0001"])
+def test_apply_stops_at_the_target_version(migrations, target):
+    conn = FakeConnection(results=[[]]) # Nothing applied yet
+    done = apply(conn, migrations, target=target)
+    assert [migration.version for migration in done] == ["0001"]
+
+
+def test_apply_without_target_applies_everything_pending(migrations):
+    conn = FakeConnection(results=[[("0001", None)]])
+    done = apply(conn, migrations)
+    assert [migration.version for migration in done] == [m.version for m in migrations[1:]]
+
+
+@pytest.mark.parametrize("target", ["one", "00001", "-1", "9"])
+def test_apply_rejects_an_unknown_target(migrations, target):
+    conn = FakeConnection(results=[[]])
+    with pytest.raises(MigrationError):
+        apply(conn, migrations, target=target)
+    assert conn.executed == [] # Checked before touching the database
@@ -0,0 +1,39 @@
+# bookstore_app_with_login/tests/test_password_hasher.py
+
+import os
+import runpy
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.services.password_hasher import PasswordHasher
+
+FAST_METHOD = "pbkdf2:sha256:1000" # Keeps the tests quick; production uses PASSWORD_HASH_METHOD
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=4, timeout=30)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hashes_and_verifies_on_the_process_pool(hasher):
+    pwhash = hasher.run(generate_password_hash, "S3cret!pass", FAST_METHOD)
+    assert pwhash.startswith(FAST_METHOD + "$")
+    assert hasher.run(check_password_hash, pwhash, "S3cret!pass") is True
+    assert hasher.run(check_password_hash, pwhash, "wrong") is False
+    stats = hasher.stats()
+    assert (stats["submitted"], stats["completed"], stats["failures"], stats["pending"]) == (3, 3, 0, 0)
+
+
+def test_inline_mode_needs_no_pool():
+    hasher = PasswordHasher(workers=0, max_pending=1, timeout=1)
+    pwhash = hasher.run(generate_password_hash, "S3cret!pass", FAST_METHOD)
+    assert check_password_hash(pwhash, "S3cret!pass")
+    assert hasher.stats()["submitted"] == 0
+
+
+def test_spawned_children_do_not_build_the_app():
+    # What a 'spawn' child does with the parent's `python main.py`
+    child_globals = runpy.run_path(os.path.join(REPO_ROOT, "main.py"), run_name="__mp_main__")
+    assert "app" not in child_globals
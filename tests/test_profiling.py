@@ -0,0 +1,51 @@
+# bookstore_app_with_login/tests/test_profiling.py
+
+import pytest
+from flask import Blueprint, Flask
+from app import profiling
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 0)
+    bp = Blueprint("main", __name__) # Sampling only covers the 'main' blueprint
+    bp.add_url_rule("/", endpoint="index", view_func=lambda: "ok")
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    profiling.init_app(app)
+    return app.test_client()
+
+
+def profiles(tmp_path):
+    return sorted(path.name for path in tmp_path.glob("*.pstats"))
+
+
+def test_request_with_token_is_profiled(client, tmp_path):
+    response = client.get("/", headers={"X-Profile": "1", "X-Profile-Token": "s3cret"})
+    assert response.headers["X-Profile-File"].startswith("main.index.")
+    assert profiles(tmp_path) == [response.headers["X-Profile-File"]]
+
+
+@pytest.mark.parametrize("headers", [{"X-Profile": "1"}, {"X-Profile": "1", "X-Profile-Token": "wrong"}])
+def test_request_without_valid_token_is_ignored(client, tmp_path, headers):
+    response = client.get("/", headers=headers)
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response.headers
+    assert profiles(tmp_path) == []
+
+
+def test_no_token_configured_turns_on_demand_profiling_off(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "")
+    response = client.get("/?_profile=1", headers={"X-Profile-Token": ""})
+    assert "X-Profile-File" not in response.headers
+    assert profiles(tmp_path) == []
+
+
+def test_sampled_requests_are_profiled_without_a_token(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "")
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1)
+    response = client.get("/")
+    assert "X-Profile-File" not in response.headers # Only requested profiles are announced
+    assert len(profiles(tmp_path)) == 1
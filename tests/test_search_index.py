@@ -0,0 +1,152 @@
+# bookstore_app_with_login/tests/test_search_index.py
+
+from decimal import Decimal
+from app.services.search_index import BookSearchIndex, tokenize
+
+
+def book(title, author="Anonymous", genre="Fiction", description="", price="10.00", stock_quantity=3):
+    return {"title": title, "author": author, "genre": genre, "description": description,
+            "price": Decimal(price), "stock_quantity": stock_quantity}
+
+
+def result_ids(index, query, **kwargs):
+    results, _ = index.search(query, **kwargs)
+    return [result["book_id"] for result in results]
+
+
+def build_index():
+    index = BookSearchIndex()
+    index.add(1, book("The Hobbit", "J. R. R. Tolkien", "Fantasy", "A hobbit goes on an adventure."))
+    index.add(2, book("The Fellowship of the Ring", "J. R. R. Tolkien", "Fantasy", "The ring must be destroyed."))
+    index.add(3, book("Dune", "Frank Herbert", "Science Fiction", "Spice, sand and a desert planet."))
+    index.add(4, book("Desert Walks", "Ann Rivers", "Travel", "Hiking trips, with notes on hobbits."))
+    return index
+
+
+# --- Tokenization ---
+
+def test_tokenize_lowercases_and_splits_on_punctuation():
+    assert tokenize("The Lord-of-the-Rings, VOL. 2") == ["lord", "rings", "vol", "2"]
+
+
+def test_tokenize_drops_stop_words_and_handles_empty_input():
+    assert tokenize("a tale of the city") == ["tale", "city"]
+    assert tokenize(None) == []
+    assert tokenize("") == []
+
+
+def test_tokenize_keeps_accented_letters():
+    assert tokenize("Les Misérables") == ["les", "misérables"]
+
+
+# --- Matching ---
+
+def test_exact_term_matches():
+    assert sorted(result_ids(build_index(), "dune")) == [3]
+
+
+def test_prefix_expands_to_longer_terms():
+    assert sorted(result_ids(build_index(), "tolk")) == [1, 2]
+
+
+def test_single_letter_only_matches_whole_tokens():
+    index = build_index()
+    assert result_ids(index, "h") == [] # Not a prefix of "hobbit", "herbert", ...
+    assert sorted(result_ids(index, "j")) == [1, 2] # The initial "J."
+
+
+def test_every_term_must_match():
+    index = build_index()
+    assert result_ids(index, "tolkien ring") == [2]
+    assert result_ids(index, "tolkien dune") == []
+    assert result_ids(index, "nonexistent") == []
+
+
+def test_stop_words_only_query_matches_nothing():
+    assert build_index().search("the of and") == ([], 0)
+
+
+# --- Ranking and pagination ---
+
+def test_title_match_ranks_above_description_match():
+    assert result_ids(build_index(), "hobbit") == [1, 4]
+
+
+def test_exact_match_ranks_above_prefix_match():
+    index = BookSearchIndex()
+    index.add(1, book("Seasons", description="One sea voyage."))
+    index.add(2, book("Seasons", description="Another seal story."))
+    assert result_ids(index, "sea") == [1, 2]
+
+
+def test_results_carry_summary_fields_and_score():
+    results, total = build_index().search("dune")
+    assert total == 1
+    result = results[0]
+    assert (result["book_id"], result["title"], result["price"]) == (3, "Dune", Decimal("10.00"))
+    assert "description" not in result
+    assert result["score"] > 0
+
+
+def test_equal_scores_are_ordered_by_title():
+    assert result_ids(build_index(), "fantasy") == [2, 1] # "The Fellowship..." before "The Hobbit"
+
+
+def test_offset_and_limit_page_through_ranked_results():
+    index = build_index()
+    first, total = index.search("fantasy", offset=0, limit=1)
+    second, _ = index.search("fantasy", offset=1, limit=1)
+    past_the_end, _ = index.search("fantasy", offset=2, limit=1)
+    assert total == 2
+    assert [first[0]["book_id"], second[0]["book_id"]] == [2, 1]
+    assert past_the_end == []
+
+
+# --- Incremental maintenance ---
+
+def test_update_reindexes_changed_text():
+    index = build_index()
+    index.update(3, {"title": "Children of Dune"})
+    assert result_ids(index, "children") == [3]
+    assert result_ids(index, "dune") == [3]
+    assert result_ids(index, "desert") == [4, 3] # Description still indexed
+
+
+def test_update_replaces_old_tokens():
+    index = build_index()
+    index.update(3, {"title": "Arrakis"})
+    assert result_ids(index, "dune") == []
+    assert result_ids(index, "arrakis") == [3]
+
+
+def test_update_of_summary_fields_is_visible_in_results():
+    index = build_index()
+    index.update(3, {"stock_quantity": 0, "price": Decimal("12.50")})
+    result = index.search("dune")[0][0]
+    assert (result["stock_quantity"], result["price"]) == (0, Decimal("12.50"))
+
+
+def test_update_adds_unknown_book_only_when_complete():
+    index = build_index()
+    index.update(9, {"stock_quantity": 4})
+    assert len(index) == 4
+    index.update(9, book("Neuromancer", "William Gibson", "Science Fiction"))
+    assert len(index) == 5
+    assert result_ids(index, "neuromancer") == [9]
+
+
+def test_remove_drops_book_and_unused_terms():
+    index = build_index()
+    index.remove(3)
+    assert len(index) == 3
+    assert result_ids(index, "dune") == []
+    assert result_ids(index, "spic") == [] # Prefix vocabulary pruned too
+    index.remove(3) # No-op
+
+
+def test_add_replaces_existing_copy():
+    index = build_index()
+    index.add(3, book("Foundation", "Isaac Asimov"))
+    assert len(index) == 4
+    assert result_ids(index, "dune") == []
+    assert result_ids(index, "foundation") == [3]